@@ -0,0 +1,336 @@
+# Copyright (C) 2014/15 - Iraklis Diakos (hdiakos@outlook.com)
+# Pilavidis Kriton (kriton_pilavidis@outlook.com)
+# All Rights Reserved.
+# You may use, distribute and modify this code under the
+# terms of the ASF 2.0 license.
+#
+
+"""Throughput and latency benchmarks for crapi.ipc.
+
+Every scenario talks to a ServerPipe living in a separate process through
+the public ServerPipe/ClientPipe API:
+
+    latency     ping-pong round trips, reported as percentiles
+    throughput  one-way stream of messages acknowledged at the end
+    fanin       N client processes doing round trips at the same time
+    connect     connection setup and teardown rate
+
+Results are printed (or written with --output) as a single JSON document
+so that runs from different commits can be diffed or plotted.
+
+Usage:
+    python benchmarks/ipc_bench.py [--quick] [--channel byte] [--output f]
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+# Python native libraries.
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import time
+try:
+    from queue import Empty
+except ImportError:
+    from Queue import Empty
+
+
+try:
+    import crapi  # noqa: F401
+except ImportError:
+    # The checkout is the crapi package itself, whatever its directory is
+    # called, so it is loaded under that name rather than looked up on the
+    # path.
+    _root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        from importlib.util import module_from_spec
+        from importlib.util import spec_from_file_location
+    except ImportError:
+        import imp
+        imp.load_module(
+            str('crapi'), None, _root, ('', '', imp.PKG_DIRECTORY)
+        )
+    else:
+        _spec = spec_from_file_location(
+            'crapi', os.path.join(_root, '__init__.py'),
+            submodule_search_locations=[_root]
+        )
+        sys.modules['crapi'] = module_from_spec(_spec)
+        _spec.loader.exec_module(sys.modules['crapi'])
+
+from crapi.ipc.ClientPipe import ClientPipe
+from crapi.ipc.FramedPipe import FramedPipe
+from crapi.ipc.Pipe import Pipe
+from crapi.ipc.PipeError import PipeError
+from crapi.ipc.ServerPipe import ServerPipe
+
+
+SIZES = [64, 1024, 16 * 1024, 256 * 1024, 1024 * 1024]
+
+# Seconds the fan-in clients get to finish their rounds.
+FANIN_TIMEOUT = 300
+
+# Intervals are measured on the finest clock which never goes back.
+_clock = getattr(time, 'perf_counter', time.time)
+
+
+def _wrap(pipe, channel):
+    # Byte channels need framing to keep the messages apart.
+    if channel == Pipe.Channel.BYTE:
+        return FramedPipe(pipe)
+    return pipe
+
+
+def _handler(channel):
+    def handle(pipe):
+        pipe = _wrap(pipe, channel)
+        status, _, mode = pipe.read()
+        mode = bytes(mode)
+        if status != 0 or mode == b'noop':
+            return
+        if mode == b'echo':
+            while True:
+                status, _, data = pipe.read()
+                if status != 0:
+                    return
+                pipe.write(data)
+        elif mode.startswith(b'sink:'):
+            for _ in range(int(mode[5:])):
+                status, _, _ = pipe.read()
+                if status != 0:
+                    return
+            pipe.write(b'ok')
+    return handle
+
+
+def _serve(name, channel, instances, ready):
+    server = ServerPipe(name, channel=channel)
+    ready.set()
+    server.serve(_handler(channel), instances=instances)
+
+
+def _client(name, channel):
+    return _wrap(ClientPipe(name, channel=channel, view=Pipe.View.CLIENT),
+                 channel)
+
+
+def _guarded(scenario, *args):
+    # Message channels on Linux cannot carry messages larger than the
+    # socket send buffer; report such sizes instead of aborting the run.
+    try:
+        return scenario(*args)
+    except PipeError as e:
+        return {'size': args[2], 'error': e.message}
+
+
+def _percentile(samples, pct):
+    index = int(round(pct / 100.0 * (len(samples) - 1)))
+    return samples[index]
+
+
+def bench_latency(name, channel, size, rounds):
+    pipe = _client(name, channel)
+    pipe.write(b'echo')
+    payload = b'x' * size
+    for _ in range(min(rounds, 100)):
+        pipe.write(payload)
+        pipe.read()
+    samples = []
+    for _ in range(rounds):
+        start = _clock()
+        pipe.write(payload)
+        pipe.read()
+        samples.append((_clock() - start) * 1e6)
+    pipe.close()
+    samples.sort()
+    return {
+        'size': size,
+        'rounds': rounds,
+        'p50_us': _percentile(samples, 50),
+        'p90_us': _percentile(samples, 90),
+        'p99_us': _percentile(samples, 99),
+        'max_us': samples[-1],
+    }
+
+
+def bench_throughput(name, channel, size, total_bytes):
+    count = max(total_bytes // size, 10)
+    pipe = _client(name, channel)
+    payload = b'x' * size
+    start = _clock()
+    pipe.write(('sink:%d' % count).encode('ascii'))
+    for _ in range(count):
+        pipe.write(payload)
+    pipe.read()
+    elapsed = _clock() - start
+    pipe.close()
+    return {
+        'size': size,
+        'messages': count,
+        'seconds': elapsed,
+        'msgs_per_s': count / elapsed,
+        'mb_per_s': count * size / elapsed / 1e6,
+    }
+
+
+def _fanin_client(name, channel, size, rounds, start, results):
+    pipe = _client(name, channel)
+    pipe.write(b'echo')
+    payload = b'x' * size
+    start.wait()
+    began = _clock()
+    for _ in range(rounds):
+        pipe.write(payload)
+        pipe.read()
+    results.put(_clock() - began)
+    pipe.close()
+
+
+def bench_fanin(name, channel, clients, size, rounds):
+    start = multiprocessing.Event()
+    results = multiprocessing.Queue()
+    workers = [
+        multiprocessing.Process(
+            target=_fanin_client,
+            args=(name, channel, size, rounds, start, results)
+        )
+        for _ in range(clients)
+    ]
+    for worker in workers:
+        worker.start()
+    start.set()
+    # A client which crashed never reports; fail the scenario rather than
+    # wait for it forever.
+    deadline = _clock() + FANIN_TIMEOUT
+    timings = []
+    while len(timings) < clients:
+        try:
+            timings.append(results.get(timeout=1))
+        except Empty:
+            crashed = [
+                worker for worker in workers
+                if worker.exitcode not in (None, 0)
+            ]
+            if crashed or _clock() > deadline:
+                for worker in workers:
+                    worker.terminate()
+                for worker in workers:
+                    worker.join()
+                if crashed:
+                    error = 'Fan-in client exited with %s!' % (
+                        crashed[0].exitcode
+                    )
+                else:
+                    error = 'Fan-in clients timed out!'
+                return {'clients': clients, 'size': size, 'error': error}
+    elapsed = max(timings)
+    for worker in workers:
+        worker.join()
+    return {
+        'clients': clients,
+        'size': size,
+        'rounds': rounds,
+        'seconds': elapsed,
+        'msgs_per_s': clients * rounds / elapsed,
+    }
+
+
+def bench_connect(name, channel, count):
+    start = _clock()
+    for _ in range(count):
+        pipe = _client(name, channel)
+        pipe.write(b'noop')
+        pipe.close()
+    elapsed = _clock() - start
+    return {
+        'connections': count,
+        'seconds': elapsed,
+        'connects_per_s': count / elapsed,
+    }
+
+
+def _revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.STDOUT
+        ).decode('ascii').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--quick', action='store_true',
+                        help='fewer rounds, for smoke testing')
+    parser.add_argument('--channel', choices=['message', 'byte'],
+                        default='message')
+    parser.add_argument('--clients', type=int, default=0,
+                        help='fan-in clients (default: # of CPUs)')
+    parser.add_argument('--only', action='append',
+                        choices=['latency', 'throughput', 'fanin', 'connect'],
+                        help='run only these scenarios')
+    parser.add_argument('--output', help='write the JSON here')
+    args = parser.parse_args(argv)
+
+    channel = Pipe.Channel(args.channel)
+    scale = 10 if args.quick else 1
+    clients = args.clients or multiprocessing.cpu_count()
+    only = set(args.only or ['latency', 'throughput', 'fanin', 'connect'])
+    name = 'crapi-bench-%d' % os.getpid()
+
+    ready = multiprocessing.Event()
+    server = multiprocessing.Process(
+        target=_serve, args=(name, channel, clients + 1, ready)
+    )
+    server.daemon = True
+    server.start()
+    ready.wait()
+
+    results = {
+        'revision': _revision(),
+        'timestamp': time.time(),
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'channel': args.channel,
+    }
+    try:
+        if 'latency' in only:
+            results['latency'] = [
+                _guarded(bench_latency, name, channel, size, 20000 // scale)
+                for size in SIZES[:3]
+            ]
+        if 'throughput' in only:
+            results['throughput'] = [
+                _guarded(bench_throughput, name, channel, size,
+                         256 * 1024 * 1024 // scale)
+                for size in SIZES
+            ]
+        if 'fanin' in only:
+            results['fanin'] = [
+                bench_fanin(name, channel, n, 64, 10000 // scale)
+                for n in sorted(set([1, max(clients // 2, 1), clients]))
+            ]
+        if 'connect' in only:
+            results['connect'] = bench_connect(name, channel, 5000 // scale)
+    finally:
+        server.terminate()
+        server.join()
+
+    document = json.dumps(results, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(document + '\n')
+    else:
+        print(document)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+# Copyright (C) 2014/15 - Iraklis Diakos (hdiakos@outlook.com)
+# Pilavidis Kriton (kriton_pilavidis@outlook.com)
+# All Rights Reserved.
+# You may use, distribute and modify this code under the
+# terms of the ASF 2.0 license.
+#
+
+"""Part of the ipc module."""
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+# NOTE: asyncio based, hence Python 3.7+ only.
+
+from crapi.ipc.BasePipe import BasePipe
+from crapi.ipc.BasePipe import _READ
+from crapi.ipc.BasePipe import _YIELD
+from crapi.ipc.PipeError import PipeError
+
+
+class AsyncBasePipe(BasePipe):
+
+    # The BasePipe calls built on top of read/write, awaiting the
+    # coroutines of the asynchronous backends instead. The framing is that
+    # of BasePipe, so either end may be blocking or asynchronous.
+
+    async def __fill(self, view, timeout):
+        offset = 0
+        while offset < len(view):
+            pipe_status, read_bytes = await self.read_into(
+                view[offset:], timeout
+            )
+            if pipe_status != 0:
+                return pipe_status, offset
+            offset += read_bytes
+        return 0, offset
+
+    # An asynchronous generator: async for chunk in pipe.read_stream().
+    async def read_stream(self, chunk_size=64 * 1024, timeout=0):
+        self._checkChunkSize(chunk_size)
+        reader = self._streamReader(chunk_size)
+        pipe_data = None
+        while True:
+            try:
+                step, value = reader.send(pipe_data)
+            except StopIteration:
+                return
+            if step == _YIELD:
+                pipe_data = None
+                yield value
+                continue
+            if step == _READ:
+                pipe_status, _, pipe_data = await self.read(timeout)
+            else:
+                pipe_status, _ = await self.__fill(value, timeout)
+                pipe_data = None
+            if pipe_status != 0:
+                raise PipeError(
+                    'Pipe broke in the middle of a stream!',
+                    'status_code',
+                    pipe_status
+                )
+
+    async def send(self, obj, timeout=0):
+        batch, framing_bytes = self._objectWriter(obj)
+        pipe_status, written_bytes = await self.write_many(batch, timeout)
+        return pipe_status, written_bytes - framing_bytes
+
+    async def receive(self, timeout=0):
+        reader = self._objectReader()
+        pipe_data = None
+        received = False
+        while True:
+            step, value = reader.send(pipe_data)
+            if step == _YIELD:
+                return 0, value
+            if step == _READ:
+                pipe_status, read_bytes, pipe_data = await self.read(timeout)
+            else:
+                pipe_status, read_bytes = await self.__fill(value, timeout)
+                pipe_data = None
+            if pipe_status != 0:
+                if received or read_bytes > 0:
+                    raise PipeError(
+                        'Pipe broke in the middle of an object!',
+                        'status_code',
+                        pipe_status
+                    )
+                return pipe_status, None
+            received = True
+
+    async def write_stream(self, payloads, timeout=0, chunk_size=64 * 1024):
+        self._checkChunkSize(chunk_size)
+        written_bytes = 0
+        for batch, chunk_bytes in self._streamWriter(payloads, chunk_size):
+            pipe_status, _ = await self.write_many(batch, timeout)
+            if pipe_status == 1:
+                return 1, written_bytes
+            written_bytes += chunk_bytes
+        return 0, written_bytes
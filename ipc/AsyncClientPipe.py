@@ -0,0 +1,27 @@
+# Copyright (C) 2014/15 - Iraklis Diakos (hdiakos@outlook.com)
+# Pilavidis Kriton (kriton_pilavidis@outlook.com)
+# All Rights Reserved.
+# You may use, distribute and modify this code under the
+# terms of the ASF 2.0 license.
+#
+
+"""Part of the ipc module."""
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import crapi.ipc.AsyncPipe as AsyncPipe
+
+
+class AsyncClientPipe(AsyncPipe.AsyncPipe):
+
+    def listen(self):
+        raise NotImplementedError(
+            'This should only be done from a ServerPipe!'
+        )
+
+    def shutdown(self):
+        raise NotImplementedError(
+            'This should only be done from a ServerPipe!'
+        )
@@ -0,0 +1,23 @@
+# Copyright (C) 2014/15 - Iraklis Diakos (hdiakos@outlook.com)
+# Pilavidis Kriton (kriton_pilavidis@outlook.com)
+# All Rights Reserved.
+# You may use, distribute and modify this code under the
+# terms of the ASF 2.0 license.
+#
+
+"""Part of the ipc module."""
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+# NOTE: asyncio based, hence Python 3.7+ only.
+# Python native libraries.
+import sys
+
+# Same deal as with Pipe.Pipe: the backend is resolved on first import. The
+# Windows flavour needs the (default) proactor event loop whereas the Linux
+# one works with any selector based event loop.
+if sys.platform == 'win32':
+    from crapi.ipc.AsyncWinPipe import AsyncWinPipe as AsyncPipe
+else:
+    from crapi.ipc.AsyncUnixPipe import AsyncUnixPipe as AsyncPipe
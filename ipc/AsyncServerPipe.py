@@ -0,0 +1,110 @@
+# Copyright (C) 2014/15 - Iraklis Diakos (hdiakos@outlook.com)
+# Pilavidis Kriton (kriton_pilavidis@outlook.com)
+# All Rights Reserved.
+# You may use, distribute and modify this code under the
+# terms of the ASF 2.0 license.
+#
+
+"""Part of the ipc module."""
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+# NOTE: asyncio based, hence Python 3.7+ only.
+# Python native libraries.
+import asyncio
+import logging
+
+import crapi.ipc.AsyncPipe as AsyncPipe
+from crapi.ipc.PipeError import PipeError
+
+
+_log = logging.getLogger(__name__)
+
+
+class AsyncServerPipe(AsyncPipe.AsyncPipe):
+
+    # The task running serve(); shutdown() cancels it.
+    __serving = None
+
+    async def _listen(self):
+        status_code = await self.connect()
+        if status_code == 0:
+            pipe_status, pipe_bytes, pipe_content = await self.read()
+            self.close()
+        else:
+            raise PipeError(
+                'Pipe encountered an error while attempting a connection!',
+                'status_code',
+                status_code
+            )
+        return status_code, pipe_status, pipe_bytes, pipe_content
+
+    # One coroutine accepts clients, each on a fresh pipe instance, and
+    # every connection gets a task of its own running the handler. All of
+    # them share the thread running the event loop.
+    async def _serve(self, handler, instances=0):
+        if instances > self.instances:
+            raise ValueError(
+                'Invalid # of instances: Cannot exceed the pipe instances!'
+            )
+        if instances > 0:
+            slots = asyncio.Semaphore(instances)
+        else:
+            slots = None
+        self.__serving = asyncio.current_task()
+        sessions = set()
+        try:
+            while True:
+                if slots is not None:
+                    await slots.acquire()
+                pipe = self._instance()
+                try:
+                    await pipe.connect()
+                except BaseException:
+                    pipe._release()
+                    if slots is not None:
+                        slots.release()
+                    raise
+                session = asyncio.ensure_future(
+                    self.__handle(handler, pipe, slots)
+                )
+                sessions.add(session)
+                session.add_done_callback(sessions.discard)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            for session in list(sessions):
+                session.cancel()
+            if sessions:
+                await asyncio.gather(*sessions, return_exceptions=True)
+            self.__serving = None
+            self._release()
+
+    async def __handle(self, handler, pipe, slots):
+        try:
+            await handler(pipe)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            _log.exception('Pipe handler failed for %s!', pipe.name)
+        finally:
+            pipe._release()
+            if slots is not None:
+                slots.release()
+
+    def _shutdown(self):
+        if self.__serving is not None:
+            # serve() releases the pipe itself once cancelled.
+            self.__serving.cancel()
+        else:
+            self._release()
+
+    async def listen(self):
+        return await self._listen()
+
+    async def serve(self, handler, instances=0):
+        return await self._serve(handler, instances)
+
+    def shutdown(self):
+        return self._shutdown()
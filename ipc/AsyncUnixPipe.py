@@ -0,0 +1,344 @@
+# Copyright (C) 2014/15 - Iraklis Diakos (hdiakos@outlook.com)
+# Pilavidis Kriton (kriton_pilavidis@outlook.com)
+# All Rights Reserved.
+# You may use, distribute and modify this code under the
+# terms of the ASF 2.0 license.
+#
+
+"""Part of the ipc module."""
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+# NOTE: asyncio based, hence Python 3.7+ only.
+# Python native libraries.
+import asyncio
+import copy
+import errno
+import socket
+
+from crapi.ipc.AsyncBasePipe import AsyncBasePipe
+from crapi.ipc.BasePipe import BasePipe
+from crapi.ipc.PipeError import PipeError
+from crapi.ipc.PipeTimeoutError import PipeTimeoutError
+from crapi.ipc.UnixPipe import ADDRESS_PREFIX
+from crapi.ipc.UnixPipe import _CREDENTIALS_SZ
+
+
+class AsyncUnixPipe(AsyncBasePipe):
+
+    # Same sockets as UnixPipe but in non-blocking mode and driven by the
+    # selector of the running event loop instead of parking a thread.
+    def __init__(self, name='', ptype=BasePipe.Type.NAMED,
+                 mode=BasePipe.Mode.DUPLEX, channel=BasePipe.Channel.MESSAGE,
+                 transport=BasePipe.Transport.ASYNCHRONOUS,
+                 view=BasePipe.View.SERVER, instances=0, buf_sz=[0, 0]):
+
+        super(AsyncUnixPipe, self).__init__(
+            name, ptype, mode, channel, transport, view, instances, buf_sz
+        )
+
+        if self.ptype != BasePipe.Type.NAMED:
+            raise NotImplementedError('Sorry! This pipe type is a WIP!')
+
+        if self.mode != BasePipe.Mode.DUPLEX:
+            raise NotImplementedError('Sorry! This pipe modes is a WIP!')
+
+        if self.channel == BasePipe.Channel.MESSAGE:
+            self.__sock_type = socket.SOCK_SEQPACKET
+        else:
+            self.__sock_type = socket.SOCK_STREAM
+
+        if self.transport == BasePipe.Transport.SYNCHRONOUS:
+            raise NotImplementedError('Sorry! This transport mode is a WIP!')
+
+        self.__address = (ADDRESS_PREFIX + self.name).encode('utf-8')
+        self.__peek = bytearray(1)
+        self.__hListener = None
+        self.__hPipe = None
+        self.__owner = True
+
+        if self.view == BasePipe.View.SERVER:
+            self.__hListener = self.__socket()
+            try:
+                self.__hListener.bind(self.__address)
+            except OSError as e:
+                self.__hListener.close()
+                raise PipeError(
+                    'Failed to create named pipe!',
+                    'error_code',
+                    e.errno
+                )
+            if instances == 0:
+                self.__hListener.listen(socket.SOMAXCONN)
+            else:
+                self.__hListener.listen(instances)
+
+    def __socket(self):
+        sock = socket.socket(socket.AF_UNIX, self.__sock_type)
+        sock.setblocking(False)
+        if self.buf_sz[0] > 0:
+            sock.setsockopt(
+                socket.SOL_SOCKET, socket.SO_RCVBUF, self.buf_sz[0]
+            )
+        if self.buf_sz[1] > 0:
+            sock.setsockopt(
+                socket.SOL_SOCKET, socket.SO_SNDBUF, self.buf_sz[1]
+            )
+        return sock
+
+    def __getPipe(self):
+        if self.__hPipe is None:
+            raise PipeError(
+                'Pipe is not connected!',
+                'name',
+                self.name
+            )
+        return self.__hPipe
+
+    async def __timed(self, aw, timeout):
+        # Timeouts are expressed in milliseconds throughout the ipc module.
+        if timeout <= 0:
+            return await aw
+        try:
+            return await asyncio.wait_for(aw, timeout / 1000.0)
+        except asyncio.TimeoutError:
+            raise PipeTimeoutError(
+                'Connection timeout while awaiting pipe activity!',
+                'event_timeout',
+                timeout
+            )
+
+    async def __readable(self, sock):
+        loop = asyncio.get_running_loop()
+        event = loop.create_future()
+
+        def signal():
+            if not event.done():
+                event.set_result(None)
+
+        loop.add_reader(sock.fileno(), signal)
+        try:
+            await event
+        finally:
+            loop.remove_reader(sock.fileno())
+
+    async def __connect(self):
+        loop = asyncio.get_running_loop()
+        if self.view == BasePipe.View.SERVER:
+            if self.__hPipe is not None:
+                raise PipeError(
+                    'Pipe instance is already connected!',
+                    'name',
+                    self.name
+                )
+            hPipe, _ = await loop.sock_accept(self.__hListener)
+            hPipe.setblocking(False)
+        else:
+            hPipe = self.__socket()
+            try:
+                await loop.sock_connect(hPipe, self.__address)
+            except OSError as e:
+                hPipe.close()
+                raise PipeError(
+                    'Failed to open named pipe!',
+                    'error_code',
+                    e.errno
+                )
+        self.__hPipe = hPipe
+
+    async def connect(self, timeout=0, buf_sz=0):
+        await self.__timed(self.__connect(), timeout)
+        return 0
+
+    async def __messageSize(self, hPipe):
+        # See UnixPipe.read for the MSG_TRUNC trick.
+        while True:
+            try:
+                return hPipe.recv_into(
+                    self.__peek, 1, socket.MSG_PEEK | socket.MSG_TRUNC
+                )
+            except BlockingIOError:
+                await self.__readable(hPipe)
+
+    # A zero length message and a peer gone both peek as 0 bytes; see
+    # UnixPipe.__receiveEmpty. Returns True for the former.
+    def __receiveEmpty(self, hPipe):
+        hPipe.setsockopt(socket.SOL_SOCKET, socket.SO_PASSCRED, 1)
+        try:
+            _, ancdata, _, _ = hPipe.recvmsg(1, _CREDENTIALS_SZ)
+        finally:
+            hPipe.setsockopt(socket.SOL_SOCKET, socket.SO_PASSCRED, 0)
+        return bool(ancdata)
+
+    # Returns None once the peer has hung up.
+    async def __read(self, buf_sz):
+        hPipe = self.__getPipe()
+        if self.channel == BasePipe.Channel.MESSAGE:
+            msg_sz = await self.__messageSize(hPipe)
+            if msg_sz == 0:
+                if self.__receiveEmpty(hPipe):
+                    return b''
+                return None
+            self.sizer.observe(msg_sz)
+            return hPipe.recv(msg_sz)
+        if buf_sz <= 0:
+            buf_sz = self.sizer.size
+        loop = asyncio.get_running_loop()
+        pipe_data = await loop.sock_recv(hPipe, buf_sz)
+        if len(pipe_data) == 0:
+            return None
+        # See UnixPipe.read: a full buffer asks for a bigger one.
+        if len(pipe_data) == buf_sz:
+            self.sizer.observe(buf_sz * 2)
+        else:
+            self.sizer.observe(len(pipe_data))
+        return pipe_data
+
+    async def read(self, timeout=0, buf_sz=0):
+        try:
+            pipe_data = await self.__timed(self.__read(buf_sz), timeout)
+        except (BrokenPipeError, ConnectionResetError):
+            return 1, 0, b''
+        if pipe_data is None:
+            return 1, 0, b''
+        return 0, len(pipe_data), pipe_data
+
+    # Returns None once the peer has hung up.
+    async def __readInto(self, buffer):
+        hPipe = self.__getPipe()
+        if self.channel == BasePipe.Channel.MESSAGE:
+            msg_sz = await self.__messageSize(hPipe)
+            if msg_sz == 0:
+                if self.__receiveEmpty(hPipe):
+                    return 0
+                return None
+            if msg_sz > len(buffer):
+                raise PipeError(
+                    'Buffer too small for pipe message!',
+                    'msg_sz',
+                    msg_sz
+                )
+            return hPipe.recv_into(buffer, msg_sz)
+        loop = asyncio.get_running_loop()
+        read_bytes = await loop.sock_recv_into(hPipe, buffer)
+        if read_bytes == 0 and len(buffer) > 0:
+            return None
+        return read_bytes
+
+    async def read_into(self, buffer, timeout=0):
+        try:
+            read_bytes = await self.__timed(self.__readInto(buffer), timeout)
+        except (BrokenPipeError, ConnectionResetError):
+            return 1, 0
+        if read_bytes is None:
+            return 1, 0
+        return 0, read_bytes
+
+    async def write(self, payload, timeout=0, buf_sz=0):
+        hPipe = self.__getPipe()
+        if not isinstance(payload, (bytes, bytearray, memoryview)):
+            payload = payload.encode('utf-8')
+        if buf_sz > 0:
+            payload = payload[:buf_sz]
+        loop = asyncio.get_running_loop()
+        try:
+            # A SOCK_SEQPACKET send is atomic so this never splits messages.
+            await self.__timed(loop.sock_sendall(hPipe, payload), timeout)
+        except (BrokenPipeError, ConnectionResetError):
+            return 1, 0
+        except OSError as e:
+            if e.errno != errno.EMSGSIZE:
+                raise
+            # See UnixPipe.write; the message has to fit the send buffer.
+            hPipe.setsockopt(
+                socket.SOL_SOCKET, socket.SO_SNDBUF, len(payload)
+            )
+            try:
+                await self.__timed(
+                    loop.sock_sendall(hPipe, payload), timeout
+                )
+            except OSError as e:
+                if e.errno != errno.EMSGSIZE:
+                    raise
+                raise PipeError(
+                    'Message exceeds the socket buffer size!',
+                    'msg_sz',
+                    len(payload)
+                )
+        return 0, len(payload)
+
+    async def write_many(self, payloads, timeout=0):
+        if self.channel == BasePipe.Channel.MESSAGE:
+            written_bytes = 0
+            for payload in payloads:
+                status_code, sent_bytes = await self.write(payload, timeout)
+                if status_code != 0:
+                    return status_code, written_bytes
+                written_bytes += sent_bytes
+            return 0, written_bytes
+        batch = []
+        for payload in payloads:
+            if not isinstance(payload, (bytes, bytearray, memoryview)):
+                payload = payload.encode('utf-8')
+            batch.append(payload)
+        return await self.write(b''.join(batch), timeout)
+
+    # Streams and codecs are sent and read by AsyncBasePipe.
+
+    # Same request/reply exchange as UnixPipe.transact; the timeout covers
+    # both halves.
+    async def __transact(self, payload, buf_sz):
+        pipe_status, _ = await self.write(payload)
+        if pipe_status != 0:
+            return None
+        return await self.__read(buf_sz)
+
+    async def transact(self, payload, timeout=0, buf_sz=0):
+        if self.transport != BasePipe.Transport.TRANSACTIONAL:
+            raise PipeError(
+                'Pipe transport is not transactional!',
+                'transport',
+                self.transport.value
+            )
+        try:
+            pipe_data = await self.__timed(
+                self.__transact(payload, buf_sz), timeout
+            )
+        except (BrokenPipeError, ConnectionResetError):
+            return 1, 0, b''
+        if pipe_data is None:
+            return 1, 0, b''
+        return 0, len(pipe_data), pipe_data
+
+    # See UnixPipe.cancel; safe to call from any thread as the shutdown
+    # simply makes the socket ready for the awaiting calls to fail.
+    def cancel(self):
+        hPipe = self.__hPipe
+        if hPipe is not None:
+            try:
+                hPipe.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def close(self):
+        if self.__hPipe is not None:
+            self.__hPipe.close()
+            self.__hPipe = None
+
+    def _instance(self):
+        if self.view != BasePipe.View.SERVER:
+            raise NotImplementedError(
+                'This should only be done from a ServerPipe!'
+            )
+        pipe = copy.copy(self)
+        pipe.__peek = bytearray(1)
+        pipe.__hPipe = None
+        pipe.__owner = False
+        return pipe
+
+    def _release(self):
+        self.close()
+        if self.__hListener is not None and self.__owner:
+            self.__hListener.close()
+        self.__hListener = None
@@ -0,0 +1,308 @@
+# Copyright (C) 2014/15 - Iraklis Diakos (hdiakos@outlook.com)
+# Pilavidis Kriton (kriton_pilavidis@outlook.com)
+# All Rights Reserved.
+# You may use, distribute and modify this code under the
+# terms of the ASF 2.0 license.
+#
+
+"""Part of the ipc module."""
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+# NOTE: asyncio based, hence Python 3.7+ only.
+# Python native libraries.
+import _winapi
+import asyncio
+import ctypes
+from asyncio.windows_utils import PipeHandle
+
+from crapi.ipc.AsyncBasePipe import AsyncBasePipe
+from crapi.ipc.BasePipe import BasePipe
+from crapi.ipc.PipeError import PipeError
+from crapi.ipc.PipeTimeoutError import PipeTimeoutError
+
+# Not exported by _winapi.
+_ERROR_PIPE_NOT_CONNECTED = 233
+
+
+class AsyncWinPipe(AsyncBasePipe):
+
+    # Overlapped named pipes serviced by the I/O completion port of the
+    # asyncio proactor event loop. Unlike WinPipe nothing ever waits on a
+    # per-operation event: the loop is notified once the kernel is done.
+    def __init__(self, name='', ptype=BasePipe.Type.NAMED,
+                 mode=BasePipe.Mode.DUPLEX, channel=BasePipe.Channel.MESSAGE,
+                 transport=BasePipe.Transport.ASYNCHRONOUS,
+                 view=BasePipe.View.SERVER, instances=0, buf_sz=[0, 0]):
+
+        super(AsyncWinPipe, self).__init__(
+            name, ptype, mode, channel, transport, view, instances, buf_sz
+        )
+
+        if self.ptype != BasePipe.Type.NAMED:
+            raise NotImplementedError('Sorry! This pipe type is a WIP!')
+
+        if self.mode != BasePipe.Mode.DUPLEX:
+            raise NotImplementedError('Sorry! This pipe modes is a WIP!')
+
+        if self.channel == BasePipe.Channel.MESSAGE:
+            self.__channel = _winapi.PIPE_TYPE_MESSAGE | \
+                _winapi.PIPE_READMODE_MESSAGE
+        else:
+            self.__channel = 0
+
+        if self.transport == BasePipe.Transport.SYNCHRONOUS:
+            raise NotImplementedError('Sorry! This transport mode is a WIP!')
+
+        if instances == 0:
+            self.__instances = _winapi.PIPE_UNLIMITED_INSTANCES
+        else:
+            self.__instances = instances
+
+        self.__address = '\\\\.\\pipe\\' + self.name
+        self.__hPipe = None
+        self.__connected = False
+
+        if self.view == BasePipe.View.SERVER:
+            self.__hPipe = PipeHandle(_winapi.CreateNamedPipe(
+                self.__address,
+                _winapi.PIPE_ACCESS_DUPLEX | _winapi.FILE_FLAG_OVERLAPPED,
+                self.__channel | _winapi.PIPE_WAIT,
+                self.__instances,
+                self.buf_sz[1],
+                self.buf_sz[0],
+                _winapi.NMPWAIT_WAIT_FOREVER,
+                _winapi.NULL
+            ))
+
+    def __proactor(self):
+        proactor = getattr(asyncio.get_running_loop(), '_proactor', None)
+        if proactor is None:
+            raise NotImplementedError(
+                'Asynchronous pipes require a proactor event loop!'
+            )
+        return proactor
+
+    def __getPipe(self):
+        if not self.__connected:
+            raise PipeError(
+                'Pipe is not connected!',
+                'name',
+                self.name
+            )
+        return self.__hPipe
+
+    async def __timed(self, aw, timeout):
+        # Timeouts are expressed in milliseconds throughout the ipc module.
+        if timeout <= 0:
+            return await aw
+        try:
+            return await asyncio.wait_for(aw, timeout / 1000.0)
+        except asyncio.TimeoutError:
+            raise PipeTimeoutError(
+                'Connection timeout while awaiting pipe activity!',
+                'event_timeout',
+                timeout
+            )
+
+    async def __connect(self):
+        proactor = self.__proactor()
+        if self.view == BasePipe.View.SERVER:
+            if self.__connected:
+                raise PipeError(
+                    'Pipe instance is already connected!',
+                    'name',
+                    self.name
+                )
+            await proactor.accept_pipe(self.__hPipe)
+        else:
+            try:
+                self.__hPipe = await proactor.connect_pipe(self.__address)
+            except OSError as e:
+                raise PipeError(
+                    'Failed to open named pipe!',
+                    'error_code',
+                    e.winerror
+                )
+            if self.channel == BasePipe.Channel.MESSAGE:
+                _winapi.SetNamedPipeHandleState(
+                    self.__hPipe.fileno(),
+                    _winapi.PIPE_READMODE_MESSAGE,
+                    None,
+                    None
+                )
+        self.__connected = True
+
+    async def connect(self, timeout=0, buf_sz=0):
+        await self.__timed(self.__connect(), timeout)
+        return 0
+
+    # The proactor reads 0 bytes both for a zero length message and for a
+    # client gone; only the former leaves a pipe that can still be peeked.
+    # Returns True for it.
+    def __receiveEmpty(self, hPipe):
+        if self.channel != BasePipe.Channel.MESSAGE:
+            return False
+        try:
+            _winapi.PeekNamedPipe(hPipe.fileno(), 0)
+        except OSError:
+            return False
+        return True
+
+    # Returns None once the peer has hung up.
+    async def __read(self, buf_sz):
+        proactor = self.__proactor()
+        hPipe = self.__getPipe()
+        if buf_sz <= 0:
+            buf_sz = self.sizer.size
+        pipe_data = await proactor.recv(hPipe, buf_sz)
+        if len(pipe_data) == 0 and not self.__receiveEmpty(hPipe):
+            return None
+        if self.channel == BasePipe.Channel.MESSAGE and pipe_data:
+            # The proactor swallows ERROR_MORE_DATA and hands us a partial
+            # message; ask the pipe how much of it is left and fetch the
+            # remainder in a single read.
+            _, left = _winapi.PeekNamedPipe(hPipe.fileno(), 0)
+            if left > 0:
+                pipe_data += await proactor.recv(hPipe, left)
+            self.sizer.observe(len(pipe_data))
+        return pipe_data
+
+    async def read(self, timeout=0, buf_sz=0):
+        try:
+            pipe_data = await self.__timed(self.__read(buf_sz), timeout)
+        except (BrokenPipeError, ConnectionResetError):
+            return 1, 0, b''
+        if pipe_data is None:
+            return 1, 0, b''
+        return 0, len(pipe_data), pipe_data
+
+    # Returns None once the peer has hung up.
+    async def __readInto(self, buffer):
+        proactor = self.__proactor()
+        hPipe = self.__getPipe()
+        read_bytes = await proactor.recv_into(hPipe, buffer)
+        if read_bytes == 0 and len(buffer) > 0:
+            if not self.__receiveEmpty(hPipe):
+                return None
+        if self.channel == BasePipe.Channel.MESSAGE and read_bytes:
+            _, left = _winapi.PeekNamedPipe(hPipe.fileno(), 0)
+            if left > 0:
+                raise PipeError(
+                    'Buffer too small for pipe message!',
+                    'msg_sz',
+                    read_bytes + left
+                )
+        return read_bytes
+
+    async def read_into(self, buffer, timeout=0):
+        try:
+            read_bytes = await self.__timed(self.__readInto(buffer), timeout)
+        except (BrokenPipeError, ConnectionResetError):
+            return 1, 0
+        if read_bytes is None:
+            return 1, 0
+        return 0, read_bytes
+
+    async def write(self, payload, timeout=0, buf_sz=0):
+        proactor = self.__proactor()
+        hPipe = self.__getPipe()
+        if not isinstance(payload, (bytes, bytearray, memoryview)):
+            payload = payload.encode('utf-8')
+        if buf_sz > 0:
+            payload = payload[:buf_sz]
+        try:
+            written_bytes = await self.__timed(
+                proactor.send(hPipe, payload), timeout
+            )
+        except (BrokenPipeError, ConnectionResetError):
+            return 1, 0
+        return 0, written_bytes
+
+    async def write_many(self, payloads, timeout=0):
+        if self.channel == BasePipe.Channel.MESSAGE:
+            written_bytes = 0
+            for payload in payloads:
+                status_code, sent_bytes = await self.write(payload, timeout)
+                if status_code != 0:
+                    return status_code, written_bytes
+                written_bytes += sent_bytes
+            return 0, written_bytes
+        batch = []
+        for payload in payloads:
+            if not isinstance(payload, (bytes, bytearray, memoryview)):
+                payload = payload.encode('utf-8')
+            batch.append(payload)
+        return await self.write(b''.join(batch), timeout)
+
+    # Streams and codecs are sent and read by AsyncBasePipe.
+
+    # The proactor has no TransactNamedPipe counterpart so the request is
+    # written and the reply read as two overlapped calls; the timeout covers
+    # both halves.
+    async def __transact(self, payload, buf_sz):
+        pipe_status, _ = await self.write(payload)
+        if pipe_status != 0:
+            return None
+        return await self.__read(buf_sz)
+
+    async def transact(self, payload, timeout=0, buf_sz=0):
+        if self.transport != BasePipe.Transport.TRANSACTIONAL:
+            raise PipeError(
+                'Pipe transport is not transactional!',
+                'transport',
+                self.transport.value
+            )
+        try:
+            pipe_data = await self.__timed(
+                self.__transact(payload, buf_sz), timeout
+            )
+        except (BrokenPipeError, ConnectionResetError):
+            return 1, 0, b''
+        if pipe_data is None:
+            return 1, 0, b''
+        return 0, len(pipe_data), pipe_data
+
+    # Like WinPipe.cancel the server disconnects its client and the client
+    # cancels its I/O; the proactor then fails the awaiting calls. _winapi
+    # has no CancelIoEx, hence ctypes.
+    def cancel(self):
+        if not self.__connected:
+            return
+        if self.view == BasePipe.View.SERVER:
+            _winapi.DisconnectNamedPipe(self.__hPipe.fileno())
+        else:
+            ctypes.windll.kernel32.CancelIoEx(self.__hPipe.fileno(), None)
+
+    def close(self):
+        if not self.__connected:
+            return
+        self.__connected = False
+        if self.view == BasePipe.View.SERVER:
+            try:
+                _winapi.DisconnectNamedPipe(self.__hPipe.fileno())
+            except OSError as e:
+                # Already disconnected by cancel.
+                if e.winerror != _ERROR_PIPE_NOT_CONNECTED:
+                    raise
+        else:
+            self.__hPipe.close()
+            self.__hPipe = None
+
+    def _instance(self):
+        if self.instances == float('inf'):
+            instances = 0
+        else:
+            instances = self.instances
+        return self.__class__(
+            self.name, self.ptype, self.mode, self.channel, self.transport,
+            self.view, instances, self.buf_sz
+        )
+
+    def _release(self):
+        if self.view == BasePipe.View.SERVER and self.__hPipe is not None:
+            self.__hPipe.close()
+            self.__hPipe = None
+        else:
+            self.close()
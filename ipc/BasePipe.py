@@ -0,0 +1,382 @@
+# Copyright (C) 2014/15 - Iraklis Diakos (hdiakos@outlook.com)
+# Pilavidis Kriton (kriton_pilavidis@outlook.com)
+# All Rights Reserved.
+# You may use, distribute and modify this code under the
+# terms of the ASF 2.0 license.
+#
+
+"""Part of the ipc module."""
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+# Python native libraries.
+from abc import ABCMeta
+from abc import abstractmethod
+from enum import Enum
+import random
+import struct
+
+from crapi.ipc.BufferPool import BufferPool
+from crapi.ipc.BufferSizer import BufferSizer
+from crapi.ipc.PipeError import PipeError
+from crapi.ipc.RawCodec import RawCodec
+
+
+# Streams (see write_stream) are sent as a series of chunks. On message
+# channels every chunk is a message led by one of the two flag bytes below
+# whereas on byte channels every chunk is led by its length and a zero
+# length ends the stream.
+_STREAM_MORE = b'\x00'
+_STREAM_LAST = b'\x01'
+_STREAM_HEADER = struct.Struct(str('!I'))
+
+# Steps of the framing readers of BasePipe (see _streamReader).
+_READ = 'read'
+_FILL = 'fill'
+_YIELD = 'yield'
+
+
+class BasePipe(object):
+
+    __metaclass__ = ABCMeta
+
+    class Type(Enum):
+        ANONYMOUS = 'anonymous'
+        NAMED = 'named'
+        TRANSACTIONAL = 'transactional'
+
+    class Mode(Enum):
+
+        DUPLEX = 'duplex'
+        READ_ONLY = 'read_only'
+        WRITE_ONLY = 'write_only'
+
+    class Channel(Enum):
+
+        BYTE = 'byte'
+        MESSAGE = 'message'
+
+    class Transport(Enum):
+
+        SYNCHRONOUS = 'synchronous'
+        ASYNCHRONOUS = 'asynchronous'
+        TRANSACTIONAL = 'transactional'
+
+    class View(Enum):
+
+        SERVER = 'server'
+        CLIENT = 'client'
+
+    # Receive buffers are shared by every pipe in the process unless a pipe
+    # is given a pool of its own.
+    pool = BufferPool()
+
+    # A PipeMetrics instance every operation reports to; None disables the
+    # instrumentation altogether.
+    metrics = None
+
+    # The PipeCodec used by send and receive.
+    codec = RawCodec()
+
+    # Validation shared by every OS backend. Backends are expected to call
+    # this first and then map the enums above to their native constants.
+    def __init__(self, name='', ptype=Type.NAMED, mode=Mode.DUPLEX,
+                 channel=Channel.MESSAGE, transport=Transport.ASYNCHRONOUS,
+                 view=View.SERVER, instances=0, buf_sz=[0, 0]):
+
+        if name == '':
+            self.name = 'pipe' + str(random.randint(9999, 9999999))
+        else:
+            self.name = name
+
+        # A transactional pipe is a named pipe whose clients transact(); both
+        # spellings end up the same.
+        if ptype == BasePipe.Type.TRANSACTIONAL:
+            ptype = BasePipe.Type.NAMED
+            transport = BasePipe.Transport.TRANSACTIONAL
+        if transport == BasePipe.Transport.TRANSACTIONAL:
+            if channel != BasePipe.Channel.MESSAGE or \
+                    mode != BasePipe.Mode.DUPLEX:
+                raise ValueError(
+                    'Transactions require a duplex message channel!'
+                )
+
+        self.ptype = ptype
+        self.mode = mode
+        self.channel = channel
+        self.transport = transport
+        self.view = view
+        self.buf_sz = list(buf_sz)
+        # Reads without an explicit buf_sz start with a buffer sized after
+        # the messages seen so far; instances of a server pipe share it.
+        self.sizer = BufferSizer()
+
+        if instances < 0:
+            raise ValueError(
+                'Invalid # of instances: Only positive numbers are allowed!'
+            )
+        elif instances == 0:
+            self.instances = float('inf')
+        else:
+            self.instances = instances
+        for sz in buf_sz:
+            if sz < 0:
+                raise ValueError(
+                    'Buffer size cannot be negative!'
+                )
+
+    # One way pipes: READ_ONLY pipes may only read and WRITE_ONLY pipes may
+    # only write. The mode is that of the end it is given to, so a client
+    # with a WRITE_ONLY mode pairs with a READ_ONLY server.
+    def _allow(self, forbidden_mode):
+        if self.mode == forbidden_mode:
+            raise PipeError(
+                'Operation not allowed in this pipe mode!',
+                'mode',
+                self.mode.value
+            )
+
+    @abstractmethod
+    def connect(self, timeout=0, buf_sz=0):
+        pass
+
+    @abstractmethod
+    def read(self, timeout=0, buf_sz=0):
+        pass
+
+    # Reads the next message (or the next bytes of a byte channel) straight
+    # into a caller supplied writable buffer and returns a (status, bytes)
+    # pair. A message that does not fit raises a PipeError.
+    @abstractmethod
+    def read_into(self, buffer, timeout=0):
+        pass
+
+    @abstractmethod
+    def write(self, payload, timeout=0, buf_sz=0):
+        pass
+
+    # Sends a request message and returns the reply as a (status, bytes,
+    # data) triplet in as few system calls as the OS allows. Only pipes of
+    # the TRANSACTIONAL transport support it; the server answers with a
+    # plain write (see ServerPipe.serve).
+    @abstractmethod
+    def transact(self, payload, timeout=0, buf_sz=0):
+        pass
+
+    # Writes a batch of payloads with as few system calls as the channel
+    # allows. Message channels keep one message per payload whereas byte
+    # channels send them back to back in a single vectored write.
+    @abstractmethod
+    def write_many(self, payloads, timeout=0):
+        pass
+
+    # Aborts the operations in flight on the connection; meant to be called
+    # from another thread (e.g. a PipeTimer) to enforce a deadline. The
+    # aborted calls return as if the pipe broke.
+    @abstractmethod
+    def cancel(self):
+        pass
+
+    @abstractmethod
+    def close(self):
+        pass
+
+    # The framing of streams, kept apart from any I/O so that the blocking
+    # pipes and AsyncBasePipe share it. The reader is a generator yielding
+    # (step, value) pairs: _READ asks for the next message to be sent back,
+    # _FILL for the memoryview value to be filled in full and _YIELD hands
+    # value (a chunk of the stream) over to the caller.
+    def _streamReader(self, chunk_size):
+        if self.channel == BasePipe.Channel.MESSAGE:
+            while True:
+                pipe_data = yield _READ, None
+                if len(pipe_data) > 1:
+                    yield _YIELD, pipe_data[1:]
+                if pipe_data[:1] != _STREAM_MORE:
+                    return
+        header = bytearray(_STREAM_HEADER.size)
+        chunk = bytearray(chunk_size)
+        while True:
+            yield _FILL, memoryview(header)
+            frame_sz = _STREAM_HEADER.unpack(bytes(header))[0]
+            if frame_sz == 0:
+                return
+            while frame_sz > 0:
+                read_sz = min(frame_sz, chunk_size)
+                view = memoryview(chunk)[:read_sz]
+                yield _FILL, view
+                yield _YIELD, view.tobytes()
+                frame_sz -= read_sz
+
+    def __streamFrame(self, chunk, last):
+        if self.channel == BasePipe.Channel.MESSAGE:
+            if last:
+                return [_STREAM_LAST + chunk.tobytes()]
+            return [_STREAM_MORE + chunk.tobytes()]
+        batch = [_STREAM_HEADER.pack(len(chunk)), chunk]
+        if last and len(chunk) > 0:
+            batch.append(_STREAM_HEADER.pack(0))
+        return batch
+
+    # The writer yields the batches to write_many along with the number of
+    # payload bytes each of them carries.
+    def _streamWriter(self, payloads, chunk_size):
+        # Chunks are sent one behind so that the last one can be flagged.
+        pending = None
+        for payload in payloads:
+            if not isinstance(payload, (bytes, bytearray, memoryview)):
+                payload = payload.encode('utf-8')
+            view = memoryview(payload)
+            for offset in range(0, len(view), chunk_size):
+                if pending is not None:
+                    yield self.__streamFrame(pending, False), len(pending)
+                pending = view[offset:offset + chunk_size]
+        if pending is None:
+            pending = memoryview(b'')
+        yield self.__streamFrame(pending, True), len(pending)
+
+    # Like _streamReader; the value of the last step is the object.
+    def _objectReader(self):
+        parts = []
+        count = 1
+        while len(parts) < count:
+            if self.channel == BasePipe.Channel.MESSAGE:
+                part = yield _READ, None
+            else:
+                header = bytearray(_STREAM_HEADER.size)
+                yield _FILL, memoryview(header)
+                # Parts are received into writable buffers of their own
+                # which the decoded object may keep using (e.g. out-of-band
+                # pickle buffers).
+                part = bytearray(_STREAM_HEADER.unpack(bytes(header))[0])
+                yield _FILL, memoryview(part)
+            if not parts:
+                count = self.codec.parts(part)
+            parts.append(part)
+        yield _YIELD, self.codec.decode(parts)
+
+    # Returns the batch to write_many for obj along with the bytes framing
+    # adds to it. Every part of an encoded object is a message of its own
+    # on message channels and a length prefixed frame on byte channels so
+    # out-of-band buffers are written as they are.
+    def _objectWriter(self, obj):
+        parts = self.codec.encode(obj)
+        if self.channel == BasePipe.Channel.MESSAGE:
+            return parts, 0
+        batch = []
+        for part in parts:
+            batch.append(_STREAM_HEADER.pack(len(part)))
+            batch.append(part)
+        return batch, _STREAM_HEADER.size * len(parts)
+
+    def _checkChunkSize(self, chunk_size):
+        if chunk_size <= 0:
+            raise ValueError(
+                'Invalid chunk size: Only positive numbers are allowed!'
+            )
+
+    # Reads into view until it is full; returns a (status, bytes) pair where
+    # a broken pipe leaves the view partly filled.
+    def __fill(self, view, timeout):
+        offset = 0
+        while offset < len(view):
+            pipe_status, read_bytes = self.read_into(view[offset:], timeout)
+            if pipe_status != 0:
+                return pipe_status, offset
+            offset += read_bytes
+        return 0, offset
+
+    # Yields the chunks of a stream sent with write_stream as they arrive so
+    # that arbitrarily large payloads can be consumed with bounded memory.
+    # On byte channels no chunk is larger than chunk_size; on message
+    # channels the chunks are the messages the writer sent.
+    def read_stream(self, chunk_size=64 * 1024, timeout=0):
+        self._checkChunkSize(chunk_size)
+        reader = self._streamReader(chunk_size)
+        pipe_data = None
+        while True:
+            try:
+                step, value = reader.send(pipe_data)
+            except StopIteration:
+                return
+            if step == _YIELD:
+                pipe_data = None
+                yield value
+                continue
+            if step == _READ:
+                pipe_status, _, pipe_data = self.read(timeout)
+            else:
+                pipe_status, _ = self.__fill(value, timeout)
+                pipe_data = None
+            if pipe_status != 0:
+                raise PipeError(
+                    'Pipe broke in the middle of a stream!',
+                    'status_code',
+                    pipe_status
+                )
+
+    # Sends obj as encoded by the pipe's codec and returns a (status, bytes)
+    # pair like write, counting the bytes of the encoded object only.
+    def send(self, obj, timeout=0):
+        batch, framing_bytes = self._objectWriter(obj)
+        pipe_status, written_bytes = self.write_many(batch, timeout)
+        return pipe_status, written_bytes - framing_bytes
+
+    # Returns a (status, object) pair; the object is None unless the status
+    # is 0. A pipe breaking in the middle of an object raises a PipeError.
+    def receive(self, timeout=0):
+        reader = self._objectReader()
+        pipe_data = None
+        received = False
+        while True:
+            step, value = reader.send(pipe_data)
+            if step == _YIELD:
+                return 0, value
+            if step == _READ:
+                pipe_status, read_bytes, pipe_data = self.read(timeout)
+            else:
+                pipe_status, read_bytes = self.__fill(value, timeout)
+                pipe_data = None
+            if pipe_status != 0:
+                if received or read_bytes > 0:
+                    raise PipeError(
+                        'Pipe broke in the middle of an object!',
+                        'status_code',
+                        pipe_status
+                    )
+                return pipe_status, None
+            received = True
+
+    # Sends the payloads of an iterable (e.g. a generator reading a file) as
+    # a single stream, cut in chunks of at most chunk_size bytes, and
+    # returns a (status, bytes) pair like write. The reader gets it back,
+    # boundaries intact, from read_stream.
+    def write_stream(self, payloads, timeout=0, chunk_size=64 * 1024):
+        self._checkChunkSize(chunk_size)
+        written_bytes = 0
+        for batch, chunk_bytes in self._streamWriter(payloads, chunk_size):
+            pipe_status, _ = self.write_many(batch, timeout)
+            if pipe_status == 1:
+                return 1, written_bytes
+            written_bytes += chunk_bytes
+        return 0, written_bytes
+
+    # Returns another server instance of the same pipe which may accept a
+    # client concurrently with this one.
+    @abstractmethod
+    def _instance(self):
+        pass
+
+    # Frees every OS resource held by the pipe.
+    @abstractmethod
+    def _release(self):
+        pass
+
+    @abstractmethod
+    def listen():
+        pass
+
+    @abstractmethod
+    def shutdown():
+        pass
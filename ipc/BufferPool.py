@@ -0,0 +1,60 @@
+# Copyright (C) 2014/15 - Iraklis Diakos (hdiakos@outlook.com)
+# Pilavidis Kriton (kriton_pilavidis@outlook.com)
+# All Rights Reserved.
+# You may use, distribute and modify this code under the
+# terms of the ASF 2.0 license.
+#
+
+"""Part of the ipc module."""
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+# Python native libraries.
+import threading
+
+
+class BufferPool(object):
+
+    """A thread-safe pool of reusable receive buffers."""
+
+    """
+        Buffers are bytearrays bucketed in power of two size classes so that
+        a released buffer can serve any later request of the same class.
+        Buffers larger than max_size are never kept around and each class
+        holds at most max_buffers idle buffers.
+    """
+
+    MIN_SIZE = 1024
+
+    def __init__(self, max_buffers=8, max_size=64 * 1024 * 1024):
+        """Default initialization class method."""
+        self.max_buffers = max_buffers
+        self.max_size = max_size
+        self.__free = {}
+        self.__lock = threading.Lock()
+
+    def __sizeClass(self, size):
+        sz = BufferPool.MIN_SIZE
+        while sz < size:
+            sz <<= 1
+        return sz
+
+    def acquire(self, size):
+        """Return a bytearray of at least size bytes."""
+        sz = self.__sizeClass(size)
+        with self.__lock:
+            free = self.__free.get(sz)
+            if free:
+                return free.pop()
+        return bytearray(sz)
+
+    def release(self, buf):
+        """Hand a buffer obtained from acquire() back to the pool."""
+        sz = len(buf)
+        if sz > self.max_size or sz != self.__sizeClass(sz):
+            return
+        with self.__lock:
+            free = self.__free.setdefault(sz, [])
+            if len(free) < self.max_buffers:
+                free.append(buf)
@@ -0,0 +1,76 @@
+# Copyright (C) 2014/15 - Iraklis Diakos (hdiakos@outlook.com)
+# Pilavidis Kriton (kriton_pilavidis@outlook.com)
+# All Rights Reserved.
+# You may use, distribute and modify this code under the
+# terms of the ASF 2.0 license.
+#
+
+"""Part of the ipc module."""
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+# Python native libraries.
+from collections import deque
+
+
+class BufferSizer(object):
+
+    """Learns the size of the next receive buffer from the last messages."""
+
+    """
+        The suggested size is the given percentile of the most recent
+        message sizes rounded up to a power of two (the BufferPool size
+        classes) and kept within [min_size, max_size]. It is recomputed
+        every few observations rather than on each one so that observing
+        stays cheap on the read path.
+    """
+
+    def __init__(self, min_size=1024, max_size=16 * 1024 * 1024, window=64,
+                 percentile=90):
+        """Default initialization class method."""
+        if min_size <= 0 or max_size < min_size:
+            raise ValueError(
+                'Invalid buffer size bounds!'
+            )
+        if window <= 0:
+            raise ValueError(
+                'Invalid window: Only positive numbers are allowed!'
+            )
+        if not 0 < percentile <= 100:
+            raise ValueError(
+                'Invalid percentile: Must be within (0, 100]!'
+            )
+        self.min_size = min_size
+        self.max_size = max_size
+        self.percentile = percentile
+        self.size = min_size
+        self.__sizes = deque(maxlen=window)
+        self.__every = max(window // 8, 1)
+        self.__pending = 0
+
+    def observe(self, msg_sz):
+        self.__sizes.append(msg_sz)
+        self.__pending += 1
+        if self.__pending >= self.__every:
+            self.__pending = 0
+            self.__update()
+
+    def __update(self):
+        sizes = sorted(self.__sizes)
+        wanted = sizes[int(self.percentile / 100.0 * (len(sizes) - 1))]
+        size = self.min_size
+        while size < wanted and size < self.max_size:
+            size <<= 1
+        self.size = min(size, self.max_size)
+
+    def kernel_size(self, buf_sz=0):
+        """Return buf_sz grown to what the recent traffic calls for."""
+        """
+            Meant for the kernel side buffers of new pipe instances; until
+            messages larger than min_size have been seen buf_sz (0 being
+            the OS default) is returned as is.
+        """
+        if self.size > self.min_size and self.size > buf_sz:
+            return self.size
+        return buf_sz
@@ -0,0 +1,224 @@
+# Copyright (C) 2014/15 - Iraklis Diakos (hdiakos@outlook.com)
+# Pilavidis Kriton (kriton_pilavidis@outlook.com)
+# All Rights Reserved.
+# You may use, distribute and modify this code under the
+# terms of the ASF 2.0 license.
+#
+
+"""Part of the ipc module."""
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+# Python native libraries.
+import itertools
+import struct
+import threading
+
+from crapi.ipc.BasePipe import BasePipe
+from crapi.ipc.ClientPipe import ClientPipe
+from crapi.ipc.FramedPipe import FramedPipe
+from crapi.ipc.PipeError import PipeError
+from crapi.ipc.PipeTimeoutError import PipeTimeoutError
+
+
+class ClientPipePool(object):
+
+    """Persistent, multiplexed request/response connections to a server."""
+
+    """
+        Requests travel with an 8 byte, network order request id in front of
+        the payload and the server echoes it in front of its response, so
+        any number of requests may be in flight on one connection and the
+        responses may come back in any order. A receiver thread per
+        connection hands every response to the caller waiting for it.
+        At most size connections (and server pipe instances) are opened,
+        lazily, whenever every open one already has a request in flight.
+        The server side is ClientPipePool.handler wrapped around a function
+        turning a request payload into a response payload.
+    """
+
+    HEADER = struct.Struct(str('!Q'))
+
+    class _Connection(object):
+
+        def __init__(self, pipe):
+            self.pipe = pipe
+            # Serializes writes and guards the broken flag.
+            self.lock = threading.Lock()
+            # Request id -> [done event, response, error].
+            self.pending = {}
+            self.broken = False
+
+    def __init__(self, name, size=4, channel=BasePipe.Channel.MESSAGE,
+                 buf_sz=[0, 0]):
+        """Default initialization class method."""
+        if size <= 0:
+            raise ValueError(
+                'Invalid pool size: Only positive numbers are allowed!'
+            )
+        self.name = name
+        self.size = size
+        self.channel = channel
+        self.buf_sz = list(buf_sz)
+        self.__lock = threading.Lock()
+        self.__connections = []
+        self.__ids = itertools.count(1)
+        self.__closed = False
+
+    def __open(self):
+        pipe = ClientPipe(
+            self.name, channel=self.channel, view=BasePipe.View.CLIENT,
+            buf_sz=self.buf_sz
+        )
+        if self.channel == BasePipe.Channel.BYTE:
+            pipe = FramedPipe(pipe)
+        connection = ClientPipePool._Connection(pipe)
+        receiver = threading.Thread(
+            target=self.__receive, args=(connection,)
+        )
+        receiver.daemon = True
+        receiver.start()
+        return connection
+
+    def __acquire(self):
+        with self.__lock:
+            if self.__closed:
+                raise PipeError(
+                    'Pipe pool is closed!',
+                    'name',
+                    self.name
+                )
+            self.__connections = [
+                connection for connection in self.__connections
+                if not connection.broken
+            ]
+            idlest = None
+            for connection in self.__connections:
+                if idlest is None or \
+                        len(connection.pending) < len(idlest.pending):
+                    idlest = connection
+            if idlest is not None and len(idlest.pending) == 0:
+                return idlest
+            if len(self.__connections) < self.size:
+                connection = self.__open()
+                self.__connections.append(connection)
+                return connection
+            return idlest
+
+    def __fail(self, connection, error):
+        with connection.lock:
+            connection.broken = True
+            for slot in connection.pending.values():
+                slot[2] = error
+                slot[0].set()
+            connection.pending.clear()
+        try:
+            connection.pipe.close()
+        except Exception:
+            pass
+
+    def __receive(self, connection):
+        while not connection.broken:
+            try:
+                pipe_status, _, pipe_data = connection.pipe.read()
+            except Exception as e:
+                self.__fail(connection, e)
+                return
+            if pipe_status != 0:
+                self.__fail(connection, PipeError(
+                    'Pipe broke while awaiting a response!',
+                    'status_code',
+                    pipe_status
+                ))
+                return
+            request_id = ClientPipePool.HEADER.unpack_from(pipe_data)[0]
+            # A request which timed out is no longer waited for.
+            slot = connection.pending.pop(request_id, None)
+            if slot is not None:
+                slot[1] = pipe_data[ClientPipePool.HEADER.size:]
+                slot[0].set()
+
+    def request(self, payload, timeout=0):
+        """Send payload and return the server's response to it."""
+        if not isinstance(payload, (bytes, bytearray, memoryview)):
+            payload = payload.encode('utf-8')
+        connection = self.__acquire()
+        request_id = next(self.__ids)
+        slot = [threading.Event(), None, None]
+        with connection.lock:
+            if connection.broken:
+                raise PipeError(
+                    'Pipe broke while sending the request!',
+                    'name',
+                    self.name
+                )
+            connection.pending[request_id] = slot
+            try:
+                pipe_status, _ = connection.pipe.write(
+                    ClientPipePool.HEADER.pack(request_id) + bytes(payload),
+                    timeout
+                )
+            except Exception:
+                connection.pending.pop(request_id, None)
+                raise
+        if pipe_status == 1:
+            error = PipeError(
+                'Pipe broke while sending the request!',
+                'status_code',
+                pipe_status
+            )
+            self.__fail(connection, error)
+            raise error
+        if timeout > 0:
+            done = slot[0].wait(timeout / 1000.0)
+        else:
+            done = slot[0].wait()
+        if not done:
+            connection.pending.pop(request_id, None)
+            raise PipeTimeoutError(
+                'Connection timeout while awaiting pipe activity!',
+                'event_timeout',
+                timeout
+            )
+        if slot[2] is not None:
+            raise slot[2]
+        return slot[1]
+
+    def close(self):
+        with self.__lock:
+            self.__closed = True
+            connections = self.__connections
+            self.__connections = []
+        for connection in connections:
+            self.__fail(connection, PipeError(
+                'Pipe pool is closed!',
+                'name',
+                self.name
+            ))
+
+    # Returns a ServerPipe.serve handler answering the requests of a pool's
+    # connection with function(request payload) -> response payload until
+    # the client goes away. Responses are sent in the order the requests
+    # arrive.
+    @staticmethod
+    def handler(function):
+        def handle(pipe):
+            if pipe.channel == BasePipe.Channel.BYTE:
+                pipe = FramedPipe(pipe)
+            header_sz = ClientPipePool.HEADER.size
+            while True:
+                pipe_status, _, pipe_data = pipe.read()
+                if pipe_status != 0:
+                    return
+                response = function(pipe_data[header_sz:])
+                if response is None:
+                    response = b''
+                elif not isinstance(response, (bytes, bytearray)):
+                    response = response.encode('utf-8')
+                pipe_status, _ = pipe.write(
+                    bytes(pipe_data[:header_sz]) + bytes(response)
+                )
+                if pipe_status == 1:
+                    return
+        return handle
@@ -0,0 +1,132 @@
+# Copyright (C) 2014/15 - Iraklis Diakos (hdiakos@outlook.com)
+# Pilavidis Kriton (kriton_pilavidis@outlook.com)
+# All Rights Reserved.
+# You may use, distribute and modify this code under the
+# terms of the ASF 2.0 license.
+#
+
+"""Part of the ipc module."""
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+# Python native libraries.
+import threading
+import time
+
+from crapi.ipc.PipeError import PipeError
+
+
+# The flush window is measured on a clock which never goes back.
+_clock = getattr(time, 'monotonic', time.time)
+
+
+class CoalescingWriter(object):
+
+    """Batches small writes into a single write_many call."""
+
+    """
+        Payloads are queued until either max_bytes worth of them are pending
+        or max_delay milliseconds have passed since the oldest one was
+        queued, whichever comes first, and are then flushed with one
+        write_many call on the wrapped pipe. Wrap a FramedPipe (or a message
+        channel pipe) so that message boundaries survive the batching.
+    """
+
+    def __init__(self, pipe, max_bytes=64 * 1024, max_delay=5):
+        """Default initialization class method."""
+        if max_bytes <= 0 or max_delay < 0:
+            raise ValueError(
+                'Coalescing window must be positive!'
+            )
+        self.pipe = pipe
+        self.max_bytes = max_bytes
+        self.max_delay = max_delay
+        self.__pending = []
+        self.__pending_sz = 0
+        self.__since = None
+        self.__error = None
+        self.__closed = False
+        self.__lock = threading.Lock()
+        self.__wakeup = threading.Condition(self.__lock)
+        self.__flusher = threading.Thread(target=self.__run)
+        self.__flusher.daemon = True
+        self.__flusher.start()
+
+    def __run(self):
+        # Flushes whatever has been waiting for longer than max_delay.
+        with self.__lock:
+            while not self.__closed:
+                if self.__since is None:
+                    self.__wakeup.wait()
+                    continue
+                left = self.__since + self.max_delay / 1000.0 - _clock()
+                if left > 0:
+                    self.__wakeup.wait(left)
+                    continue
+                # Nobody is there to get the status of a timed flush; keep
+                # a broken pipe for the next write, flush or close instead.
+                try:
+                    status_code, _ = self.__flush()
+                    if status_code == 1:
+                        raise PipeError(
+                            'Pipe broke while flushing coalesced payloads!',
+                            'status_code',
+                            status_code
+                        )
+                except Exception as e:
+                    self.__error = e
+
+    def __raise(self):
+        if self.__error is not None:
+            error, self.__error = self.__error, None
+            raise error
+        if self.__closed:
+            raise PipeError(
+                'Writer has been closed!',
+                'pipe',
+                self.pipe
+            )
+
+    def __flush(self):
+        # Must be called with the lock held.
+        if not self.__pending:
+            return 0, 0
+        batch = self.__pending
+        self.__pending = []
+        self.__pending_sz = 0
+        self.__since = None
+        return self.pipe.write_many(batch)
+
+    def write(self, payload):
+        if not isinstance(payload, (bytes, bytearray, memoryview)):
+            payload = payload.encode('utf-8')
+        with self.__lock:
+            self.__raise()
+            self.__pending.append(payload)
+            self.__pending_sz += len(payload)
+            if self.__pending_sz >= self.max_bytes:
+                return self.__flush()
+            if self.__since is None:
+                self.__since = _clock()
+                self.__wakeup.notify()
+        return 0, 0
+
+    def flush(self):
+        with self.__lock:
+            self.__raise()
+            return self.__flush()
+
+    def close(self):
+        with self.__lock:
+            if self.__closed:
+                return 0, 0
+            self.__closed = True
+            self.__wakeup.notify()
+            error, self.__error = self.__error, None
+            if error is None:
+                result = self.__flush()
+        self.__flusher.join()
+        if error is not None:
+            raise error
+        return result
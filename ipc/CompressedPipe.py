@@ -0,0 +1,225 @@
+# Copyright (C) 2014/15 - Iraklis Diakos (hdiakos@outlook.com)
+# Pilavidis Kriton (kriton_pilavidis@outlook.com)
+# All Rights Reserved.
+# You may use, distribute and modify this code under the
+# terms of the ASF 2.0 license.
+#
+
+"""Part of the ipc module."""
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+# Python native libraries.
+import struct
+import zlib
+try:
+    import lzma
+except ImportError:
+    lzma = None
+
+from crapi.ipc.BasePipe import BasePipe
+from crapi.ipc.FramedPipe import FramedPipe
+from crapi.ipc.PipeError import PipeError
+
+
+class CompressedPipe(object):
+
+    """Per connection, negotiated payload compression."""
+
+    """
+        Wraps a pipe keeping message boundaries: a message channel pipe or
+        a FramedPipe. Right after connecting the client offers the
+        algorithms it is willing to use and the server picks the first one
+        it supports. From then on every message carries a small header
+        with a compressed flag and the uncompressed length, which lets the
+        reader decompress into a buffer of the exact size. Messages shorter
+        than threshold bytes (or which do not shrink) go uncompressed.
+        A server accepting a client which does not wrap its pipe (no offer)
+        falls back to plain messages so old clients keep working. Since the
+        length comes from the peer, messages claiming more than max_size
+        bytes are refused; a max_size of 0 means no limit.
+    """
+
+    HELLO = b'\x00crapi/compress\x00'
+    HEADER = struct.Struct(str('!BI'))
+
+    def __init__(self, pipe, algorithms=('zlib', 'lzma'), threshold=1024,
+                 level=None, max_size=64 * 1024 * 1024):
+        """Default initialization class method."""
+        if isinstance(pipe, FramedPipe):
+            base = pipe.pipe
+        elif pipe.channel == BasePipe.Channel.MESSAGE:
+            base = pipe
+        else:
+            raise ValueError(
+                'Compression requires message boundaries: Use a message '
+                'channel or a FramedPipe!'
+            )
+        if threshold < 0:
+            raise ValueError(
+                'Threshold cannot be negative!'
+            )
+        if max_size < 0:
+            raise ValueError(
+                'Maximum size cannot be negative!'
+            )
+        self.pipe = pipe
+        self.name = base.name
+        self.view = base.view
+        self.algorithms = [
+            algorithm for algorithm in algorithms
+            if algorithm == 'zlib' or (algorithm == 'lzma' and lzma)
+        ]
+        self.threshold = threshold
+        self.level = level
+        self.max_size = max_size
+        # The algorithm in use; None until negotiated (or if declined).
+        self.algorithm = None
+        # An old client's first message, read while looking for an offer.
+        self.__pending = None
+
+    def __compress(self, payload):
+        if self.algorithm == 'zlib':
+            if self.level is None:
+                return zlib.compress(payload)
+            return zlib.compress(payload, self.level)
+        if self.level is None:
+            return lzma.compress(payload)
+        return lzma.compress(payload, preset=self.level)
+
+    def __checkSize(self, msg_sz):
+        if self.max_size > 0 and msg_sz > self.max_size:
+            raise PipeError(
+                'Message exceeds the maximum size!',
+                'msg_sz',
+                msg_sz,
+                'max_size',
+                self.max_size
+            )
+
+    def __decompress(self, data, msg_sz):
+        # Never inflates past the length announced in the header, so a
+        # small message cannot expand into a huge one either.
+        if self.algorithm == 'zlib':
+            decompressor = zlib.decompressobj()
+        else:
+            decompressor = lzma.LZMADecompressor()
+        # A max_length of 0 means no limit to zlib.
+        pipe_data = decompressor.decompress(data, max(msg_sz, 1))
+        if not decompressor.eof or len(pipe_data) != msg_sz:
+            raise PipeError(
+                'Compressed message does not match its length!',
+                'msg_sz',
+                msg_sz
+            )
+        return pipe_data
+
+    def __expect(self, timeout):
+        pipe_status, _, pipe_data = self.pipe.read(timeout)
+        if pipe_status != 0:
+            raise PipeError(
+                'Pipe broke while negotiating compression!',
+                'status_code',
+                pipe_status
+            )
+        return pipe_data
+
+    def __offer(self, pipe_data):
+        return pipe_data[:len(CompressedPipe.HELLO)] == CompressedPipe.HELLO
+
+    # Runs the negotiation on a connected pipe, e.g. one handed to a
+    # ServerPipe.serve handler. Returns the algorithm agreed upon or None.
+    def negotiate(self, timeout=0):
+        hello_sz = len(CompressedPipe.HELLO)
+        if self.view == BasePipe.View.CLIENT:
+            offer = ','.join(self.algorithms).encode('ascii')
+            pipe_status, _ = self.pipe.write(
+                CompressedPipe.HELLO + offer, timeout
+            )
+            if pipe_status == 1:
+                raise PipeError(
+                    'Pipe broke while negotiating compression!',
+                    'status_code',
+                    pipe_status
+                )
+            pipe_data = self.__expect(timeout)
+            if not self.__offer(pipe_data):
+                raise PipeError(
+                    'Peer does not support compression!',
+                    'name',
+                    self.name
+                )
+            chosen = bytes(pipe_data[hello_sz:]).decode('ascii')
+        else:
+            pipe_data = self.__expect(timeout)
+            if not self.__offer(pipe_data):
+                self.__pending = pipe_data
+                return None
+            offer = bytes(pipe_data[hello_sz:]).decode('ascii').split(',')
+            chosen = ''
+            for algorithm in offer:
+                if algorithm in self.algorithms:
+                    chosen = algorithm
+                    break
+            pipe_status, _ = self.pipe.write(
+                CompressedPipe.HELLO + chosen.encode('ascii'), timeout
+            )
+            if pipe_status == 1:
+                raise PipeError(
+                    'Pipe broke while negotiating compression!',
+                    'status_code',
+                    pipe_status
+                )
+        self.algorithm = chosen or None
+        return self.algorithm
+
+    def connect(self, timeout=0, buf_sz=0):
+        status_code = self.pipe.connect(timeout, buf_sz)
+        self.negotiate(timeout)
+        return status_code
+
+    def read(self, timeout=0):
+        if self.__pending is not None:
+            pipe_data, self.__pending = self.__pending, None
+            return 0, len(pipe_data), pipe_data
+        if self.algorithm is None:
+            return self.pipe.read(timeout)
+        pipe_status, _, pipe_data = self.pipe.read(timeout)
+        if pipe_status != 0:
+            return pipe_status, 0, pipe_data
+        compressed, msg_sz = CompressedPipe.HEADER.unpack_from(pipe_data)
+        self.__checkSize(msg_sz)
+        body = memoryview(pipe_data)[CompressedPipe.HEADER.size:]
+        if compressed:
+            pipe_data = self.__decompress(body, msg_sz)
+        else:
+            pipe_data = body.tobytes()
+        return 0, msg_sz, pipe_data
+
+    def write(self, payload, timeout=0):
+        if not isinstance(payload, (bytes, bytearray, memoryview)):
+            payload = payload.encode('utf-8')
+        if self.algorithm is None:
+            return self.pipe.write(payload, timeout)
+        payload_sz = len(payload)
+        compressed = 0
+        body = payload
+        if payload_sz >= self.threshold:
+            body = self.__compress(payload)
+            if len(body) < payload_sz:
+                compressed = 1
+            else:
+                body = payload
+        header = CompressedPipe.HEADER.pack(compressed, payload_sz)
+        if isinstance(self.pipe, FramedPipe):
+            pipe_status, _ = self.pipe.write_parts([header, body], timeout)
+        else:
+            # A message has to go out in one piece; this is its only copy.
+            pipe_status, _ = self.pipe.write(b''.join((header, body)), timeout)
+        if pipe_status == 1:
+            return pipe_status, 0
+        return pipe_status, payload_sz
+
+    def close(self):
+        return self.pipe.close()
@@ -0,0 +1,157 @@
+# Copyright (C) 2014/15 - Iraklis Diakos (hdiakos@outlook.com)
+# Pilavidis Kriton (kriton_pilavidis@outlook.com)
+# All Rights Reserved.
+# You may use, distribute and modify this code under the
+# terms of the ASF 2.0 license.
+#
+
+"""Part of the ipc module."""
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+# Python native libraries.
+import struct
+
+from crapi.ipc.BasePipe import BasePipe
+from crapi.ipc.PipeError import PipeError
+
+
+class FramedPipe(object):
+
+    """Message semantics on top of a byte channel pipe."""
+
+    """
+        Every message travels as a frame made of a 4 byte, network order
+        length header followed by the payload. Knowing the length up front
+        lets the reader allocate the exact buffer once and fill it in place.
+        A max_frame_sz of 0 means frames are only limited by the header.
+    """
+
+    HEADER = struct.Struct(str('!I'))
+
+    def __init__(self, pipe, max_frame_sz=0):
+        """Default initialization class method."""
+        if pipe.channel != BasePipe.Channel.BYTE:
+            raise ValueError(
+                'Framing requires a byte channel pipe!'
+            )
+        if max_frame_sz < 0:
+            raise ValueError(
+                'Frame size cannot be negative!'
+            )
+        self.pipe = pipe
+        self.max_frame_sz = max_frame_sz
+        self.__header = bytearray(FramedPipe.HEADER.size)
+
+    def __checkFrame(self, frame_sz):
+        if self.max_frame_sz > 0 and frame_sz > self.max_frame_sz:
+            raise PipeError(
+                'Frame exceeds the maximum frame size!',
+                'frame_sz',
+                frame_sz,
+                'max_frame_sz',
+                self.max_frame_sz
+            )
+
+    def __fill(self, view, timeout):
+        # Keeps reading until the view is full or the pipe breaks. The
+        # timeout only guards the wait for the first byte; once a frame is
+        # underway giving up would leave the stream out of sync.
+        offset = 0
+        while offset < len(view):
+            pipe_status, read_bytes = self.pipe.read_into(
+                view[offset:], timeout
+            )
+            if pipe_status != 0:
+                return pipe_status, offset
+            offset += read_bytes
+            timeout = 0
+        return 0, offset
+
+    def __readHeader(self, timeout):
+        pipe_status, read_bytes = self.__fill(
+            memoryview(self.__header), timeout
+        )
+        if pipe_status != 0:
+            return pipe_status, None
+        frame_sz = FramedPipe.HEADER.unpack_from(self.__header)[0]
+        self.__checkFrame(frame_sz)
+        return 0, frame_sz
+
+    def connect(self, timeout=0, buf_sz=0):
+        return self.pipe.connect(timeout, buf_sz)
+
+    # The payload is returned as the very bytearray it was received into.
+    def read(self, timeout=0):
+        pipe_status, frame_sz = self.__readHeader(timeout)
+        if pipe_status != 0:
+            return pipe_status, 0, bytearray()
+        pipe_data = bytearray(frame_sz)
+        pipe_status, read_bytes = self.__fill(memoryview(pipe_data), 0)
+        if pipe_status != 0:
+            return pipe_status, read_bytes, pipe_data[:read_bytes]
+        return 0, read_bytes, pipe_data
+
+    def read_into(self, buffer, timeout=0):
+        pipe_status, frame_sz = self.__readHeader(timeout)
+        if pipe_status != 0:
+            return pipe_status, 0
+        if frame_sz > len(buffer):
+            # The header is gone already so the frame cannot be left for a
+            # later, bigger buffer.
+            raise PipeError(
+                'Buffer too small for pipe message!',
+                'msg_sz',
+                frame_sz
+            )
+        return self.__fill(memoryview(buffer)[:frame_sz], 0)
+
+    def __frames(self, payloads):
+        # Headers and payloads are handed over as separate buffers so the
+        # payload is never copied just to glue a header in front of it.
+        batch = []
+        for payload in payloads:
+            if not isinstance(payload, (bytes, bytearray, memoryview)):
+                payload = payload.encode('utf-8')
+            self.__checkFrame(len(payload))
+            batch.append(FramedPipe.HEADER.pack(len(payload)))
+            batch.append(payload)
+        return batch
+
+    def __send(self, batch, timeout):
+        # Counts payload bytes only, like read does, leaving the headers
+        # out; a broken pipe counts none since frames may be cut short.
+        pipe_status, _ = self.pipe.write_many(batch, timeout)
+        if pipe_status == 1:
+            return pipe_status, 0
+        return pipe_status, sum(len(payload) for payload in batch[1::2])
+
+    def write(self, payload, timeout=0):
+        return self.__send(self.__frames([payload]), timeout)
+
+    def write_many(self, payloads, timeout=0):
+        return self.__send(self.__frames(payloads), timeout)
+
+    # Sends the buffers in parts as a single frame, e.g. a header of the
+    # caller's own and a payload, without joining them first.
+    def write_parts(self, parts, timeout=0):
+        batch = []
+        for part in parts:
+            if not isinstance(part, (bytes, bytearray, memoryview)):
+                part = part.encode('utf-8')
+            batch.append(part)
+        frame_sz = sum(len(part) for part in batch)
+        self.__checkFrame(frame_sz)
+        pipe_status, _ = self.pipe.write_many(
+            [FramedPipe.HEADER.pack(frame_sz)] + batch, timeout
+        )
+        if pipe_status == 1:
+            return pipe_status, 0
+        return pipe_status, frame_sz
+
+    def cancel(self):
+        return self.pipe.cancel()
+
+    def close(self):
+        return self.pipe.close()
@@ -0,0 +1,45 @@
+# Copyright (C) 2014/15 - Iraklis Diakos (hdiakos@outlook.com)
+# Pilavidis Kriton (kriton_pilavidis@outlook.com)
+# All Rights Reserved.
+# You may use, distribute and modify this code under the
+# terms of the ASF 2.0 license.
+#
+
+"""Part of the ipc module."""
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+# Python 3rd party libraries.
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+from crapi.ipc.PipeCodec import PipeCodec
+
+
+class MsgpackCodec(PipeCodec):
+
+    """Compact, language neutral binary encoding of plain data."""
+
+    """
+        Needs the msgpack package (pip install crapi[msgpack]). Text and
+        binary strings are kept apart so bytes come back as bytes.
+    """
+
+    def __init__(self):
+        """Default initialization class method."""
+        if msgpack is None:
+            raise ImportError(
+                'The msgpack codec requires the msgpack package!'
+            )
+
+    def encode(self, obj):
+        return [msgpack.packb(obj, use_bin_type=True)]
+
+    def parts(self, head):
+        return 1
+
+    def decode(self, parts):
+        return msgpack.unpackb(parts[0], raw=False)
@@ -0,0 +1,65 @@
+# Copyright (C) 2014/15 - Iraklis Diakos (hdiakos@outlook.com)
+# Pilavidis Kriton (kriton_pilavidis@outlook.com)
+# All Rights Reserved.
+# You may use, distribute and modify this code under the
+# terms of the ASF 2.0 license.
+#
+
+"""Part of the ipc module."""
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+# Python native libraries.
+import pickle
+import struct
+
+from crapi.ipc.PipeCodec import PipeCodec
+
+
+class PickleCodec(PipeCodec):
+
+    """Pickles objects, sending large buffers out-of-band."""
+
+    """
+        With pickle protocol 5 (Python 3.8+) objects supporting it, such as
+        numpy arrays, hand their contiguous buffers over to be sent as parts
+        of their own instead of being copied into the pickle stream; the
+        receiver rebuilds them on top of the received buffers. Older
+        protocols pickle everything in-band.
+        Unpickling runs arbitrary code: only use it between trusted peers.
+    """
+
+    COUNT = struct.Struct(str('!I'))
+
+    def __init__(self, protocol=pickle.HIGHEST_PROTOCOL):
+        """Default initialization class method."""
+        self.protocol = protocol
+
+    def encode(self, obj):
+        if self.protocol < 5:
+            return [
+                PickleCodec.COUNT.pack(0) + pickle.dumps(obj, self.protocol)
+            ]
+        buffers = []
+
+        def outOfBand(pickle_buffer):
+            # Non-contiguous buffers cannot be sent as they are; returning
+            # True pickles those in-band.
+            try:
+                buffers.append(pickle_buffer.raw())
+            except BufferError:
+                return True
+            return False
+
+        head = pickle.dumps(obj, self.protocol, buffer_callback=outOfBand)
+        return [PickleCodec.COUNT.pack(len(buffers)) + head] + buffers
+
+    def parts(self, head):
+        return 1 + PickleCodec.COUNT.unpack_from(head)[0]
+
+    def decode(self, parts):
+        head = memoryview(parts[0])[PickleCodec.COUNT.size:]
+        if len(parts) == 1:
+            return pickle.loads(head)
+        return pickle.loads(head, buffers=parts[1:])
@@ -0,0 +1,44 @@
+# Copyright (C) 2014/15 - Iraklis Diakos (hdiakos@outlook.com)
+# Pilavidis Kriton (kriton_pilavidis@outlook.com)
+# All Rights Reserved.
+# You may use, distribute and modify this code under the
+# terms of the ASF 2.0 license.
+#
+
+"""Part of the ipc module."""
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+# Python native libraries.
+from abc import ABCMeta
+from abc import abstractmethod
+
+
+class PipeCodec(object):
+
+    """Turns objects into pipe payloads and back (see BasePipe.send)."""
+
+    """
+        An object is encoded into one or more parts: a head, which tells
+        how many parts follow it, and optionally buffers sent as they are
+        (out-of-band) so that large binary data is never copied into the
+        head. Every part travels as a message (or frame) of its own.
+    """
+
+    __metaclass__ = ABCMeta
+
+    @abstractmethod
+    def encode(self, obj):
+        """Return the list of parts (bytes-like objects) of obj."""
+        pass
+
+    @abstractmethod
+    def parts(self, head):
+        """Return the number of parts of an object given its head."""
+        pass
+
+    @abstractmethod
+    def decode(self, parts):
+        """Return the object made of parts."""
+        pass
@@ -0,0 +1,23 @@
+# Copyright (C) 2014/15 - Iraklis Diakos (hdiakos@outlook.com)
+# Pilavidis Kriton (kriton_pilavidis@outlook.com)
+# All Rights Reserved.
+# You may use, distribute and modify this code under the
+# terms of the ASF 2.0 license.
+#
+
+"""Part of the ipc module."""
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+# Python native libraries.
+import sys
+
+# Event engines multiplexing every instance of a ServerPipe over a handful
+# of worker threads: an I/O completion port on Windows and epoll on Linux.
+# Both expose serve(pipe, handler, instances, session_timeout, idle_timeout)
+# and shutdown().
+if sys.platform == 'win32':
+    from crapi.ipc.WinPipeEngine import WinPipeEngine as PipeEngine
+else:
+    from crapi.ipc.UnixPipeEngine import UnixPipeEngine as PipeEngine
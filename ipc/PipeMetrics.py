@@ -0,0 +1,142 @@
+# Copyright (C) 2014/15 - Iraklis Diakos (hdiakos@outlook.com)
+# Pilavidis Kriton (kriton_pilavidis@outlook.com)
+# All Rights Reserved.
+# You may use, distribute and modify this code under the
+# terms of the ASF 2.0 license.
+#
+
+"""Part of the ipc module."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+# Python native libraries.
+import functools
+import json
+import threading
+import time
+
+from crapi.ipc.PipeTimeoutError import PipeTimeoutError
+
+
+# Latencies must not be skewed by wall clock adjustments.
+_clock = getattr(time, 'monotonic', time.time)
+
+
+class PipeMetrics(object):
+
+    """Counters, gauges and latency histograms of pipe operations."""
+
+    """
+        Pipes report to the PipeMetrics object found in their metrics
+        attribute, which is None (disabled) by default. Assign one to a pipe
+        or to BasePipe.metrics to cover every pipe in the process; instances
+        created by a ServerPipe inherit the one of their parent.
+        Latencies are kept in power of two buckets of microseconds so that
+        recording is O(1) and the memory use is fixed.
+    """
+
+    BUCKETS = 40
+
+    def __init__(self):
+        """Default initialization class method."""
+        self.__lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.__lock:
+            self.__counters = {}
+            self.__gauges = {}
+            self.__latency = {}
+
+    def count(self, name, n=1):
+        with self.__lock:
+            self.__counters[name] = self.__counters.get(name, 0) + n
+
+    def gauge(self, name, value):
+        with self.__lock:
+            self.__gauges[name] = value
+
+    def observe(self, operation, seconds):
+        us = int(seconds * 1e6)
+        bucket = min(us.bit_length(), PipeMetrics.BUCKETS - 1)
+        with self.__lock:
+            stats = self.__latency.get(operation)
+            if stats is None:
+                stats = [0, 0, 0, [0] * PipeMetrics.BUCKETS]
+                self.__latency[operation] = stats
+            stats[0] += 1
+            stats[1] += us
+            stats[2] = max(stats[2], us)
+            stats[3][bucket] += 1
+
+    def __percentile(self, buckets, total, pct):
+        # Upper bound of the bucket holding the requested rank.
+        rank = pct / 100.0 * total
+        seen = 0
+        for bucket, hits in enumerate(buckets):
+            seen += hits
+            if hits and seen >= rank:
+                return (1 << bucket) - 1 if bucket else 0
+        return 0
+
+    def snapshot(self, reset=False):
+        """Return a JSON serializable copy of everything recorded so far."""
+        with self.__lock:
+            counters = dict(self.__counters)
+            gauges = dict(self.__gauges)
+            latency = {}
+            for operation, stats in self.__latency.items():
+                total, sum_us, max_us, buckets = stats
+                latency[operation] = {
+                    'count': total,
+                    'mean_us': sum_us / total,
+                    'max_us': max_us,
+                    'p50_us': self.__percentile(buckets, total, 50),
+                    'p99_us': self.__percentile(buckets, total, 99),
+                    'buckets_us': dict(
+                        ((1 << bucket) - 1 if bucket else 0, hits)
+                        for bucket, hits in enumerate(buckets) if hits
+                    ),
+                }
+            if reset:
+                self.__counters = {}
+                self.__gauges = {}
+                self.__latency = {}
+        return {'counters': counters, 'gauges': gauges, 'latency': latency}
+
+    def export(self, reset=False):
+        return json.dumps(self.snapshot(reset), sort_keys=True)
+
+
+def instrumented(operation, bytes_counter=None):
+    """Decorate a pipe operation so that it reports to pipe.metrics."""
+    """
+        Pipe operations return a (status, bytes, ...) tuple: a status of 1
+        is a broken pipe and the bytes are added to bytes_counter if given.
+        With metrics disabled the only cost is an attribute lookup.
+    """
+    def decorate(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            metrics = self.metrics
+            if metrics is None:
+                return method(self, *args, **kwargs)
+            start = _clock()
+            try:
+                result = method(self, *args, **kwargs)
+            except PipeTimeoutError:
+                metrics.count(operation + '_timeouts')
+                raise
+            finally:
+                metrics.observe(operation, _clock() - start)
+            metrics.count(operation)
+            if isinstance(result, tuple):
+                if result[0] == 1:
+                    metrics.count('broken_pipes')
+                if bytes_counter is not None:
+                    metrics.count(bytes_counter, result[1])
+            return result
+        return wrapper
+    return decorate
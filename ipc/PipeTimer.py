@@ -0,0 +1,148 @@
+# Copyright (C) 2014/15 - Iraklis Diakos (hdiakos@outlook.com)
+# Pilavidis Kriton (kriton_pilavidis@outlook.com)
+# All Rights Reserved.
+# You may use, distribute and modify this code under the
+# terms of the ASF 2.0 license.
+#
+
+"""Part of the ipc module."""
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+# Python native libraries.
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+
+
+_log = logging.getLogger(__name__)
+
+# Deadlines must not move with the wall clock.
+_clock = getattr(time, 'monotonic', time.time)
+
+
+class PipeTimer(object):
+
+    """Calls back once deadlines pass, all from a single thread."""
+
+    """
+        Deadlines are kept in a binary heap watched by one thread, so any
+        number of connections can have a deadline pending at the cost of an
+        O(log n) push each instead of a thread or a wait of their own.
+        Cancelling only marks the entry; cancelled entries are dropped as
+        they reach the top of the heap, or all at once when they make up
+        most of it. Callbacks run on the timer thread and should be quick,
+        e.g. cancelling the I/O of a pipe (see cancel on the pipes).
+    """
+
+    __shared = None
+    __sharedLock = threading.Lock()
+
+    def __init__(self):
+        """Default initialization class method."""
+        # Entries are [deadline, sequence, callback, args]; the sequence
+        # keeps equal deadlines in order and the callbacks out of compares.
+        self.__heap = []
+        self.__sequence = itertools.count()
+        self.__cancelled = 0
+        self.__closed = False
+        self.__lock = threading.Lock()
+        self.__wakeup = threading.Condition(self.__lock)
+        self.__thread = None
+
+    @classmethod
+    def shared(cls):
+        """Return the timer shared by every pipe server of the process."""
+        with cls.__sharedLock:
+            if cls.__shared is None:
+                cls.__shared = cls()
+            return cls.__shared
+
+    # A forked child (e.g. a ServerPipe worker process) inherits the shared
+    # timer without its thread and maybe with its locks held by threads
+    # which no longer exist; it starts over with a timer of its own.
+    @classmethod
+    def _afterFork(cls):
+        cls.__sharedLock = threading.Lock()
+        cls.__shared = None
+
+    def __run(self):
+        with self.__lock:
+            while not self.__closed:
+                if not self.__heap:
+                    self.__wakeup.wait()
+                    continue
+                entry = self.__heap[0]
+                if entry[2] is None:
+                    heapq.heappop(self.__heap)
+                    self.__cancelled -= 1
+                    continue
+                left = entry[0] - _clock()
+                if left > 0:
+                    self.__wakeup.wait(left)
+                    continue
+                heapq.heappop(self.__heap)
+                callback, args = entry[2], entry[3]
+                entry[2] = entry[3] = None
+                self.__lock.release()
+                try:
+                    callback(*args)
+                except Exception:
+                    _log.exception('Pipe timer callback failed!')
+                finally:
+                    self.__lock.acquire()
+
+    # Calls callback(*args) timeout milliseconds from now and returns the
+    # entry to cancel it with.
+    def schedule(self, timeout, callback, *args):
+        entry = [_clock() + timeout / 1000.0, None, callback, args]
+        with self.__lock:
+            if self.__closed:
+                raise ValueError(
+                    'Timer has been closed!'
+                )
+            entry[1] = next(self.__sequence)
+            if self.__thread is None:
+                self.__thread = threading.Thread(target=self.__run)
+                self.__thread.daemon = True
+                self.__thread.start()
+            heapq.heappush(self.__heap, entry)
+            # Only an earlier deadline changes how long the thread sleeps.
+            if self.__heap[0] is entry:
+                self.__wakeup.notify()
+        return entry
+
+    # Returns False if the callback already ran (or is running).
+    def cancel(self, entry):
+        with self.__lock:
+            if entry[2] is None:
+                return False
+            entry[2] = entry[3] = None
+            self.__cancelled += 1
+            if self.__cancelled > 64 and \
+                    self.__cancelled > len(self.__heap) // 2:
+                self.__heap = [item for item in self.__heap if item[2]]
+                heapq.heapify(self.__heap)
+                self.__cancelled = 0
+        return True
+
+    def pending(self):
+        """Return the number of callbacks still to run."""
+        with self.__lock:
+            return len(self.__heap) - self.__cancelled
+
+    def close(self):
+        with self.__lock:
+            self.__closed = True
+            self.__wakeup.notify()
+        if self.__thread is not None and \
+                self.__thread is not threading.current_thread():
+            self.__thread.join()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=PipeTimer._afterFork)
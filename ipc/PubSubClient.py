@@ -0,0 +1,77 @@
+# Copyright (C) 2014/15 - Iraklis Diakos (hdiakos@outlook.com)
+# Pilavidis Kriton (kriton_pilavidis@outlook.com)
+# All Rights Reserved.
+# You may use, distribute and modify this code under the
+# terms of the ASF 2.0 license.
+#
+
+"""Part of the ipc module."""
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from crapi.ipc.FramedPipe import FramedPipe
+from crapi.ipc.PubSubServerPipe import PubSubServerPipe
+
+
+class PubSubClient(object):
+
+    """The subscriber end of a PubSubServerPipe."""
+
+    """
+        Wraps a client pipe connected to a publisher: a message channel
+        pipe or, for byte channel publishers, a FramedPipe. Topics are
+        picked with subscribe/unsubscribe and published messages come back
+        from receive, decoded with codec (the pipe codec by default).
+    """
+
+    def __init__(self, pipe, codec=None):
+        """Default initialization class method."""
+        if codec is None:
+            if isinstance(pipe, FramedPipe):
+                codec = pipe.pipe.codec
+            else:
+                codec = pipe.codec
+        self.pipe = pipe
+        self.codec = codec
+
+    def __request(self, action, topics):
+        for topic in topics:
+            if not isinstance(topic, bytes):
+                topic = topic.encode('utf-8')
+            pipe_status, _ = self.pipe.write(action + topic)
+            if pipe_status == 1:
+                return pipe_status
+        return 0
+
+    def subscribe(self, *topics):
+        """Subscribe to topics; return the pipe status."""
+        return self.__request(PubSubServerPipe.SUBSCRIBE, topics)
+
+    def unsubscribe(self, *topics):
+        """Unsubscribe from topics; return the pipe status."""
+        return self.__request(PubSubServerPipe.UNSUBSCRIBE, topics)
+
+    # Reads the next message published to the subscriber and returns it as
+    # (status, topic, obj). The parts handed to the codec are views of the
+    # message read.
+    def receive(self, timeout=0):
+        pipe_status, _, pipe_data = self.pipe.read(timeout)
+        if pipe_status != 0:
+            return pipe_status, None, None
+        view = memoryview(pipe_data)
+        topic_sz, count = PubSubServerPipe.HEADER.unpack_from(view)
+        offset = PubSubServerPipe.HEADER.size
+        topic = view[offset:offset + topic_sz].tobytes().decode('utf-8')
+        offset += topic_sz
+        parts = []
+        for _ in range(count):
+            part_sz = PubSubServerPipe.PART.unpack_from(view, offset)[0]
+            offset += PubSubServerPipe.PART.size
+            parts.append(view[offset:offset + part_sz])
+            offset += part_sz
+        return 0, topic, self.codec.decode(parts)
+
+    def close(self):
+        return self.pipe.close()
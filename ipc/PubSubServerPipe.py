@@ -0,0 +1,204 @@
+# Copyright (C) 2014/15 - Iraklis Diakos (hdiakos@outlook.com)
+# Pilavidis Kriton (kriton_pilavidis@outlook.com)
+# All Rights Reserved.
+# You may use, distribute and modify this code under the
+# terms of the ASF 2.0 license.
+#
+
+"""Part of the ipc module."""
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+# Python native libraries.
+import struct
+import threading
+
+from crapi.ipc.BasePipe import BasePipe
+from crapi.ipc.FramedPipe import FramedPipe
+from crapi.ipc.PipeError import PipeError
+from crapi.ipc.SendQueue import SendQueue
+from crapi.ipc.ServerPipe import ServerPipe
+
+
+class PubSubServerPipe(ServerPipe):
+
+    """Fans published messages out to the subscribers of their topic."""
+
+    """
+        Every client connecting to the pipe is a subscriber: it sends the
+        topics it wants (PubSubClient.subscribe) and from then on gets
+        every message published on them (PubSubClient.receive).
+        A message is encoded (with the pipe codec) exactly once, into a
+        single buffer shared by every subscriber queue, and each subscriber
+        has a bounded SendQueue of its own whose sender thread writes to its
+        connection; a slow subscriber only ever fills up its own queue and
+        what happens then is up to the queue policy, by default dropping
+        its oldest messages.
+        Byte channel pipes frame their messages, so subscribers have to
+        wrap their pipe in a FramedPipe.
+    """
+
+    # Topic length and number of parts, followed by the topic and every
+    # part preceded by its length.
+    HEADER = struct.Struct(str('!HH'))
+    PART = struct.Struct(str('!I'))
+
+    SUBSCRIBE = b'+'
+    UNSUBSCRIBE = b'-'
+
+    # Subscribers served at once unless serve() is told otherwise (or the
+    # pipe allows fewer instances).
+    SUBSCRIBERS = 64
+
+    def __init__(self, *args, **kwargs):
+        """Default initialization class method."""
+        self.high_water = kwargs.pop('high_water', 1024 * 1024)
+        self.low_water = kwargs.pop('low_water', self.high_water // 4)
+        self.policy = kwargs.pop('policy', SendQueue.Policy.DROP_OLDEST)
+        if self.high_water <= 0 or \
+                not 0 <= self.low_water <= self.high_water:
+            raise ValueError(
+                'Invalid watermarks: Expected 0 <= low <= high and high > 0!'
+            )
+        super(PubSubServerPipe, self).__init__(*args, **kwargs)
+        if self.mode != BasePipe.Mode.DUPLEX:
+            raise ValueError(
+                'Subscribers need a duplex pipe to pick their topics!'
+            )
+        self.__lock = threading.Lock()
+        # Topic -> set of the queues of its subscribers.
+        self.__topics = {}
+        # Connected subscriber pipes, cancelled on shutdown.
+        self.__subscribers = set()
+
+    @staticmethod
+    def __encodeTopic(topic):
+        if not isinstance(topic, bytes):
+            topic = topic.encode('utf-8')
+        return topic
+
+    def __update(self, queue, topics, pipe_data):
+        action = bytes(pipe_data[:1])
+        topic = bytes(pipe_data[1:])
+        with self.__lock:
+            if action == PubSubServerPipe.SUBSCRIBE:
+                topics.add(topic)
+                self.__topics.setdefault(topic, set()).add(queue)
+            elif action == PubSubServerPipe.UNSUBSCRIBE:
+                topics.discard(topic)
+                queues = self.__topics.get(topic)
+                if queues is not None:
+                    queues.discard(queue)
+                    if not queues:
+                        del self.__topics[topic]
+            else:
+                raise PipeError(
+                    'Invalid subscription request!',
+                    'action',
+                    action
+                )
+
+    def __subscriber(self, pipe):
+        if self.channel == BasePipe.Channel.BYTE:
+            pipe = FramedPipe(pipe)
+        queue = SendQueue(pipe, self.high_water, self.low_water, self.policy)
+        topics = set()
+        with self.__lock:
+            self.__subscribers.add(pipe)
+        if self.metrics is not None:
+            self.metrics.gauge('subscribers', len(self.__subscribers))
+        try:
+            while True:
+                pipe_status, _, pipe_data = pipe.read()
+                if pipe_status != 0:
+                    break
+                self.__update(queue, topics, pipe_data)
+        finally:
+            with self.__lock:
+                self.__subscribers.discard(pipe)
+                for topic in topics:
+                    queues = self.__topics[topic]
+                    queues.discard(queue)
+                    if not queues:
+                        del self.__topics[topic]
+            if self.metrics is not None:
+                self.metrics.gauge('subscribers', len(self.__subscribers))
+                self.metrics.count('dropped', queue.dropped)
+            try:
+                queue.close()
+            except PipeError:
+                # The subscriber went away with messages still queued.
+                pass
+
+    # Returns the number of subscribers the message was queued for. Those
+    # whose connection broke are skipped; they are removed as soon as their
+    # session notices.
+    def publish(self, topic, obj):
+        topic = PubSubServerPipe.__encodeTopic(topic)
+        with self.__lock:
+            queues = list(self.__topics.get(topic, ()))
+        if not queues:
+            return 0
+        parts = self.codec.encode(obj)
+        message = [
+            PubSubServerPipe.HEADER.pack(len(topic), len(parts)), topic
+        ]
+        for part in parts:
+            message.append(PubSubServerPipe.PART.pack(len(part)))
+            message.append(part)
+        message = b''.join(message)
+        if self.metrics is not None:
+            self.metrics.count('publications')
+        delivered = 0
+        for queue in queues:
+            try:
+                queue.write(message)
+            except PipeError:
+                continue
+            delivered += 1
+        return delivered
+
+    # Every subscriber session takes up a worker for as long as it lasts,
+    # hence as many workers as instances, which is how many subscribers
+    # are served at once (SUBSCRIBERS by default, whatever the number of
+    # CPUs). Whatever is still queued when shutting down is dropped.
+    def _serve(self, handler=None, instances=0, workers=0, engine=False,
+               processes=1, session_timeout=0, idle_timeout=0):
+        if handler is not None or engine or processes != 1:
+            raise NotImplementedError(
+                'Publishers serve their subscribers in process!'
+            )
+        if instances <= 0:
+            instances = min(self.instances, PubSubServerPipe.SUBSCRIBERS)
+        return super(PubSubServerPipe, self)._serve(
+            self.__subscriber, instances, instances,
+            session_timeout=session_timeout, idle_timeout=idle_timeout
+        )
+
+    def _shutdown(self):
+        # Wakes up the sessions waiting for subscription requests; their
+        # workers close the pipes once they are done with them.
+        with self.__lock:
+            for pipe in self.__subscribers:
+                pipe.cancel()
+        return super(PubSubServerPipe, self)._shutdown()
+
+    def listen(self, handler=None, policy=None, repeat=True):
+        raise NotImplementedError(
+            'Publishers serve every subscriber: Use serve!'
+        )
+
+    # The signature of ServerPipe.serve, but subscribers are served by the
+    # publisher itself: there is no handler to pass.
+    def serve(self, handler=None, instances=0, workers=0, engine=False,
+              processes=1, session_timeout=0, idle_timeout=0):
+        if handler is not None:
+            raise ValueError(
+                'Publishers serve their subscribers themselves: Pass no '
+                'handler!'
+            )
+        return self._serve(
+            None, instances, workers, engine, processes, session_timeout,
+            idle_timeout
+        )
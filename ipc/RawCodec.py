@@ -0,0 +1,30 @@
+# Copyright (C) 2014/15 - Iraklis Diakos (hdiakos@outlook.com)
+# Pilavidis Kriton (kriton_pilavidis@outlook.com)
+# All Rights Reserved.
+# You may use, distribute and modify this code under the
+# terms of the ASF 2.0 license.
+#
+
+"""Part of the ipc module."""
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from crapi.ipc.PipeCodec import PipeCodec
+
+
+class RawCodec(PipeCodec):
+
+    """Payloads go through untouched; text is sent as UTF-8."""
+
+    def encode(self, obj):
+        if not isinstance(obj, (bytes, bytearray, memoryview)):
+            obj = obj.encode('utf-8')
+        return [obj]
+
+    def parts(self, head):
+        return 1
+
+    def decode(self, parts):
+        return parts[0]
@@ -0,0 +1,186 @@
+# Copyright (C) 2014/15 - Iraklis Diakos (hdiakos@outlook.com)
+# Pilavidis Kriton (kriton_pilavidis@outlook.com)
+# All Rights Reserved.
+# You may use, distribute and modify this code under the
+# terms of the ASF 2.0 license.
+#
+
+"""Part of the ipc module."""
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+# Python native libraries.
+from collections import deque
+from enum import Enum
+import threading
+import time
+
+from crapi.ipc.PipeError import PipeError
+from crapi.ipc.PipeTimeoutError import PipeTimeoutError
+
+
+# Write timeouts must not move with the wall clock.
+_clock = getattr(time, 'monotonic', time.time)
+
+
+class SendQueue(object):
+
+    """A bounded queue of outgoing payloads drained by a sender thread."""
+
+    """
+        write() only queues the payload; a background thread hands queued
+        payloads to the wrapped pipe with write_many. Once more than
+        high_water bytes are queued (or being sent) the queue is full and
+        the policy decides what happens to the next write:
+            BLOCK        wait until the queue drains down to low_water
+            DROP_OLDEST  discard the oldest queued payloads to make room
+            RAISE        raise a PipeError
+        A payload is always accepted into an empty queue, however large.
+        Wrap a FramedPipe (or a message channel pipe) so that message
+        boundaries survive the batching.
+    """
+
+    class Policy(Enum):
+
+        BLOCK = 'block'
+        DROP_OLDEST = 'drop_oldest'
+        RAISE = 'raise'
+
+    def __init__(self, pipe, high_water=1024 * 1024, low_water=256 * 1024,
+                 policy=Policy.BLOCK):
+        """Default initialization class method."""
+        if high_water <= 0 or not 0 <= low_water <= high_water:
+            raise ValueError(
+                'Invalid watermarks: Expected 0 <= low <= high and high > 0!'
+            )
+        self.pipe = pipe
+        self.high_water = high_water
+        self.low_water = low_water
+        self.policy = policy
+        # Number of payloads discarded by the DROP_OLDEST policy.
+        self.dropped = 0
+        self.__queue = deque()
+        # Bytes queued plus bytes handed to the pipe but not yet written.
+        self.__queued_sz = 0
+        self.__error = None
+        self.__closed = False
+        self.__lock = threading.Lock()
+        self.__wakeup = threading.Condition(self.__lock)
+        self.__drained = threading.Condition(self.__lock)
+        self.__sender = threading.Thread(target=self.__run)
+        self.__sender.daemon = True
+        self.__sender.start()
+
+    def __run(self):
+        with self.__lock:
+            while True:
+                while not self.__queue and not self.__closed:
+                    self.__wakeup.wait()
+                if not self.__queue:
+                    return
+                batch = list(self.__queue)
+                self.__queue.clear()
+                batch_sz = sum(len(payload) for payload in batch)
+                self.__lock.release()
+                try:
+                    status_code, _ = self.pipe.write_many(batch)
+                    if status_code == 1:
+                        raise PipeError(
+                            'Pipe broke while sending queued payloads!',
+                            'status_code',
+                            status_code
+                        )
+                except Exception as e:
+                    error = e
+                else:
+                    error = None
+                finally:
+                    self.__lock.acquire()
+                self.__queued_sz -= batch_sz
+                if error is not None:
+                    # Nothing queued can be delivered any more.
+                    self.__error = error
+                    self.__queued_sz = 0
+                    self.__queue.clear()
+                self.__drained.notify_all()
+
+    def __raise(self):
+        if self.__error is not None:
+            error, self.__error = self.__error, None
+            raise error
+        if self.__closed:
+            raise PipeError(
+                'Send queue has been closed!',
+                'pipe',
+                self.pipe
+            )
+
+    def __wait(self, predicate, timeout):
+        # Must be called with the lock held.
+        if timeout > 0:
+            deadline = _clock() + timeout / 1000.0
+        while not predicate():
+            self.__raise()
+            if timeout > 0:
+                left = deadline - _clock()
+                if left <= 0:
+                    raise PipeTimeoutError(
+                        'Connection timeout while awaiting pipe activity!',
+                        'event_timeout',
+                        timeout
+                    )
+                self.__drained.wait(left)
+            else:
+                self.__drained.wait()
+
+    def write(self, payload, timeout=0):
+        if not isinstance(payload, (bytes, bytearray, memoryview)):
+            payload = payload.encode('utf-8')
+        with self.__lock:
+            self.__raise()
+            if self.__queued_sz > 0 and \
+                    self.__queued_sz + len(payload) > self.high_water:
+                if self.policy == SendQueue.Policy.BLOCK:
+                    self.__wait(
+                        lambda: self.__queued_sz <= self.low_water, timeout
+                    )
+                elif self.policy == SendQueue.Policy.DROP_OLDEST:
+                    while self.__queue and \
+                            self.__queued_sz + len(payload) > self.high_water:
+                        self.__queued_sz -= len(self.__queue.popleft())
+                        self.dropped += 1
+                else:
+                    raise PipeError(
+                        'Send queue is full!',
+                        'queued_sz',
+                        self.__queued_sz,
+                        'high_water',
+                        self.high_water
+                    )
+            self.__queue.append(payload)
+            self.__queued_sz += len(payload)
+            self.__wakeup.notify()
+        return 0, 0
+
+    def queued(self):
+        """Return the number of bytes not written to the pipe yet."""
+        with self.__lock:
+            return self.__queued_sz
+
+    # Waits until everything queued so far has been written to the pipe.
+    def drain(self, timeout=0):
+        with self.__lock:
+            self.__wait(lambda: self.__queued_sz == 0, timeout)
+            self.__raise()
+
+    def close(self, timeout=0):
+        with self.__lock:
+            if self.__closed:
+                return
+            try:
+                self.__wait(lambda: self.__queued_sz == 0, timeout)
+            finally:
+                self.__closed = True
+                self.__wakeup.notify()
+        self.__sender.join()
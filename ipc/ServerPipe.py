@@ -12,9 +12,32 @@ from __future__ import print_function
 from __future__ import unicode_literals
 # Python native libraries.
 from enum import Enum
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+import time
+try:
+    from multiprocessing.connection import wait
+except ImportError:
+    # Python 2: no worker processes (see __supervise).
+    wait = None
+try:
+    from queue import Queue
+except ImportError:
+    from Queue import Queue
 
 import crapi.ipc.Pipe as Pipe
+from crapi.ipc.PipeEngine import PipeEngine
 from crapi.ipc.PipeError import PipeError
+from crapi.ipc.PipeTimer import PipeTimer
+
+
+_log = logging.getLogger(__name__)
+
+# Deadlines must not move with the wall clock.
+_clock = getattr(time, 'monotonic', time.time)
 
 
 class ServerPipe(Pipe.Pipe):
@@ -25,24 +48,479 @@ class ServerPipe(Pipe.Pipe):
         RO = 'ro'
         WO = 'wo'
 
-    def _listen(self, policy=POLICY.RW, repeat=True):
-        status_code = self.connect()
-        if status_code == 0:
-            pipe_status, pipe_bytes, pipe_content = self.read()
-            self.close()
+    # Set while serve() is running; shutdown() uses it to stop the pool.
+    __stopping = None
+    __engine = None
+    # Set while listen() is running a session loop.
+    __listening = False
+    # Set while serve() is supervising worker processes; shutdown() writes
+    # to it to wake the supervisor up.
+    __supervising = None
+    # Deadlines of serve(), in milliseconds (0 for none).
+    __session_timeout = 0
+    __idle_timeout = 0
+    # Set on the copy a worker process serves; the supervisor owns the
+    # listening endpoint and is the only one to release it.
+    __forked = False
+    # Milliseconds shutdown() gives the sessions of the worker pool to end
+    # on their own before cancelling the ones left, e.g. those of idle
+    # clients which never hang up.
+    drain_timeout = 5000
+    # A worker process dying within restart_window milliseconds of being
+    # started is restarted after restart_delay milliseconds, doubled with
+    # every such death in a row; after max_restarts of them serve() gives
+    # up. Workers dying later on are restarted at once.
+    restart_window = 5000
+    restart_delay = 100
+    max_restarts = 5
+
+    # Without a handler a single client is accepted, its first message read
+    # and returned as (status, pipe status, bytes, data).
+    # With a handler every connection becomes a session run per policy:
+    #   RW  read a message, reply with handler(message) unless it is None
+    #   RO  read a message and pass it to the handler, never reply
+    #   WR  send handler(reply) and read the client's reply, starting with
+    #       handler(None); a None payload ends the session
+    #   WO  send handler(None) until it returns None
+    # A session lasts until the client goes away (or the handler ends it);
+    # with repeat the same pipe instance then waits for the next client.
+    # The policy defaults to the one the pipe mode allows: RO for read only
+    # pipes, WO for write only ones and RW otherwise.
+    def _listen(self, policy=None, repeat=True, handler=None):
+        if handler is None:
+            status_code = self.connect()
+            if status_code == 0:
+                pipe_status, pipe_bytes, pipe_content = self.read()
+                self.close()
+            else:
+                raise PipeError(
+                    'Pipe encountered an error while attempting a '
+                    'connection!',
+                    'status_code',
+                    status_code
+                )
+            return status_code, pipe_status, pipe_bytes, pipe_content
+
+        allowed = {
+            Pipe.Pipe.Mode.DUPLEX: list(ServerPipe.POLICY),
+            Pipe.Pipe.Mode.READ_ONLY: [ServerPipe.POLICY.RO],
+            Pipe.Pipe.Mode.WRITE_ONLY: [ServerPipe.POLICY.WO],
+        }[self.mode]
+        if policy is None:
+            policy = allowed[0]
+        elif policy not in allowed:
+            raise ValueError(
+                'Invalid policy: Not allowed in this pipe mode!'
+            )
+
+        self.__stopping = threading.Event()
+        self.__listening = True
+        try:
+            while not self.__stopping.is_set():
+                try:
+                    self.connect()
+                except Exception:
+                    if self.__stopping.is_set():
+                        break
+                    raise
+                try:
+                    self.__session(handler, policy)
+                except Exception:
+                    _log.exception('Pipe handler failed for %s!', self.name)
+                finally:
+                    self.close()
+                if not repeat:
+                    break
+        finally:
+            # Back to the idle state, where shutdown() releases the pipe
+            # (a one shot listen returns without anybody stopping it).
+            self.__listening = False
+            self.__stopping = None
+        return 0
+
+    def __session(self, handler, policy):
+        reads_first = policy in (
+            ServerPipe.POLICY.RW, ServerPipe.POLICY.RO
+        )
+        replies = policy in (ServerPipe.POLICY.RW, ServerPipe.POLICY.WR)
+        pipe_content = None
+        while not self.__stopping.is_set():
+            if reads_first:
+                pipe_status, _, pipe_content = self.read()
+                if pipe_status != 0:
+                    return
+                payload = handler(pipe_content)
+                if not replies or payload is None:
+                    continue
+            else:
+                payload = handler(pipe_content)
+                if payload is None:
+                    return
+            status_code, _ = self.write(payload)
+            if status_code == 1:
+                return
+            if not reads_first and replies:
+                pipe_status, _, pipe_content = self.read()
+                if pipe_status != 0:
+                    return
+
+    # Every pipe instance gets a thread of its own which does nothing but
+    # wait for a client to connect. Connected instances are then queued for
+    # the worker pool which runs the handler and disconnects the client,
+    # handing the instance back to its acceptor thread.
+    # With engine set the instances are multiplexed by a PipeEngine instead
+    # and the handler is called whenever a client has sent something.
+    # Pipes of the TRANSACTIONAL transport call the handler with every
+    # request a client transacts and send back what it returns, which must
+    # not be None (an empty reply is fine).
+    # With more than one process (0 meaning one per CPU) the calling
+    # process only supervises: it forks worker processes, each serving the
+    # pipe as above, and restarts any worker which dies (see __supervise).
+    # Deadlines (in milliseconds) end the sessions which run past them by
+    # cancelling whatever their pipe has in flight: session_timeout bounds
+    # how long a client stays connected and idle_timeout how long an engine
+    # waits for a client's next request (the handlers of the worker pool
+    # bound their own reads). They are all kept by the one PipeTimer.
+    def _serve(self, handler, instances=0, workers=0, engine=False,
+               processes=1, session_timeout=0, idle_timeout=0):
+        if processes < 0:
+            raise ValueError(
+                'Invalid # of processes: Only positive numbers are allowed!'
+            )
+        if session_timeout < 0 or idle_timeout < 0:
+            raise ValueError(
+                'Invalid timeout: Only positive numbers are allowed!'
+            )
+        if idle_timeout > 0 and not engine:
+            raise ValueError(
+                'Idle timeouts require an engine!'
+            )
+        self.__session_timeout = session_timeout
+        self.__idle_timeout = idle_timeout
+        if self.transport == Pipe.Pipe.Transport.TRANSACTIONAL:
+            handler = self.__transactions(handler, engine)
+        if processes != 1:
+            return self.__supervise(
+                handler, instances, workers, engine, processes
+            )
+        if engine:
+            self.__engine = PipeEngine(workers)
+            try:
+                return self.__engine.serve(
+                    self, handler, instances, session_timeout, idle_timeout
+                )
+            finally:
+                self.__engine = None
+        return self.__threads(
+            handler, instances, workers, threading.Event()
+        )
+
+    def __threads(self, handler, instances, workers, stopping):
+        if instances <= 0:
+            instances = multiprocessing.cpu_count()
+        if instances > self.instances:
+            raise ValueError(
+                'Invalid # of instances: Cannot exceed the pipe instances!'
+            )
+        if workers <= 0:
+            workers = instances
+
+        self.__stopping = stopping
+        # Pipes of the sessions being run, each with a token of its own;
+        # cancelled once the drain deadline passes (and as they start from
+        # then on).
+        self.__sessions = {}
+        self.__sessionsLock = threading.Lock()
+        self.__expired = False
+        # Taken by the acceptors to check for a shutdown and queue a client
+        # in one go, so none gets queued behind the consumers' sentinels.
+        self.__readyLock = threading.Lock()
+        ready = Queue()
+        pool = [self]
+        for _ in range(instances - 1):
+            pool.append(self._instance())
+
+        acceptors = []
+        for pipe in pool:
+            acceptors.append(
+                threading.Thread(target=self.__accept, args=(pipe, ready))
+            )
+        consumers = []
+        for _ in range(workers):
+            consumers.append(
+                threading.Thread(target=self.__work, args=(handler, ready))
+            )
+        for thread in acceptors + consumers:
+            thread.daemon = True
+            thread.start()
+
+        self.__stopping.wait()
+
+        # Let the workers drain whatever got connected in the meantime.
+        with self.__readyLock:
+            for _ in consumers:
+                ready.put(None)
+        deadline = _clock() + self.drain_timeout / 1000.0
+        for thread in consumers:
+            thread.join(max(deadline - _clock(), 0))
+        with self.__sessionsLock:
+            self.__expired = True
+            sessions = list(self.__sessions)
+        for pipe in sessions:
+            pipe.cancel()
+        for thread in consumers:
+            thread.join()
+        # Releasing the instances wakes up the acceptors still waiting for a
+        # client. Those of a worker process share the endpoint with the
+        # other workers and stay blocked until the process exits.
+        for pipe in reversed(pool):
+            pipe._release()
+        if not self.__forked:
+            for thread in acceptors:
+                thread.join()
+
+    # The endpoint is created once, by the supervisor, before any worker is
+    # forked: every worker accepts from the very same listening socket and
+    # the kernel spreads the clients over them. On shutdown the supervisor
+    # closes the stop pipe, which every worker sees at once as end of file
+    # (a signal or a shared event would not survive a worker being killed
+    # while holding it); the workers stop accepting and finish the sessions
+    # they have before exiting and only then does the supervisor release
+    # the endpoint.
+    # Every worker has its own copy of the metrics.
+    def __supervise(self, handler, instances, workers, engine, processes):
+        try:
+            context = multiprocessing.get_context('fork')
+        except (AttributeError, ValueError):
+            raise NotImplementedError(
+                'Sorry! Worker processes are a WIP on this platform!'
+            )
+        if processes == 0:
+            processes = multiprocessing.cpu_count()
+
+        stop_r, stop_w = os.pipe()
+        wakeup_r, self.__supervising = multiprocessing.Pipe(False)
+
+        def spawn():
+            process = context.Process(
+                target=self.__worker,
+                args=(handler, instances, workers, engine, stop_r, stop_w)
+            )
+            process.daemon = True
+            process.start()
+            return process
+
+        # Per slot: its worker (None while waiting to restart it), when it
+        # was started (or is to be restarted) and its deaths in a row.
+        pool = [None] * processes
+        started = [_clock()] * processes
+        deaths = [0] * processes
+        try:
+            while True:
+                now = _clock()
+                for slot in range(processes):
+                    if pool[slot] is None and started[slot] <= now:
+                        pool[slot] = spawn()
+                        started[slot] = now
+                sentinels = dict(
+                    (process.sentinel, slot)
+                    for slot, process in enumerate(pool)
+                    if process is not None
+                )
+                pending = [
+                    started[slot] for slot in range(processes)
+                    if pool[slot] is None
+                ]
+                if pending:
+                    timeout = max(min(pending) - now, 0)
+                else:
+                    timeout = None
+                ready = wait(list(sentinels) + [wakeup_r], timeout)
+                if wakeup_r in ready:
+                    break
+                for sentinel in ready:
+                    slot = sentinels[sentinel]
+                    process, pool[slot] = pool[slot], None
+                    process.join()
+                    now = _clock()
+                    if now - started[slot] < self.restart_window / 1000.0:
+                        deaths[slot] += 1
+                    else:
+                        deaths[slot] = 0
+                    if deaths[slot] > self.max_restarts:
+                        _log.error(
+                            'Pipe worker %d of %s exited with %s; giving '
+                            'up after %d restarts!',
+                            process.pid, self.name, process.exitcode,
+                            self.max_restarts
+                        )
+                        raise PipeError(
+                            'Pipe worker keeps exiting at startup!',
+                            'exit_code',
+                            process.exitcode
+                        )
+                    _log.error(
+                        'Pipe worker %d of %s exited with %s; restarting it!',
+                        process.pid, self.name, process.exitcode
+                    )
+                    if self.metrics is not None:
+                        self.metrics.count('worker_restarts')
+                    if deaths[slot] > 0:
+                        started[slot] = now + self.restart_delay * \
+                            2 ** (deaths[slot] - 1) / 1000.0
+                    else:
+                        started[slot] = now
+        finally:
+            os.close(stop_w)
+            for process in pool:
+                if process is not None:
+                    process.join()
+            os.close(stop_r)
+            wakeup_r.close()
+            self.__supervising.close()
+            self.__supervising = None
+            self._release()
+
+    def __worker(self, handler, instances, workers, engine, stop_r, stop_w):
+        # Interrupts go to the whole process group; only the supervisor
+        # decides when workers stop.
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        os.close(stop_w)
+        self.__supervising = None
+        # Instances do not own the endpoint so releasing them (and those
+        # made from them) leaves it to the supervisor and other workers.
+        server = self._instance()
+        server.__forked = True
+        stopping = threading.Event()
+        if engine:
+            pipe_engine = PipeEngine(workers)
+            stop = pipe_engine.shutdown
         else:
-            raise PipeError(
-                'Pipe encountered an error while attempting a connection!',
-                'status_code',
-                status_code
+            stop = stopping.set
+
+        def watch():
+            while os.read(stop_r, 1):
+                pass
+            stop()
+
+        watcher = threading.Thread(target=watch)
+        watcher.daemon = True
+        watcher.start()
+        if engine:
+            pipe_engine.serve(
+                server, handler, instances, self.__session_timeout,
+                self.__idle_timeout
             )
-        return status_code, pipe_status, pipe_bytes, pipe_content
+        else:
+            server.__threads(handler, instances, workers, stopping)
+
+    def __transactions(self, function, once):
+        def handle(pipe):
+            while True:
+                pipe_status, _, pipe_content = pipe.read()
+                if pipe_status != 0:
+                    return
+                reply = function(pipe_content)
+                if reply is None:
+                    # The client is waiting on a reply; dropping the session
+                    # breaks its pipe rather than leaving it to guess.
+                    raise PipeError(
+                        'Transaction handler returned no reply!',
+                        'name',
+                        pipe.name
+                    )
+                status_code, _ = pipe.write(reply)
+                if status_code == 1 or once:
+                    return
+        return handle
+
+    def __accept(self, pipe, ready):
+        done = threading.Event()
+        while not self.__stopping.is_set():
+            try:
+                pipe.connect()
+            except Exception:
+                if self.__stopping.is_set():
+                    break
+                raise
+            done.clear()
+            with self.__readyLock:
+                if self.__stopping.is_set():
+                    break
+                ready.put((pipe, done))
+            if self.metrics is not None:
+                self.metrics.gauge('queue_depth', ready.qsize())
+            done.wait()
+
+    def __work(self, handler, ready):
+        while True:
+            job = ready.get()
+            if job is None:
+                break
+            pipe, done = job
+            if self.metrics is not None:
+                self.metrics.gauge('queue_depth', ready.qsize())
+                start = _clock()
+            token = object()
+            with self.__sessionsLock:
+                self.__sessions[pipe] = token
+                if self.__expired:
+                    pipe.cancel()
+            expiry = None
+            if self.__session_timeout > 0:
+                expiry = PipeTimer.shared().schedule(
+                    self.__session_timeout, self.__timeout, pipe, token
+                )
+            try:
+                handler(pipe)
+            except Exception:
+                if self.metrics is not None:
+                    self.metrics.count('handler_errors')
+                _log.exception('Pipe handler failed for %s!', pipe.name)
+            finally:
+                if expiry is not None and \
+                        not PipeTimer.shared().cancel(expiry):
+                    if self.metrics is not None:
+                        self.metrics.count('session_timeouts')
+                with self.__sessionsLock:
+                    del self.__sessions[pipe]
+                if self.metrics is not None:
+                    self.metrics.observe('handler', _clock() - start)
+                try:
+                    pipe.close()
+                finally:
+                    done.set()
+
+    # Runs on the timer thread, possibly after the session ended and its
+    # pipe instance went on to the next client, which is left alone.
+    def __timeout(self, pipe, token):
+        with self.__sessionsLock:
+            if self.__sessions.get(pipe) is token:
+                pipe.cancel()
 
     def _shutdown(self):
-        self.__hPipe.Close()
+        if self.__supervising is not None:
+            self.__supervising.send(None)
+        elif self.__engine is not None:
+            self.__engine.shutdown()
+        elif self.__stopping is not None and not self.__stopping.is_set():
+            # serve() releases the pipe instances itself once it unblocks
+            # whereas listen() has to be woken up from connect or read.
+            self.__stopping.set()
+            if self.__listening:
+                self._release()
+        else:
+            self._release()
+
+    def listen(self, handler=None, policy=None, repeat=True):
+        return self._listen(policy, repeat, handler)
 
-    def listen(self):
-        return self._listen()
+    def serve(self, handler, instances=0, workers=0, engine=False,
+              processes=1, session_timeout=0, idle_timeout=0):
+        return self._serve(
+            handler, instances, workers, engine, processes, session_timeout,
+            idle_timeout
+        )
 
     def shutdown(self):
         return self._shutdown()
@@ -0,0 +1,185 @@
+# Copyright (C) 2014/15 - Iraklis Diakos (hdiakos@outlook.com)
+# Pilavidis Kriton (kriton_pilavidis@outlook.com)
+# All Rights Reserved.
+# You may use, distribute and modify this code under the
+# terms of the ASF 2.0 license.
+#
+
+"""Part of the ipc module."""
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+# NOTE: memoryviews over mmap objects need Python 3.
+# Python native libraries.
+import struct
+import time
+
+from crapi.ipc.PipeError import PipeError
+from crapi.ipc.PipeTimeoutError import PipeTimeoutError
+from crapi.ipc.SharedRing import SharedRing
+
+
+# Timeouts are measured on a clock which never goes back.
+_clock = getattr(time, 'monotonic', time.time)
+
+
+class SharedMemoryPipe(object):
+
+    """Same host bulk transport over a pair of shared memory rings."""
+
+    """
+        Both ends of an already connected pipe wrap it in a SharedMemoryPipe.
+        Each end creates the ring it writes to, the two exchange the ring
+        names over the pipe and from then on payloads are copied once into
+        shared memory and read in place by the peer. The pipe only carries
+        one byte doorbells telling a waiting reader that its ring is no
+        longer empty, or a writer waiting on a full ring that it has room
+        again. Either end waiting simply looks at its ring again on any
+        doorbell.
+    """
+
+    HANDSHAKE = struct.Struct(str('!Q248s'))
+    DOORBELL = b'\x01'
+
+    # An end waiting for a doorbell rechecks its ring at least this often
+    # (milliseconds) so that a doorbell lost to a race costs a delay at most.
+    RECHECK = 10
+
+    def __init__(self, pipe, capacity=4 * 1024 * 1024, timeout=0):
+        """Default initialization class method."""
+        self.pipe = pipe
+        self.__tx = SharedRing(capacity)
+        self.max_payload = self.__tx.max_payload
+        self.__rx = None
+        self.__bells = bytearray(4096)
+        self.__next = None
+        try:
+            self.__handshake(timeout)
+        except Exception:
+            self.__tx.close()
+            raise
+
+    def __exchange(self, payload, timeout):
+        status_code, _ = self.pipe.write(payload, timeout)
+        if status_code == 1:
+            raise PipeError(
+                'Pipe broke during the shared memory handshake!',
+                'status_code',
+                status_code
+            )
+        record = bytearray(SharedMemoryPipe.HANDSHAKE.size)
+        view = memoryview(record)
+        offset = 0
+        while offset < len(record):
+            pipe_status, read_bytes = self.pipe.read_into(
+                view[offset:], timeout
+            )
+            if pipe_status != 0:
+                raise PipeError(
+                    'Pipe broke during the shared memory handshake!',
+                    'status_code',
+                    pipe_status
+                )
+            offset += read_bytes
+        return record
+
+    def __handshake(self, timeout):
+        record = self.__exchange(
+            SharedMemoryPipe.HANDSHAKE.pack(
+                self.__tx.capacity, self.__tx.name.encode('utf-8')
+            ),
+            timeout
+        )
+        capacity, name = SharedMemoryPipe.HANDSHAKE.unpack(bytes(record))
+        self.__rx = SharedRing(capacity, name.rstrip(b'\0').decode('utf-8'))
+        # Once the peer confirms it has mapped our ring its name can go.
+        self.__exchange(SharedMemoryPipe.HANDSHAKE.pack(0, b''), timeout)
+        self.__tx.unlink()
+
+    def __wait(self, timeout):
+        # Returns the pipe status; 0 means "go look at the ring again".
+        if timeout > 0:
+            wait = min(timeout, SharedMemoryPipe.RECHECK)
+        else:
+            wait = SharedMemoryPipe.RECHECK
+        try:
+            pipe_status, _ = self.pipe.read_into(self.__bells, wait)
+        except PipeTimeoutError:
+            return 0
+        return pipe_status
+
+    def __consume(self):
+        if self.__next is not None:
+            view, tail = self.__next
+            view.release()
+            self.__next = None
+            if self.__rx.advance(tail):
+                self.pipe.write(SharedMemoryPipe.DOORBELL)
+
+    # The returned memoryview points into the shared mapping and is only
+    # valid until the next read (or close).
+    def read(self, timeout=0):
+        self.__consume()
+        if timeout > 0:
+            deadline = _clock() + timeout / 1000.0
+        while True:
+            record = self.__rx.peek()
+            if record is not None:
+                self.__next = record
+                return 0, len(record[0]), record[0]
+            left = 0
+            if timeout > 0:
+                left = int((deadline - _clock()) * 1000)
+                if left <= 0:
+                    raise PipeTimeoutError(
+                        'Connection timeout while awaiting pipe activity!',
+                        'event_timeout',
+                        timeout
+                    )
+            pipe_status = self.__wait(left)
+            if pipe_status != 0:
+                # The peer may have written its last records before leaving.
+                if self.__rx.empty():
+                    return pipe_status, 0, memoryview(b'')
+
+    # Payloads are limited to max_payload bytes, half the ring capacity
+    # (see SharedRing); larger ones raise PipeError.
+    def write(self, payload, timeout=0):
+        if not isinstance(payload, (bytes, bytearray, memoryview)):
+            payload = payload.encode('utf-8')
+        if timeout > 0:
+            deadline = _clock() + timeout / 1000.0
+        was_empty = self.__tx.empty()
+        while not self.__tx.put(payload):
+            # The reader may have drained the ring meanwhile; ring anyway.
+            was_empty = True
+            left = 0
+            if timeout > 0:
+                left = int((deadline - _clock()) * 1000)
+                if left <= 0:
+                    raise PipeTimeoutError(
+                        'Connection timeout while awaiting pipe activity!',
+                        'event_timeout',
+                        timeout
+                    )
+            # Asking for a doorbell before looking once more means the room
+            # freed in between is either seen or rung for.
+            self.__tx.want_room()
+            if self.__tx.put(payload):
+                break
+            pipe_status = self.__wait(left)
+            if pipe_status != 0:
+                return pipe_status, 0
+        if was_empty:
+            status_code, _ = self.pipe.write(SharedMemoryPipe.DOORBELL)
+            if status_code == 1:
+                return status_code, 0
+        return 0, len(payload)
+
+    def close(self):
+        self.__consume()
+        self.__tx.close()
+        if self.__rx is not None:
+            self.__rx.close()
+        return self.pipe.close()
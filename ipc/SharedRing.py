@@ -0,0 +1,198 @@
+# Copyright (C) 2014/15 - Iraklis Diakos (hdiakos@outlook.com)
+# Pilavidis Kriton (kriton_pilavidis@outlook.com)
+# All Rights Reserved.
+# You may use, distribute and modify this code under the
+# terms of the ASF 2.0 license.
+#
+
+"""Part of the ipc module."""
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+# Python native libraries.
+import mmap
+import os
+import random
+import struct
+import sys
+import tempfile
+
+from crapi.ipc.PipeError import PipeError
+
+
+class SharedRing(object):
+
+    """A single producer/single consumer ring living in shared memory."""
+
+    """
+        The mapping starts with the producer (head) and consumer (tail)
+        byte counters, each on a cache line of its own, followed by the
+        data area. The consumer's line also holds the flag a producer
+        waiting for room raises (see want_room). Records are a 4 byte
+        length and the payload, 8 byte aligned; a record that would
+        straddle the end of the data area is preceded by a wrap marker and
+        starts over at offset 0. Records are limited to half the data area,
+        which guarantees an empty ring room for any of them: a record either
+        fits behind the write position or it starts over at 0 without
+        reaching the wrap marker.
+        On Linux the mapping is a file in /dev/shm which the creator unlinks
+        once the peer has it mapped. On Windows it is a named (pagefile
+        backed) mapping which lives as long as either side keeps it open.
+    """
+
+    HEAD = 0
+    TAIL = 64
+    WANTED = 72
+    DATA = 128
+    WRAP = 0xFFFFFFFF
+
+    COUNTER = struct.Struct(str('=Q'))
+    LENGTH = struct.Struct(str('=I'))
+
+    def __init__(self, capacity=0, name=None):
+        """Default initialization class method."""
+        """
+            Creates a new ring of (at least) capacity data bytes when name
+            is None, otherwise attaches to the ring created under name.
+        """
+        self.__path = None
+        if name is None:
+            if capacity < 64:
+                raise ValueError(
+                    'Ring capacity is too small!'
+                )
+            capacity = (capacity + 7) & ~7
+            size = SharedRing.DATA + capacity
+            if sys.platform == 'win32':
+                name = 'crapi-ring-' + str(random.randint(9999, 9999999))
+                self.__map = mmap.mmap(-1, size, tagname=name)
+            else:
+                if os.path.isdir('/dev/shm'):
+                    directory = '/dev/shm'
+                else:
+                    directory = None
+                fd, name = tempfile.mkstemp(prefix='crapi-ring-',
+                                            dir=directory)
+                try:
+                    os.ftruncate(fd, size)
+                    self.__map = mmap.mmap(fd, size)
+                finally:
+                    os.close(fd)
+                self.__path = name
+        else:
+            if sys.platform == 'win32':
+                size = SharedRing.DATA + capacity
+                self.__map = mmap.mmap(-1, size, tagname=name)
+            else:
+                fd = os.open(name, os.O_RDWR)
+                try:
+                    size = os.fstat(fd).st_size
+                    self.__map = mmap.mmap(fd, size)
+                finally:
+                    os.close(fd)
+        self.name = name
+        self.capacity = size - SharedRing.DATA
+        self.max_payload = ((self.capacity // 2) & ~7) - SharedRing.LENGTH.size
+        self.__view = memoryview(self.__map)
+        # The view handed out by the last peek, released on close.
+        self.__peeked = None
+
+    def unlink(self):
+        # Drops the name of the mapping; attached peers are unaffected.
+        if self.__path is not None:
+            os.unlink(self.__path)
+            self.__path = None
+
+    def __load(self, offset):
+        return SharedRing.COUNTER.unpack_from(self.__map, offset)[0]
+
+    def __store(self, offset, value):
+        SharedRing.COUNTER.pack_into(self.__map, offset, value)
+
+    def put(self, payload):
+        """Append a record; False if there is not enough room right now."""
+        payload_sz = len(payload)
+        if payload_sz > self.max_payload:
+            raise PipeError(
+                'Payload does not fit in the ring!',
+                'payload_sz',
+                payload_sz,
+                'max_payload',
+                self.max_payload
+            )
+        record_sz = (SharedRing.LENGTH.size + payload_sz + 7) & ~7
+        head = self.__load(SharedRing.HEAD)
+        tail = self.__load(SharedRing.TAIL)
+        position = head % self.capacity
+        padding = 0
+        if position + record_sz > self.capacity:
+            # Wrapping needs the record to end before the oldest unread one
+            # (or the wrap marker, if the ring is empty).
+            padding = self.capacity - position
+        if padding + record_sz > self.capacity - (head - tail):
+            return False
+        if padding:
+            SharedRing.LENGTH.pack_into(
+                self.__map, SharedRing.DATA + position, SharedRing.WRAP
+            )
+            position = 0
+        offset = SharedRing.DATA + position
+        SharedRing.LENGTH.pack_into(self.__map, offset, payload_sz)
+        offset += SharedRing.LENGTH.size
+        self.__view[offset:offset + payload_sz] = payload
+        # Publish the record only once it is complete.
+        self.__store(SharedRing.HEAD, head + padding + record_sz)
+        return True
+
+    def empty(self):
+        return self.__load(SharedRing.HEAD) == self.__load(SharedRing.TAIL)
+
+    def peek(self):
+        """Return (memoryview, next tail) of the oldest record or None."""
+        """
+            The view points straight into the shared mapping and stays
+            valid until the record is consumed with advance().
+        """
+        head = self.__load(SharedRing.HEAD)
+        tail = self.__load(SharedRing.TAIL)
+        if head == tail:
+            return None
+        position = tail % self.capacity
+        payload_sz = SharedRing.LENGTH.unpack_from(
+            self.__map, SharedRing.DATA + position
+        )[0]
+        if payload_sz == SharedRing.WRAP:
+            tail += self.capacity - position
+            position = 0
+            payload_sz = SharedRing.LENGTH.unpack_from(
+                self.__map, SharedRing.DATA
+            )[0]
+        offset = SharedRing.DATA + position + SharedRing.LENGTH.size
+        record_sz = (SharedRing.LENGTH.size + payload_sz + 7) & ~7
+        self.__peeked = self.__view[offset:offset + payload_sz]
+        return self.__peeked, tail + record_sz
+
+    def want_room(self):
+        """Ask the consumer to tell (see advance) once it frees room."""
+        self.__store(SharedRing.WANTED, 1)
+
+    def advance(self, tail):
+        """Consume up to tail; True if the producer is waiting for room."""
+        if self.__peeked is not None:
+            self.__peeked.release()
+            self.__peeked = None
+        self.__store(SharedRing.TAIL, tail)
+        if self.__load(SharedRing.WANTED):
+            self.__store(SharedRing.WANTED, 0)
+            return True
+        return False
+
+    def close(self):
+        self.unlink()
+        # The mapping cannot be closed while views of it are around.
+        if self.__peeked is not None:
+            self.__peeked.release()
+            self.__peeked = None
+        self.__view.release()
+        self.__map.close()
@@ -0,0 +1,598 @@
+# Copyright (C) 2014/15 - Iraklis Diakos (hdiakos@outlook.com)
+# Pilavidis Kriton (kriton_pilavidis@outlook.com)
+# All Rights Reserved.
+# You may use, distribute and modify this code under the
+# terms of the ASF 2.0 license.
+#
+
+"""Part of the ipc module."""
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+# Python native libraries.
+import copy
+import errno
+import os
+import select
+import socket
+import struct
+import subprocess
+import sys
+
+from crapi.ipc.BasePipe import BasePipe
+from crapi.ipc.PipeError import PipeError
+from crapi.ipc.PipeMetrics import instrumented
+from crapi.ipc.PipeTimeoutError import PipeTimeoutError
+
+
+# Errors which mean the other end went away. They are the equivalent of
+# ERROR_BROKEN_PIPE in the Windows backend and are reported as a status code
+# rather than as an exception.
+_BROKEN_PIPE_ERRORS = (errno.EPIPE, errno.ECONNRESET, errno.ENOTCONN)
+
+# Poll events telling that the other end shut its side of the connection.
+_HANG_UP = select.POLLHUP | getattr(select, 'POLLRDHUP', 0)
+
+# Room for the SCM_CREDENTIALS of a message (see __receiveEmpty); Python 2
+# has no recvmsg.
+try:
+    _CREDENTIALS_SZ = socket.CMSG_SPACE(struct.calcsize(str('3i')))
+except AttributeError:
+    _CREDENTIALS_SZ = None
+
+# Every pipe name is bound in the Linux abstract namespace under this prefix.
+ADDRESS_PREFIX = '\0crapi/pipe/'
+
+# Environment variable telling a child spawned with UnixPipe.spawn which
+# inherited file descriptor is its end of an anonymous pipe.
+HANDLE_ENV = 'CRAPI_PIPE_HANDLE'
+
+# Upper bound of buffers the kernel accepts in a single sendmsg call.
+try:
+    _IOV_MAX = os.sysconf(str('SC_IOV_MAX'))
+except (AttributeError, ValueError, OSError):
+    _IOV_MAX = 1024
+
+
+class UnixPipe(BasePipe):
+
+    # Named pipes are mapped to Unix domain sockets living in the Linux
+    # abstract namespace (the leading NUL byte). Such sockets have no
+    # filesystem presence at all so there is no inode to create, look up or
+    # unlink and the name vanishes together with the last socket bound to it.
+    # Message channels are SOCK_SEQPACKET sockets which keep the message
+    # boundaries in the kernel just like PIPE_TYPE_MESSAGE does on Windows
+    # whereas byte channels are plain SOCK_STREAM sockets.
+    def __init__(self, name='', ptype=BasePipe.Type.NAMED,
+                 mode=BasePipe.Mode.DUPLEX, channel=BasePipe.Channel.MESSAGE,
+                 transport=BasePipe.Transport.ASYNCHRONOUS,
+                 view=BasePipe.View.SERVER, instances=0, buf_sz=[0, 0]):
+
+        super(UnixPipe, self).__init__(
+            name, ptype, mode, channel, transport, view, instances, buf_sz
+        )
+
+        if self.channel == BasePipe.Channel.MESSAGE:
+            self.__sock_type = socket.SOCK_SEQPACKET
+        else:
+            self.__sock_type = socket.SOCK_STREAM
+
+        self.__address = (ADDRESS_PREFIX + self.name).encode('utf-8')
+        # Scratch buffer used to peek at the size of the next message.
+        self.__peek = bytearray(1)
+        self.__hListener = None
+        self.__hPipe = None
+        # The other end of an anonymous pipe until it is handed to a child.
+        self.__hChild = None
+        # Only the instance which bound the listening socket may close it.
+        self.__owner = True
+
+        if self.ptype == BasePipe.Type.ANONYMOUS:
+            # A connected socket pair rather than os.pipe() so that both
+            # ends can read and write and message channels keep their
+            # boundaries. Nothing is bound so there is no name to look up or
+            # collide with. The client view is the child's end, see attach.
+            if self.view == BasePipe.View.SERVER:
+                self.__hPipe, self.__hChild = socket.socketpair(
+                    socket.AF_UNIX, self.__sock_type
+                )
+                for sock in (self.__hPipe, self.__hChild):
+                    self.__size(sock, buf_sz)
+                self.__halve(self.__hPipe)
+                # One way pipes shut the other direction down for good so
+                # that the child cannot use it either.
+                if self.mode == BasePipe.Mode.READ_ONLY:
+                    self.__hPipe.shutdown(socket.SHUT_WR)
+                    self.__hChild.shutdown(socket.SHUT_RD)
+                elif self.mode == BasePipe.Mode.WRITE_ONLY:
+                    self.__hPipe.shutdown(socket.SHUT_RD)
+                    self.__hChild.shutdown(socket.SHUT_WR)
+        elif self.view == BasePipe.View.SERVER:
+            self.__hListener = self.__socket(buf_sz)
+            try:
+                self.__hListener.bind(self.__address)
+            except socket.error as e:
+                self.__hListener.close()
+                raise PipeError(
+                    'Failed to create named pipe!',
+                    'error_code',
+                    e.errno
+                )
+            # There is no such thing as a pipe instance here; the closest
+            # match is the number of pending connections the kernel queues
+            # for us before refusing new clients.
+            if instances == 0:
+                self.__hListener.listen(socket.SOMAXCONN)
+            else:
+                self.__hListener.listen(instances)
+        else:
+            self.__hPipe = self.__socket(buf_sz)
+            try:
+                self.__hPipe.connect(self.__address)
+            except socket.error as e:
+                self.__hPipe.close()
+                raise PipeError(
+                    'Failed to open named pipe!',
+                    'error_code',
+                    e.errno
+                )
+            self.__halve(self.__hPipe)
+
+    def __size(self, sock, buf_sz):
+        # One way pipes only size the buffer of the direction they use.
+        if buf_sz[0] > 0 and self.mode != BasePipe.Mode.WRITE_ONLY:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, buf_sz[0])
+        if buf_sz[1] > 0 and self.mode != BasePipe.Mode.READ_ONLY:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, buf_sz[1])
+
+    def __socket(self, buf_sz):
+        sock = socket.socket(socket.AF_UNIX, self.__sock_type)
+        # Accepted sockets inherit these from the listening one.
+        self.__size(sock, buf_sz)
+        return sock
+
+    def __halve(self, sock):
+        # Sockets are always duplex; one way pipes shut the unused half of
+        # the connection down so the peer sees it as closed (EOF on read,
+        # EPIPE on write) and nothing can pile up in that direction.
+        try:
+            if self.mode == BasePipe.Mode.READ_ONLY:
+                sock.shutdown(socket.SHUT_WR)
+            elif self.mode == BasePipe.Mode.WRITE_ONLY:
+                sock.shutdown(socket.SHUT_RD)
+        except socket.error as e:
+            # A peer that is gone already is found out on the first read
+            # or write.
+            if e.errno not in _BROKEN_PIPE_ERRORS:
+                raise
+
+    def __tune(self, sock):
+        # Grows (never shrinks) the receive buffer of a new connection to
+        # what the traffic seen by the other instances calls for. Linux
+        # reports twice the requested value; compare accordingly.
+        rcv_sz = self.sizer.kernel_size(self.buf_sz[0])
+        if rcv_sz * 2 > sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF):
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcv_sz)
+
+    def __setTimeout(self, sock, timeout):
+        # Timeouts are expressed in milliseconds throughout the ipc module.
+        # Changing the timeout costs a system call so only do it when it
+        # actually changes.
+        if timeout > 0:
+            timeout = timeout / 1000.0
+        else:
+            timeout = None
+        if sock.gettimeout() != timeout:
+            sock.settimeout(timeout)
+
+    def __getPipe(self):
+        if self.__hPipe is None:
+            raise PipeError(
+                'Pipe is not connected!',
+                'name',
+                self.name
+            )
+        return self.__hPipe
+
+    # Returns the child's end of an anonymous pipe. The handle is the
+    # inherited file descriptor, by default the one spawn put in the
+    # environment, and the channel has to match the one of the parent. The
+    # mode is that of the child's end: WRITE_ONLY when the parent only
+    # reads and the other way round.
+    @classmethod
+    def attach(cls, handle=None, channel=BasePipe.Channel.MESSAGE,
+               mode=BasePipe.Mode.DUPLEX):
+        if handle is None:
+            handle = int(os.environ[HANDLE_ENV])
+        pipe = cls(
+            '', BasePipe.Type.ANONYMOUS, mode, channel,
+            BasePipe.Transport.ASYNCHRONOUS, BasePipe.View.CLIENT
+        )
+        # fromfd duplicates the descriptor; keep just the one.
+        pipe.__hPipe = socket.fromfd(handle, socket.AF_UNIX, pipe.__sock_type)
+        os.close(handle)
+        return pipe
+
+    # Returns the (inheritable) file descriptor of the child's end.
+    def child_handle(self):
+        if self.__hChild is None:
+            raise PipeError(
+                'Pipe has no child end to hand out!',
+                'name',
+                self.name
+            )
+        handle = self.__hChild.fileno()
+        if hasattr(os, 'set_inheritable'):
+            os.set_inheritable(handle, True)
+        return handle
+
+    # Once the child holds its end the parent must drop its own copy or it
+    # would never see the pipe break when the child goes away.
+    def close_child_handle(self):
+        if self.__hChild is not None:
+            self.__hChild.close()
+            self.__hChild = None
+
+    # Starts a child process (arguments as for subprocess.Popen) which
+    # inherits the other end and picks it up with attach().
+    def spawn(self, args, **kwargs):
+        handle = self.child_handle()
+        env = dict(kwargs.pop('env', None) or os.environ)
+        env[HANDLE_ENV] = str(handle)
+        if sys.version_info[0] >= 3:
+            kwargs['pass_fds'] = tuple(kwargs.pop('pass_fds', ())) + (handle,)
+        else:
+            # Descriptors are inheritable and kept open by default there.
+            kwargs['close_fds'] = False
+        try:
+            process = subprocess.Popen(args, env=env, **kwargs)
+        finally:
+            self.close_child_handle()
+        return process
+
+    @instrumented('connect')
+    def connect(self, timeout=0, buf_sz=0):
+        if self.ptype == BasePipe.Type.ANONYMOUS:
+            # Connected from birth; just make sure it still is.
+            self.__getPipe()
+            return 0
+        if self.view == BasePipe.View.SERVER:
+            if self.__hPipe is not None:
+                raise PipeError(
+                    'Pipe instance is already connected!',
+                    'name',
+                    self.name
+                )
+            self.__setTimeout(self.__hListener, timeout)
+            try:
+                self.__hPipe, _ = self.__hListener.accept()
+            except socket.timeout:
+                raise PipeTimeoutError(
+                    'Connection timeout while awaiting pipe activity!',
+                    'event_timeout',
+                    timeout
+                )
+            # Accepted sockets may inherit the listener's timeout.
+            self.__hPipe.settimeout(None)
+            self.__tune(self.__hPipe)
+            self.__halve(self.__hPipe)
+
+        return 0
+
+    # A SOCK_SEQPACKET socket reads 0 bytes both for an empty message and
+    # once the other end shut down, and MSG_PEEK leaves the former queued.
+    # With SO_PASSCRED on, a message (empty or not) is received along with
+    # the credentials of its sender whereas the end of the connection comes
+    # with nothing, which tells them apart (status 0 and 1 respectively).
+    # Without recvmsg only a hang up left behind the received message tells
+    # it was the end, so an empty message sent right before hanging up is
+    # taken for the hang up.
+    def __receiveEmpty(self, hPipe):
+        if _CREDENTIALS_SZ is not None:
+            hPipe.setsockopt(socket.SOL_SOCKET, socket.SO_PASSCRED, 1)
+            try:
+                _, ancdata, _, _ = hPipe.recvmsg(1, _CREDENTIALS_SZ)
+            finally:
+                hPipe.setsockopt(socket.SOL_SOCKET, socket.SO_PASSCRED, 0)
+            if ancdata:
+                return 0
+            return 1
+        hPipe.recv_into(self.__peek, 1)
+        poller = select.poll()
+        poller.register(hPipe, select.POLLIN | _HANG_UP)
+        for _, events in poller.poll(0):
+            if events & _HANG_UP:
+                return 1
+        return 0
+
+    @instrumented('read', 'bytes_in')
+    def read(self, timeout=0, buf_sz=0):
+        self._allow(BasePipe.Mode.WRITE_ONLY)
+        hPipe = self.__getPipe()
+        self.__setTimeout(hPipe, timeout)
+        try:
+            if self.channel == BasePipe.Channel.MESSAGE:
+                # MSG_TRUNC makes the kernel report the real length of the
+                # queued message rather than the length copied so the
+                # payload can be received in one go into a buffer of the
+                # exact size (no ERROR_MORE_DATA style regrowth loop).
+                msg_sz = hPipe.recv_into(
+                    self.__peek, 1, socket.MSG_PEEK | socket.MSG_TRUNC
+                )
+                if msg_sz == 0:
+                    return self.__receiveEmpty(hPipe), 0, b''
+                pipe_data = hPipe.recv(msg_sz)
+                self.sizer.observe(msg_sz)
+            else:
+                if buf_sz <= 0:
+                    buf_sz = self.sizer.size
+                pipe_data = hPipe.recv(buf_sz)
+                if len(pipe_data) == 0:
+                    return 1, 0, pipe_data
+                # A full buffer means there was more waiting; ask for more
+                # next time.
+                if len(pipe_data) == buf_sz:
+                    self.sizer.observe(buf_sz * 2)
+                else:
+                    self.sizer.observe(len(pipe_data))
+        except socket.timeout:
+            raise PipeTimeoutError(
+                'Connection timeout while awaiting pipe activity!',
+                'event_timeout',
+                timeout
+            )
+        except socket.error as e:
+            if e.errno in _BROKEN_PIPE_ERRORS:
+                return 1, 0, b''
+            raise
+
+        return 0, len(pipe_data), pipe_data
+
+    # A message which does not fit the buffer is left queued in the socket.
+    @instrumented('read_into', 'bytes_in')
+    def read_into(self, buffer, timeout=0):
+        self._allow(BasePipe.Mode.WRITE_ONLY)
+        hPipe = self.__getPipe()
+        self.__setTimeout(hPipe, timeout)
+        try:
+            if self.channel == BasePipe.Channel.MESSAGE:
+                msg_sz = hPipe.recv_into(
+                    self.__peek, 1, socket.MSG_PEEK | socket.MSG_TRUNC
+                )
+                if msg_sz == 0:
+                    return self.__receiveEmpty(hPipe), 0
+                if msg_sz > len(buffer):
+                    raise PipeError(
+                        'Buffer too small for pipe message!',
+                        'msg_sz',
+                        msg_sz
+                    )
+                read_bytes = hPipe.recv_into(buffer, msg_sz)
+            else:
+                read_bytes = hPipe.recv_into(buffer)
+                if read_bytes == 0:
+                    return 1, 0
+        except socket.timeout:
+            raise PipeTimeoutError(
+                'Connection timeout while awaiting pipe activity!',
+                'event_timeout',
+                timeout
+            )
+        except socket.error as e:
+            if e.errno in _BROKEN_PIPE_ERRORS:
+                return 1, 0
+            raise
+
+        return 0, read_bytes
+
+    @instrumented('write', 'bytes_out')
+    def write(self, payload, timeout=0, buf_sz=0):
+        self._allow(BasePipe.Mode.READ_ONLY)
+        hPipe = self.__getPipe()
+        if not isinstance(payload, (bytes, bytearray, memoryview)):
+            payload = payload.encode('utf-8')
+        if buf_sz > 0:
+            payload = payload[:buf_sz]
+        self.__setTimeout(hPipe, timeout)
+        try:
+            if self.channel == BasePipe.Channel.MESSAGE:
+                # A SOCK_SEQPACKET send is atomic: all or nothing.
+                written_bytes = self.__sendMessage(hPipe, payload)
+            else:
+                hPipe.sendall(payload)
+                written_bytes = len(payload)
+        except socket.timeout:
+            raise PipeTimeoutError(
+                'Connection timeout while awaiting pipe activity!',
+                'event_timeout',
+                timeout
+            )
+        except socket.error as e:
+            if e.errno in _BROKEN_PIPE_ERRORS:
+                return 1, 0
+            raise
+
+        return 0, written_bytes
+
+    # There is no single system call sending a message and receiving one so
+    # this is a send followed by a receive of the exact reply size; the
+    # socket is only set up once for both.
+    @instrumented('transact', 'bytes_in')
+    def transact(self, payload, timeout=0, buf_sz=0):
+        if self.transport != BasePipe.Transport.TRANSACTIONAL:
+            raise PipeError(
+                'Pipe transport is not transactional!',
+                'transport',
+                self.transport.value
+            )
+        hPipe = self.__getPipe()
+        if not isinstance(payload, (bytes, bytearray, memoryview)):
+            payload = payload.encode('utf-8')
+        self.__setTimeout(hPipe, timeout)
+        try:
+            self.__sendMessage(hPipe, payload)
+            msg_sz = hPipe.recv_into(
+                self.__peek, 1, socket.MSG_PEEK | socket.MSG_TRUNC
+            )
+            if msg_sz == 0:
+                return self.__receiveEmpty(hPipe), 0, b''
+            pipe_data = hPipe.recv(msg_sz)
+        except socket.timeout:
+            raise PipeTimeoutError(
+                'Connection timeout while awaiting pipe activity!',
+                'event_timeout',
+                timeout
+            )
+        except socket.error as e:
+            if e.errno in _BROKEN_PIPE_ERRORS:
+                return 1, 0, b''
+            raise
+        self.sizer.observe(msg_sz)
+        return 0, len(pipe_data), pipe_data
+
+    def __sendMessage(self, hPipe, payload):
+        try:
+            return hPipe.send(payload)
+        except socket.error as e:
+            if e.errno != errno.EMSGSIZE:
+                raise
+        # A SOCK_SEQPACKET message has to fit the send buffer in one piece.
+        # Grow the buffer (the kernel caps it at net.core.wmem_max) and try
+        # once more before giving up.
+        if self.metrics is not None:
+            self.metrics.count('buffer_regrowths')
+        hPipe.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, len(payload))
+        try:
+            return hPipe.send(payload)
+        except socket.error as e:
+            if e.errno != errno.EMSGSIZE:
+                raise
+        raise PipeError(
+            'Message exceeds the socket buffer size!',
+            'msg_sz',
+            len(payload)
+        )
+
+    def __sendVectored(self, hPipe, payloads):
+        # sendmsg may stop anywhere in the middle of the batch; skip what
+        # went through and carry on from there.
+        if not hasattr(hPipe, 'sendmsg'):
+            hPipe.sendall(b''.join(payloads))
+            return
+        views = [memoryview(payload) for payload in payloads]
+        first = 0
+        while first < len(views):
+            sent = hPipe.sendmsg(views[first:first + _IOV_MAX])
+            while first < len(views) and sent >= len(views[first]):
+                sent -= len(views[first])
+                first += 1
+            if sent > 0:
+                views[first] = views[first][sent:]
+
+    @instrumented('write_many', 'bytes_out')
+    def write_many(self, payloads, timeout=0):
+        self._allow(BasePipe.Mode.READ_ONLY)
+        hPipe = self.__getPipe()
+        batch = []
+        for payload in payloads:
+            if not isinstance(payload, (bytes, bytearray, memoryview)):
+                payload = payload.encode('utf-8')
+            batch.append(payload)
+        self.__setTimeout(hPipe, timeout)
+        written_bytes = 0
+        try:
+            if self.channel == BasePipe.Channel.MESSAGE:
+                # Each sendmsg on a SOCK_SEQPACKET socket is one message so
+                # there is nothing to gather here.
+                for payload in batch:
+                    written_bytes += self.__sendMessage(hPipe, payload)
+            else:
+                self.__sendVectored(hPipe, batch)
+                written_bytes = sum(len(payload) for payload in batch)
+        except socket.timeout:
+            raise PipeTimeoutError(
+                'Connection timeout while awaiting pipe activity!',
+                'event_timeout',
+                timeout
+            )
+        except socket.error as e:
+            if e.errno in _BROKEN_PIPE_ERRORS:
+                return 1, written_bytes
+            raise
+
+        return 0, written_bytes
+
+    def fileno(self):
+        if self.__hPipe is not None:
+            return self.__hPipe.fileno()
+        return self.__hListener.fileno()
+
+    def _accept(self):
+        # Non-blocking flavour of connect() for readiness driven servers
+        # (see UnixPipeEngine). Returns a new connected instance or None if
+        # no client is waiting.
+        self.__hListener.setblocking(False)
+        try:
+            hPipe, _ = self.__hListener.accept()
+        except socket.error as e:
+            if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                return None
+            raise
+        hPipe.setblocking(True)
+        self.__tune(hPipe)
+        self.__halve(hPipe)
+        pipe = self._instance()
+        pipe.__hPipe = hPipe
+        if self.metrics is not None:
+            self.metrics.count('connect')
+        return pipe
+
+    def cancel(self):
+        hPipe = self.__hPipe
+        if hPipe is not None:
+            # Wakes up blocked calls without closing the socket under them.
+            try:
+                hPipe.shutdown(socket.SHUT_RDWR)
+            except socket.error:
+                pass
+
+    def close(self):
+        if self.__hPipe is not None:
+            # Like with the listener, closing alone does not wake up a
+            # thread blocked reading from the connection.
+            try:
+                self.__hPipe.shutdown(socket.SHUT_RDWR)
+            except socket.error:
+                pass
+            self.__hPipe.close()
+            self.__hPipe = None
+
+    def _instance(self):
+        # All instances of a named pipe share the one listening socket and
+        # each of them owns the connection it accepted.
+        if self.view != BasePipe.View.SERVER:
+            raise NotImplementedError(
+                'This should only be done from a ServerPipe!'
+            )
+        if self.ptype == BasePipe.Type.ANONYMOUS:
+            raise NotImplementedError(
+                'Anonymous pipes have a single connection!'
+            )
+        pipe = copy.copy(self)
+        pipe.__peek = bytearray(1)
+        pipe.__hPipe = None
+        pipe.__owner = False
+        return pipe
+
+    def _release(self):
+        self.close()
+        self.close_child_handle()
+        if self.__hListener is not None and self.__owner:
+            # Closing alone does not wake up threads blocked in accept().
+            try:
+                self.__hListener.shutdown(socket.SHUT_RDWR)
+            except socket.error:
+                pass
+            self.__hListener.close()
+        self.__hListener = None
@@ -0,0 +1,202 @@
+# Copyright (C) 2014/15 - Iraklis Diakos (hdiakos@outlook.com)
+# Pilavidis Kriton (kriton_pilavidis@outlook.com)
+# All Rights Reserved.
+# You may use, distribute and modify this code under the
+# terms of the ASF 2.0 license.
+#
+
+"""Part of the ipc module."""
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+# Python native libraries.
+import array
+import fcntl
+import logging
+import multiprocessing
+import os
+import select
+import termios
+import threading
+
+from crapi.ipc.PipeTimer import PipeTimer
+
+_log = logging.getLogger(__name__)
+
+_EPOLLRDHUP = getattr(select, 'EPOLLRDHUP', 0x2000)
+_HANGUP = select.EPOLLHUP | select.EPOLLERR | _EPOLLRDHUP
+
+
+class UnixPipeEngine(object):
+
+    """An epoll driven engine serving every client of a ServerPipe."""
+
+    """
+        The listening socket and all connections are registered with a
+        single epoll instance which a small pool of worker threads waits on.
+        Every descriptor is armed with EPOLLONESHOT so that exactly one
+        worker picks up an event and re-arms the descriptor once done; a
+        connection is therefore never handled by two threads at once.
+        Session and idle deadlines are entries of the shared PipeTimer; one
+        expiring cancels the connection, which then hangs up like any
+        client going away.
+    """
+
+    def __init__(self, workers=0):
+        """Default initialization class method."""
+        if workers <= 0:
+            workers = multiprocessing.cpu_count()
+        self.workers = workers
+        self.__stopping = threading.Event()
+        self.__lock = threading.Lock()
+
+    def __arm(self, fd, register=False):
+        events = select.EPOLLIN | _EPOLLRDHUP | select.EPOLLONESHOT
+        if register:
+            self.__epoll.register(fd, events)
+        else:
+            self.__epoll.modify(fd, events)
+
+    def __pending(self, fd):
+        # FIONREAD tells whether anything is left to read before a hang up.
+        count = array.array(str('i'), [0])
+        try:
+            fcntl.ioctl(fd, termios.FIONREAD, count, True)
+        except IOError:
+            return 0
+        return count[0]
+
+    def __accept(self):
+        while True:
+            with self.__lock:
+                if len(self.__clients) >= self.__limit:
+                    # Stay disarmed until a client goes away.
+                    self.__paused = True
+                    return
+            pipe = self.__pipe._accept()
+            if pipe is None:
+                break
+            fd = pipe.fileno()
+            expiries = [None, None]
+            if self.__session_timeout > 0:
+                expiries[0] = self.__timer.schedule(
+                    self.__session_timeout, self.__timeout, fd, expiries
+                )
+            with self.__lock:
+                self.__clients[fd] = pipe
+                self.__expiries[fd] = expiries
+            self.__idle(fd)
+            self.__arm(fd, True)
+        self.__arm(self.__pipe.fileno())
+
+    # (Re)starts the idle deadline of a client about to wait for its next
+    # request; handing it to the handler stops it again.
+    def __idle(self, fd):
+        if self.__idle_timeout > 0:
+            with self.__lock:
+                expiries = self.__expiries[fd]
+            expiry = self.__timer.schedule(
+                self.__idle_timeout, self.__timeout, fd, expiries
+            )
+            with self.__lock:
+                expiries[1] = expiry
+
+    # Runs on the timer thread. The descriptor of a client which went away
+    # may already belong to the next one; its expiries tell them apart.
+    def __timeout(self, fd, expiries):
+        with self.__lock:
+            if self.__expiries.get(fd) is expiries:
+                self.__clients[fd].cancel()
+
+    def __busy(self, fd):
+        with self.__lock:
+            expiry, self.__expiries[fd][1] = self.__expiries[fd][1], None
+        if expiry is not None:
+            self.__timer.cancel(expiry)
+
+    def __drop(self, fd):
+        with self.__lock:
+            pipe = self.__clients.pop(fd)
+            expiries = self.__expiries.pop(fd)
+            resume, self.__paused = self.__paused, False
+        for expiry in expiries:
+            if expiry is not None:
+                self.__timer.cancel(expiry)
+        self.__epoll.unregister(fd)
+        pipe._release()
+        if resume:
+            self.__arm(self.__pipe.fileno())
+
+    def __work(self):
+        listener = self.__pipe.fileno()
+        while True:
+            for fd, events in self.__epoll.poll():
+                if fd == self.__wakeup:
+                    return
+                if fd == listener:
+                    self.__accept()
+                    continue
+                with self.__lock:
+                    pipe = self.__clients[fd]
+                if events & _HANGUP and self.__pending(fd) == 0:
+                    self.__drop(fd)
+                    continue
+                self.__busy(fd)
+                try:
+                    self.__handler(pipe)
+                except Exception:
+                    _log.exception('Pipe handler failed for %s!', pipe.name)
+                    self.__drop(fd)
+                    continue
+                self.__idle(fd)
+                self.__arm(fd)
+
+    # The handler is called with the connected pipe instance every time its
+    # client has sent something; it should read what is there, reply if it
+    # wants to and return rather than wait for more.
+    # Clients are disconnected session_timeout milliseconds after connecting
+    # or once idle for idle_timeout milliseconds (0 meaning never).
+    def serve(self, pipe, handler, instances=0, session_timeout=0,
+              idle_timeout=0):
+        if instances <= 0:
+            instances = pipe.instances
+        self.__pipe = pipe
+        self.__handler = handler
+        self.__limit = instances
+        self.__session_timeout = session_timeout
+        self.__idle_timeout = idle_timeout
+        self.__timer = PipeTimer.shared()
+        self.__clients = {}
+        # Client fd -> [session deadline, idle deadline] timer entries.
+        self.__expiries = {}
+        self.__paused = False
+        self.__stopping.clear()
+        self.__epoll = select.epoll()
+        wakeup_r, wakeup_w = os.pipe()
+        self.__wakeup = wakeup_r
+        self.__epoll.register(wakeup_r, select.EPOLLIN)
+        self.__arm(pipe.fileno(), True)
+
+        workers = []
+        for _ in range(self.workers):
+            workers.append(threading.Thread(target=self.__work))
+        for thread in workers:
+            thread.daemon = True
+            thread.start()
+
+        self.__stopping.wait()
+
+        # The wake up pipe stays readable so it reaches every worker.
+        os.write(wakeup_w, b'\0')
+        for thread in workers:
+            thread.join()
+        for fd in list(self.__clients):
+            self.__drop(fd)
+        self.__epoll.close()
+        os.close(wakeup_r)
+        os.close(wakeup_w)
+        pipe._release()
+
+    def shutdown(self):
+        self.__stopping.set()
@@ -0,0 +1,775 @@
+# Copyright (C) 2014/15 - Iraklis Diakos (hdiakos@outlook.com)
+# Pilavidis Kriton (kriton_pilavidis@outlook.com)
+# All Rights Reserved.
+# You may use, distribute and modify this code under the
+# terms of the ASF 2.0 license.
+#
+
+"""Part of the ipc module."""
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+# Python native libraries.
+from collections import deque
+import math
+import os
+import subprocess
+import threading
+import time
+# Python 3rd party libraries.
+import win32api as w32api
+import win32con as w32con
+import win32pipe as w32p
+import win32file as w32f
+import win32event as w32ev
+import pywintypes as WinT
+import winerror as werr
+
+from crapi.ipc.BasePipe import BasePipe
+from crapi.ipc.PipeError import PipeError
+from crapi.ipc.PipeMetrics import instrumented
+from crapi.ipc.PipeTimeoutError import PipeTimeoutError
+
+
+# Upper bound of idle OVERLAPPED structures (and events) kept per pipe.
+_OVERLAPPED_POOL_SZ = 16
+
+# Upper bound of fire and forget writes pending per pipe; past it a write
+# waits for the oldest one so that a stalled reader cannot make us pile up
+# kernel buffers and events without limit.
+_INFLIGHT_MAX = 64
+
+# Errors which mean the other end went away, or that the operation was
+# aborted by cancel (or a disconnect); they are reported as a broken pipe.
+_BROKEN_PIPE_ERRORS = (
+    werr.ERROR_BROKEN_PIPE,
+    werr.ERROR_PIPE_NOT_CONNECTED,
+    werr.ERROR_OPERATION_ABORTED,
+)
+
+# Deadlines must not move with the wall clock.
+_clock = getattr(time, 'monotonic', time.time)
+
+# Environment variable telling a child spawned with WinPipe.spawn which
+# inherited handle is its end of an anonymous pipe.
+HANDLE_ENV = 'CRAPI_PIPE_HANDLE'
+
+
+class WinPipe(BasePipe):
+
+    # TODO: Check buffer ends by overflowing them!
+    def __init__(self, name='', ptype=BasePipe.Type.NAMED,
+                 mode=BasePipe.Mode.DUPLEX, channel=BasePipe.Channel.MESSAGE,
+                 transport=BasePipe.Transport.ASYNCHRONOUS,
+                 view=BasePipe.View.SERVER, instances=0, buf_sz=[0, 0]):
+
+        super(WinPipe, self).__init__(
+            name, ptype, mode, channel, transport, view, instances, buf_sz
+        )
+
+        # Anonymous pipes (CreatePipe) are one way byte streams lacking
+        # overlapped I/O; a duplex one would need a pair of them.
+        if self.ptype == BasePipe.Type.ANONYMOUS:
+            if self.mode == BasePipe.Mode.DUPLEX or \
+                    self.channel != BasePipe.Channel.BYTE:
+                raise NotImplementedError(
+                    'Sorry! Duplex or message anonymous pipes are a WIP!'
+                )
+            self.transport = BasePipe.Transport.SYNCHRONOUS
+
+        # One way server pipes only get the kernel buffer they use. The
+        # client opens the pipe with the matching access right.
+        if self.mode == BasePipe.Mode.DUPLEX:
+            self.__mode = w32p.PIPE_ACCESS_DUPLEX
+        elif self.mode == BasePipe.Mode.READ_ONLY:
+            self.__mode = w32p.PIPE_ACCESS_INBOUND
+            buf_sz = [buf_sz[0], 0]
+        else:
+            self.__mode = w32p.PIPE_ACCESS_OUTBOUND
+            buf_sz = [0, buf_sz[1]]
+
+        if self.channel == BasePipe.Channel.MESSAGE:
+            self.__channel = w32p.PIPE_TYPE_MESSAGE
+            # This will enable the ERROR_MORE_DATA exception although we
+            # could handle the case of having more data in the buffer
+            # without it.
+            self.__channel |= w32p.PIPE_READMODE_MESSAGE
+        else:
+            # Plain byte streams; message boundaries, if any, are up to the
+            # caller (see FramedPipe).
+            self.__channel = w32p.PIPE_TYPE_BYTE | w32p.PIPE_READMODE_BYTE
+
+        # Transactional pipes use overlapped I/O just like asynchronous ones.
+        # Using PIPE_NOWAIT in overlapped mode is deprecated and will cause
+        # an ERROR_PIPE_LISTENING exception when using ConnectNamedPipe.
+        # To avoid inefficient polling, which is CPU-stressing we make use of
+        # events (aka signals!).
+        # NOTE: If FILE_FLAG_OVERLAPPED is specified with PIPE_WAIT then
+        #       ConnectNamedPipe will not raise an ERROR_PIPE_LISTENING
+        #       exception however any read/write operation in the pipe stream
+        #       will cause that.
+        if self.view == BasePipe.View.SERVER:
+            if self.transport != BasePipe.Transport.SYNCHRONOUS:
+                self.__open_mode = self.__mode | w32f.FILE_FLAG_OVERLAPPED
+            else:
+                self.__open_mode = self.__mode
+            self.__open_mode2 = 0
+            self.__pipe_mode = self.__channel | w32p.PIPE_WAIT
+        else:
+            self.__open_mode = w32f.OPEN_EXISTING
+            self.__open_mode2 = w32f.FILE_FLAG_OVERLAPPED
+            if self.__mode == w32p.PIPE_ACCESS_DUPLEX:
+                self.__pipe_mode = w32f.GENERIC_READ | w32f.GENERIC_WRITE
+            elif self.__mode == w32p.PIPE_ACCESS_INBOUND:
+                self.__pipe_mode = w32f.GENERIC_READ
+            else:
+                self.__pipe_mode = w32f.GENERIC_WRITE
+
+        if instances == 0:
+            self.__instances = w32p.PIPE_UNLIMITED_INSTANCES
+        else:
+            self.__instances = instances
+
+        # Completed OVERLAPPED structures ready for reuse and fire and forget
+        # writes whose structures cannot be reused before they complete.
+        # Threads reading and writing at once share both.
+        self.__overlapped = deque()
+        self.__inflight = deque()
+        self.__streamsLock = threading.Lock()
+        # Error code of the first fire and forget write found failed, for
+        # the next write to report.
+        self.__writeError = None
+        # The other end of an anonymous pipe until it is handed to a child.
+        self.__hChild = None
+
+        if self.ptype == BasePipe.Type.ANONYMOUS:
+            # The client view is the child's end, see attach.
+            self.__hPipe = None
+            if self.view == BasePipe.View.SERVER:
+                sa = WinT.SECURITY_ATTRIBUTES()
+                sa.bInheritHandle = True
+                if self.mode == BasePipe.Mode.READ_ONLY:
+                    self.__hPipe, self.__hChild = w32p.CreatePipe(
+                        sa, buf_sz[0]
+                    )
+                else:
+                    self.__hChild, self.__hPipe = w32p.CreatePipe(
+                        sa, buf_sz[1]
+                    )
+                # Only the child's end is meant to be inherited.
+                w32api.SetHandleInformation(
+                    self.__hPipe, w32con.HANDLE_FLAG_INHERIT, 0
+                )
+        elif self.ptype == BasePipe.Type.NAMED:
+            if self.view == BasePipe.View.SERVER:
+                self.__hPipe = w32p.CreateNamedPipe(
+                    '\\\\.\\pipe\\' + self.name,
+                    self.__open_mode,
+                    self.__pipe_mode,
+                    self.__instances,
+                    buf_sz[1],
+                    buf_sz[0],
+                    0,  # 50ms per MSDN documentation
+                    None
+                )
+            else:
+                self.__hPipe = w32f.CreateFile(
+                    '\\\\.\\pipe\\' + self.name,
+                    self.__pipe_mode,
+                    0,
+                    None,
+                    self.__open_mode,
+                    self.__open_mode2,
+                    None
+                )
+                if self.transport == BasePipe.Transport.TRANSACTIONAL:
+                    # TransactNamedPipe insists on a message read mode.
+                    w32p.SetNamedPipeHandleState(
+                        self.__hPipe, w32p.PIPE_READMODE_MESSAGE, None, None
+                    )
+
+    def __getOverlappedStruct(self):
+        # We should use a new overlapped object for each asynchronous
+        # operation since the MSDN site states:
+        # "A common mistake is to reuse an OVERLAPPED structure before the
+        #  previous asynchronous operation has been completed. You should
+        #  use a separate structure for each request. You should also create
+        #  an event object for each thread that processes data. If you store
+        #  the event handles in an array, you could easily wait for all events
+        #  to be signaled using the WaitForMultipleObjects function."
+        #
+        # Source URL:
+        #   https://msdn.microsoft.com/en-us/library/windows/desktop/ms684342(v=vs.85).aspx
+        # Additional URLs:
+        #   https://msdn.microsoft.com/en-us/library/windows/desktop/aa365683(v=vs.85).aspx
+        # Also, it is suggested to initialize all offset fields to 0.
+        # A structure is only handed out again once the operation it was
+        # used for has completed (see __putOverlappedStruct) in which case
+        # it is as good as new once its event is reset. This spares us a
+        # kernel event per I/O operation.
+        self.__reapOverlappedStructs()
+        try:
+            with self.__streamsLock:
+                stream = self.__overlapped.pop()
+        except IndexError:
+            stream = WinT.OVERLAPPED()
+            stream.hEvent = w32ev.CreateEvent(None, False, False, None)
+        else:
+            # Operations completing synchronously leave the event signaled.
+            w32ev.ResetEvent(stream.hEvent)
+        # Named pipes and communications devices don't use this but in order to
+        # follow a uniform strategy we manually update this value in such
+        # situations.
+        # Source URL:
+        #   docs.activestate.com/activepython/3.4/pywin32/PyOVERLAPPED.html
+        stream.Offset = 0
+        stream.OffsetHigh = 0
+
+        return stream
+
+    def __putOverlappedStruct(self, stream):
+        # Only ever call this once the operation using stream has completed!
+        with self.__streamsLock:
+            if len(self.__overlapped) < _OVERLAPPED_POOL_SZ:
+                self.__overlapped.append(stream)
+                return
+        w32api.CloseHandle(stream.hEvent)
+
+    def __reapOverlappedStructs(self):
+        # Recycles the structures of the writes which completed since.
+        completed = []
+        with self.__streamsLock:
+            for _ in range(len(self.__inflight)):
+                stream = self.__inflight.popleft()
+                try:
+                    w32f.GetOverlappedResult(self.__hPipe, stream, False)
+                except WinT.error as e:
+                    if e.args[0] == werr.ERROR_IO_INCOMPLETE:
+                        self.__inflight.append(stream)
+                        continue
+                    if self.__writeError is None:
+                        self.__writeError = e.args[0]
+                completed.append(stream)
+        for stream in completed:
+            self.__putOverlappedStruct(stream)
+
+    def __awaitOverlappedStructs(self, deadline, timeout):
+        # Makes room for one more write; a timeout leaves the pending writes
+        # (and the one not issued yet) alone. The write waited for is taken
+        # out of the queue meanwhile so that no other thread recycles (or
+        # waits on) its structure.
+        self.__reapOverlappedStructs()
+        while True:
+            with self.__streamsLock:
+                if len(self.__inflight) < _INFLIGHT_MAX:
+                    return
+                stream = self.__inflight.popleft()
+            try:
+                self.__waitForEvent(stream, deadline, timeout)
+            except Exception:
+                with self.__streamsLock:
+                    self.__inflight.appendleft(stream)
+                raise
+            try:
+                w32f.GetOverlappedResult(self.__hPipe, stream, False)
+            except WinT.error as e:
+                with self.__streamsLock:
+                    if self.__writeError is None:
+                        self.__writeError = e.args[0]
+            finally:
+                self.__putOverlappedStruct(stream)
+
+    def __settleOverlappedStructs(self):
+        # Disconnecting fails the writes still in flight; wait for them to
+        # land so that the next client of the instance inherits neither
+        # their structures nor their failure.
+        with self.__streamsLock:
+            pending = list(self.__inflight)
+            self.__inflight.clear()
+        for stream in pending:
+            try:
+                w32f.GetOverlappedResult(self.__hPipe, stream, True)
+            except WinT.error:
+                pass
+            self.__putOverlappedStruct(stream)
+        with self.__streamsLock:
+            self.__writeError = None
+
+    def __cancelOverlappedStruct(self, stream):
+        # An operation that timed out is still owned by the kernel; cancel it
+        # (and only it, other threads may have I/O pending on the pipe) and
+        # wait for the cancellation to land before recycling stream.
+        try:
+            w32f.CancelIoEx(self.__hPipe, stream)
+            w32f.GetOverlappedResult(self.__hPipe, stream, True)
+        except WinT.error:
+            pass
+        self.__putOverlappedStruct(stream)
+
+    # The timeout of a call bounds the whole operation, however many waits
+    # it takes, rather than each wait; 0 waits indefinitely.
+    def __deadline(self, timeout):
+        if timeout > 0:
+            return _clock() + timeout / 1000.0
+        return None
+
+    def __waitForEvent(self, stream, deadline, timeout):
+        # Asynchronous I/O operations may complete in the
+        # blink of an eye giving the false impression that
+        # it completed as a synchronous I/O. As such, we
+        # have to wait for the event to be signaled by the
+        # read operation.
+        # This is also required if GetOverlappedResult does
+        # not wait for data to become available (bWait is
+        # set to False) otherwise it will complain that the
+        # event handler is in a non-signaled state.
+        if deadline is None:
+            event_timeout = w32ev.INFINITE
+        else:
+            event_timeout = max(
+                0, int(math.ceil((deadline - _clock()) * 1000))
+            )
+        event_code = w32ev.WaitForSingleObject(
+            stream.hEvent, event_timeout
+        )
+        if event_code == w32ev.WAIT_TIMEOUT:
+            raise PipeTimeoutError(
+                    'Connection timeout while awaiting pipe activity!',
+                    'event_timeout',
+                    timeout,
+                    'event_code',
+                    event_code
+            )
+        elif event_code != w32ev.WAIT_OBJECT_0:
+            raise PipeError(
+                'Unexpected pipe signal code event!',
+                'event_code',
+                event_code
+            )
+
+    def __fill(self, view, deadline, timeout):
+        # Issues a single overlapped ReadFile into the given memoryview and
+        # returns a (broken pipe, bytes read, more data) triplet.
+        stream = self.__getOverlappedStruct()
+        try:
+            pipe_status, _ = w32f.ReadFile(self.__hPipe, view, stream)
+        except WinT.error as e:
+            self.__putOverlappedStruct(stream)
+            if e.args[0] in _BROKEN_PIPE_ERRORS:
+                return True, 0, False
+            raise
+        if pipe_status == werr.ERROR_MORE_DATA:
+            self.__putOverlappedStruct(stream)
+            return False, len(view), True
+        elif pipe_status == werr.ERROR_IO_PENDING:
+            try:
+                self.__waitForEvent(stream, deadline, timeout)
+            except PipeTimeoutError:
+                self.__cancelOverlappedStruct(stream)
+                raise
+        elif pipe_status != 0:
+            raise PipeError(
+                'Pipe encountered a fatal error!',
+                'error_code',
+                w32api.GetLastError()
+            )
+        try:
+            read_bytes = w32f.GetOverlappedResult(
+                self.__hPipe, stream, False
+            )
+        except WinT.error as e:
+            if e.args[0] == werr.ERROR_MORE_DATA:
+                self.__putOverlappedStruct(stream)
+                return False, len(view), True
+            elif e.args[0] in _BROKEN_PIPE_ERRORS:
+                self.__putOverlappedStruct(stream)
+                return True, 0, False
+            raise
+        self.__putOverlappedStruct(stream)
+        return False, read_bytes, False
+
+    def __messageLeft(self):
+        # PeekNamedPipe reports how much of the current message is still
+        # sitting in the pipe so the buffer can be grown to the exact size.
+        _, _, left = w32p.PeekNamedPipe(self.__hPipe, 0)
+        return left
+
+    # Returns the child's end of an anonymous pipe. The handle is the
+    # inherited one, by default the one spawn put in the environment, and
+    # the channel has to match the one of the parent. The mode is that of
+    # the child's end: WRITE_ONLY when the parent only reads and the other
+    # way round.
+    @classmethod
+    def attach(cls, handle=None, channel=BasePipe.Channel.MESSAGE,
+               mode=BasePipe.Mode.DUPLEX):
+        if handle is None:
+            handle = int(os.environ[HANDLE_ENV])
+        pipe = cls(
+            '', BasePipe.Type.ANONYMOUS, mode, channel,
+            BasePipe.Transport.SYNCHRONOUS, BasePipe.View.CLIENT
+        )
+        pipe.__hPipe = WinT.HANDLE(handle)
+        # Keep it from leaking into the children of the child.
+        w32api.SetHandleInformation(
+            pipe.__hPipe, w32con.HANDLE_FLAG_INHERIT, 0
+        )
+        return pipe
+
+    # Returns the (inheritable) handle of the child's end.
+    def child_handle(self):
+        if self.__hChild is None:
+            raise PipeError(
+                'Pipe has no child end to hand out!',
+                'name',
+                self.name
+            )
+        return int(self.__hChild)
+
+    # Once the child holds its end the parent must drop its own copy or it
+    # would never see the pipe break when the child goes away.
+    def close_child_handle(self):
+        if self.__hChild is not None:
+            self.__hChild.Close()
+            self.__hChild = None
+
+    # Starts a child process (arguments as for subprocess.Popen) which
+    # inherits the other end and picks it up with attach().
+    def spawn(self, args, **kwargs):
+        handle = self.child_handle()
+        env = dict(kwargs.pop('env', None) or os.environ)
+        env[HANDLE_ENV] = str(handle)
+        # Inheritable handles are only passed on without close_fds.
+        kwargs['close_fds'] = False
+        try:
+            process = subprocess.Popen(args, env=env, **kwargs)
+        finally:
+            self.close_child_handle()
+        return process
+
+    @instrumented('connect')
+    def connect(self, timeout=0, buf_sz=0):
+        if self.ptype == BasePipe.Type.ANONYMOUS:
+            # Connected from birth.
+            return 0
+        if self.transport != BasePipe.Transport.SYNCHRONOUS:
+            deadline = self.__deadline(timeout)
+            stream = self.__getOverlappedStruct()
+            # Asynchronous named pipes return immediately!
+            status_code = w32p.ConnectNamedPipe(
+                self.__hPipe, stream
+            )
+            if status_code != werr.ERROR_IO_PENDING:
+                raise PipeError(
+                    'Failed to create unsynchronous named pipe connection!',
+                    'status_code',
+                    status_code
+                )
+            try:
+                self.__waitForEvent(stream, deadline, timeout)
+            except PipeTimeoutError:
+                self.__cancelOverlappedStruct(stream)
+                raise
+            self.__putOverlappedStruct(stream)
+        else:
+            status_code = w32p.ConnectNamedPipe(self.__hPipe, None)
+            if status_code != 0:
+                raise PipeError(
+                    'Failed to create synchronous named pipe connection!',
+                    'status_code',
+                    status_code
+                )
+
+        return 0
+
+    # Some notes about the read operation when in server view mode:
+    # Status Code, GetLastError() - some possible scenarios are listed:
+    # 0, 0 from start to finish. May cause ERROR_BROKEN_PIPE.
+    # 997, 997 in start and finish of I/O operation.
+    # 234, 234 after the first I/O; buffer is too small and while growing
+    # it we reach a 0, 234 with a possibility of ERROR_BROKEN_PIPE
+    # (recoverable).
+    # Unlike the MS ReadWrite/WriteFile variants, these one return 0,
+    # ERROR_IO_PENDING or ERROR_MORE_DATA making use of the GetLastError()
+    # quite unnecessary.
+    # The message is assembled in a single pooled buffer: on ERROR_MORE_DATA
+    # the size of the remainder is known so the buffer is regrown at most
+    # once and the rest is read straight behind what we already have.
+    # TODO: ERROR_MORE_DATA in synchronous I/O only?
+    @instrumented('read', 'bytes_in')
+    def read(self, timeout=0, buf_sz=0):
+        self._allow(BasePipe.Mode.WRITE_ONLY)
+        if self.transport != BasePipe.Transport.SYNCHRONOUS:
+            deadline = self.__deadline(timeout)
+            if buf_sz <= 0:
+                buf_sz = self.sizer.size
+            pipe_buf = self.pool.acquire(buf_sz)
+            offset = 0
+            try:
+                while True:
+                    broken, read_bytes, more = self.__fill(
+                        memoryview(pipe_buf)[offset:], deadline, timeout
+                    )
+                    offset += read_bytes
+                    if broken or not more:
+                        break
+                    msg_sz = offset + self.__messageLeft()
+                    if msg_sz > len(pipe_buf):
+                        if self.metrics is not None:
+                            self.metrics.count('buffer_regrowths')
+                        new_buf = self.pool.acquire(msg_sz)
+                        memoryview(new_buf)[:offset] = \
+                            memoryview(pipe_buf)[:offset]
+                        self.pool.release(pipe_buf)
+                        pipe_buf = new_buf
+                pipe_data = bytes(memoryview(pipe_buf)[:offset])
+            finally:
+                self.pool.release(pipe_buf)
+            self.sizer.observe(offset)
+            if broken:
+                return 1, offset, pipe_data
+            return 0, offset, pipe_data
+        else:
+            if buf_sz <= 0:
+                buf_sz = self.sizer.size
+            try:
+                pipe_status, pipe_content = w32f.ReadFile(
+                    self.__hPipe, buf_sz, None
+                )
+            except WinT.error as e:
+                if e.args[0] in _BROKEN_PIPE_ERRORS:
+                    return 1, 0, b''
+                raise
+            self.sizer.observe(len(pipe_content))
+            return 0, len(pipe_content), pipe_content
+
+    # Unlike read, a message which does not fit the buffer is not consumed
+    # past the buffer size: the remainder stays in the pipe (the usual
+    # ERROR_MORE_DATA semantics) and PipeError reports the full size.
+    @instrumented('read_into', 'bytes_in')
+    def read_into(self, buffer, timeout=0):
+        self._allow(BasePipe.Mode.WRITE_ONLY)
+        if self.transport != BasePipe.Transport.SYNCHRONOUS:
+            broken, read_bytes, more = self.__fill(
+                memoryview(buffer), self.__deadline(timeout), timeout
+            )
+            if broken:
+                return 1, read_bytes
+            if more:
+                raise PipeError(
+                    'Buffer too small for pipe message!',
+                    'msg_sz',
+                    read_bytes + self.__messageLeft()
+                )
+            return 0, read_bytes
+        else:
+            try:
+                pipe_status, pipe_content = w32f.ReadFile(
+                    self.__hPipe, buffer, None
+                )
+            except WinT.error as e:
+                if e.args[0] in _BROKEN_PIPE_ERRORS:
+                    return 1, 0
+                raise
+            if pipe_status == werr.ERROR_MORE_DATA:
+                raise PipeError(
+                    'Buffer too small for pipe message!',
+                    'msg_sz',
+                    len(buffer) + self.__messageLeft()
+                )
+            return 0, len(pipe_content)
+
+    # Text is sent UTF-8 encoded; anything else should be bytes-like (see
+    # PipeCodec for objects).
+    # TODO: Attempt to send a zero-sized write! :P
+    @instrumented('write', 'bytes_out')
+    def write(self, payload, timeout=0, buf_sz=0):
+        self._allow(BasePipe.Mode.READ_ONLY)
+        if not isinstance(payload, (bytes, bytearray, memoryview)):
+            payload = payload.encode('utf-8')
+        if buf_sz > 0:
+            payload = payload[:buf_sz]
+        if self.transport != BasePipe.Transport.SYNCHRONOUS:
+            # Writes are fire and forget; the timeout bounds the wait for
+            # room among the writes still pending. A pending write counts
+            # as written in full and one found failed since (e.g. the
+            # client went away) fails the next write like a broken pipe.
+            self.__awaitOverlappedStructs(self.__deadline(timeout), timeout)
+            stream = self.__getOverlappedStruct()
+            with self.__streamsLock:
+                write_error, self.__writeError = self.__writeError, None
+            if write_error is not None:
+                self.__putOverlappedStruct(stream)
+                return 1, 0
+            try:
+                status_code, written_bytes = w32f.WriteFile(
+                    self.__hPipe, payload, stream
+                )
+            except WinT.error as e:
+                self.__putOverlappedStruct(stream)
+                if e.args[0] in _BROKEN_PIPE_ERRORS:
+                    return 1, 0
+                raise
+            if status_code == werr.ERROR_IO_PENDING:
+                with self.__streamsLock:
+                    self.__inflight.append(stream)
+                return 0, len(payload)
+            self.__putOverlappedStruct(stream)
+            return 0, written_bytes
+        else:
+            try:
+                return w32f.WriteFile(
+                    self.__hPipe, payload, None
+                )
+            except WinT.error as e:
+                if e.args[0] in _BROKEN_PIPE_ERRORS:
+                    return 1, 0
+                raise
+
+    # A single TransactNamedPipe call writes the request and reads the reply
+    # (or as much of it as fits the buffer; the rest is read like any other
+    # message remainder).
+    @instrumented('transact', 'bytes_in')
+    def transact(self, payload, timeout=0, buf_sz=0):
+        if self.transport != BasePipe.Transport.TRANSACTIONAL:
+            raise PipeError(
+                'Pipe transport is not transactional!',
+                'transport',
+                self.transport.value
+            )
+        if not isinstance(payload, (bytes, bytearray, memoryview)):
+            payload = payload.encode('utf-8')
+        deadline = self.__deadline(timeout)
+        if buf_sz <= 0:
+            buf_sz = self.sizer.size
+        pipe_buf = self.pool.acquire(buf_sz)
+        try:
+            stream = self.__getOverlappedStruct()
+            try:
+                status_code, _ = w32p.TransactNamedPipe(
+                    self.__hPipe, payload, pipe_buf, stream
+                )
+            except WinT.error as e:
+                self.__putOverlappedStruct(stream)
+                if e.args[0] in _BROKEN_PIPE_ERRORS:
+                    return 1, 0, b''
+                raise
+            if status_code == werr.ERROR_IO_PENDING:
+                try:
+                    self.__waitForEvent(stream, deadline, timeout)
+                except PipeTimeoutError:
+                    self.__cancelOverlappedStruct(stream)
+                    raise
+            more = status_code == werr.ERROR_MORE_DATA
+            try:
+                read_bytes = w32f.GetOverlappedResult(
+                    self.__hPipe, stream, False
+                )
+            except WinT.error as e:
+                self.__putOverlappedStruct(stream)
+                if e.args[0] in _BROKEN_PIPE_ERRORS:
+                    return 1, 0, b''
+                if e.args[0] != werr.ERROR_MORE_DATA:
+                    raise
+                read_bytes = len(pipe_buf)
+                more = True
+            else:
+                self.__putOverlappedStruct(stream)
+            pipe_data = bytes(memoryview(pipe_buf)[:read_bytes])
+        finally:
+            self.pool.release(pipe_buf)
+        if more:
+            # Whatever is left of the deadline; never 0 (no deadline).
+            if deadline is None:
+                timeout = 0
+            else:
+                timeout = max(1, int(math.ceil((deadline - _clock()) * 1000)))
+            pipe_status, _, rest = self.read(timeout, self.__messageLeft())
+            pipe_data += rest
+            if pipe_status != 0:
+                return pipe_status, len(pipe_data), pipe_data
+        self.sizer.observe(len(pipe_data))
+        return 0, len(pipe_data), pipe_data
+
+    # Pipes have no gather write (WriteFileGather wants page aligned file
+    # buffers) so byte channels join the batch into a single WriteFile.
+    # The bytes are accounted for by the write calls below.
+    @instrumented('write_many')
+    def write_many(self, payloads, timeout=0):
+        if self.channel == BasePipe.Channel.BYTE:
+            batch = []
+            for payload in payloads:
+                if not isinstance(payload, (bytes, bytearray, memoryview)):
+                    payload = payload.encode('utf-8')
+                batch.append(payload)
+            return self.write(b''.join(batch), timeout)
+        written_bytes = 0
+        for payload in payloads:
+            status_code, sent_bytes = self.write(payload, timeout)
+            if status_code != 0:
+                return status_code, written_bytes
+            written_bytes += sent_bytes
+        return 0, written_bytes
+
+    def fileno(self):
+        return int(self.__hPipe)
+
+    # Servers disconnect the client, which fails whatever either end has in
+    # flight; clients cancel the I/O they have issued on the pipe.
+    def cancel(self):
+        if self.view == BasePipe.View.SERVER and \
+                self.ptype == BasePipe.Type.NAMED:
+            w32p.DisconnectNamedPipe(self.__hPipe)
+        else:
+            w32f.CancelIoEx(self.__hPipe, None)
+
+    def close(self):
+        if self.ptype == BasePipe.Type.ANONYMOUS:
+            # There is nothing to disconnect; the other end sees the pipe
+            # break once this one is closed.
+            self.__hPipe.Close()
+            return
+        if self.view == BasePipe.View.SERVER:
+            try:
+                w32p.DisconnectNamedPipe(self.__hPipe)
+            except WinT.error as e:
+                # Already disconnected by cancel.
+                if e.args[0] != werr.ERROR_PIPE_NOT_CONNECTED:
+                    raise
+            self.__settleOverlappedStructs()
+        if self.view == BasePipe.View.CLIENT:
+            self.__hPipe.Close()
+
+    def _instance(self):
+        # Every CreateNamedPipe call with the same name yields a new instance
+        # of that pipe (up to the instances limit).
+        if self.ptype == BasePipe.Type.ANONYMOUS:
+            raise NotImplementedError(
+                'Anonymous pipes have a single connection!'
+            )
+        if self.instances == float('inf'):
+            instances = 0
+        else:
+            instances = self.instances
+        # New instances get an inbound buffer large enough for the messages
+        # seen so far.
+        buf_sz = [self.sizer.kernel_size(self.buf_sz[0]), self.buf_sz[1]]
+        pipe = self.__class__(
+            self.name, self.ptype, self.mode, self.channel, self.transport,
+            self.view, instances, buf_sz
+        )
+        pipe.sizer = self.sizer
+        pipe.codec = self.codec
+        pipe.pool = self.pool
+        pipe.metrics = self.metrics
+        return pipe
+
+    def _release(self):
+        # Closing the pipe aborts whatever is still in flight.
+        self.__hPipe.Close()
+        self.close_child_handle()
+        with self.__streamsLock:
+            while self.__inflight:
+                w32api.CloseHandle(self.__inflight.popleft().hEvent)
+            while self.__overlapped:
+                w32api.CloseHandle(self.__overlapped.popleft().hEvent)
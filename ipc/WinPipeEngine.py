@@ -0,0 +1,239 @@
+# Copyright (C) 2014/15 - Iraklis Diakos (hdiakos@outlook.com)
+# Pilavidis Kriton (kriton_pilavidis@outlook.com)
+# All Rights Reserved.
+# You may use, distribute and modify this code under the
+# terms of the ASF 2.0 license.
+#
+
+"""Part of the ipc module."""
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+# Python native libraries.
+import logging
+import multiprocessing
+import threading
+# Python 3rd party libraries.
+import win32event as w32ev
+import win32file as w32f
+import win32pipe as w32p
+import pywintypes as WinT
+import winerror as werr
+
+from crapi.ipc.PipeTimer import PipeTimer
+
+_log = logging.getLogger(__name__)
+
+# Completion key posted to tell a worker to quit.
+_STOP_KEY = 0xDEAD
+
+
+class WinPipeEngine(object):
+
+    """An I/O completion port engine serving every client of a ServerPipe."""
+
+    """
+        All pipe instances are bound to one completion port serviced by a
+        small pool of worker threads, so the number of instances is no
+        longer limited by how many events a thread can wait on. The pool
+        starts with an instance per CPU and grows by one whenever the last
+        instance waiting for a client gets one, up to the instances limit.
+        Each instance cycles through an overlapped ConnectNamedPipe and
+        zero byte ReadFile calls; the latter completes as soon as the client
+        has sent something without consuming any of it, at which point the
+        handler is free to read the message the usual way.
+        Session and idle deadlines are entries of the shared PipeTimer; one
+        expiring disconnects the client, failing its pending read, and the
+        instance is recycled.
+    """
+
+    def __init__(self, workers=0):
+        """Default initialization class method."""
+        if workers <= 0:
+            workers = multiprocessing.cpu_count()
+        self.workers = workers
+        self.__stopping = threading.Event()
+        self.__lock = threading.Lock()
+
+    # Every instance has an OVERLAPPED structure for its connects and one
+    # for its reads, kept until the engine stops: the kernel writes to them
+    # long after the call issuing them has returned.
+    def __add(self, instance):
+        self.__pool.append(instance)
+        self.__expiries[instance] = [None, None]
+        streams = [WinT.OVERLAPPED(), WinT.OVERLAPPED()]
+        streams[0].object = (instance, 'connect')
+        streams[1].object = (instance, 'read')
+        self.__streams[instance] = streams
+        w32f.CreateIoCompletionPort(
+            instance.fileno(), self.__port, len(self.__pool), 0
+        )
+
+    def __connect(self, pipe):
+        with self.__lock:
+            stream = self.__streams[pipe][0]
+            self.__listening += 1
+        status_code = w32p.ConnectNamedPipe(pipe.fileno(), stream)
+        if status_code == werr.ERROR_PIPE_CONNECTED:
+            # The client beat us to it; no completion will be queued.
+            w32f.PostQueuedCompletionStatus(self.__port, 0, 0, stream)
+
+    # (Re)starts the idle deadline of a client about to wait for its next
+    # request; handing it to the handler stops it again.
+    def __idle(self, pipe):
+        if self.__idle_timeout > 0:
+            self.__schedule(pipe, 1, self.__idle_timeout)
+
+    def __schedule(self, pipe, kind, timeout):
+        with self.__lock:
+            expiries = self.__expiries[pipe]
+        expiry = self.__timer.schedule(timeout, self.__timeout, pipe, expiries)
+        with self.__lock:
+            expiries[kind] = expiry
+
+    # Runs on the timer thread. Recycling an instance gives it new expiries,
+    # so a deadline firing late finds them changed and leaves the next
+    # client of the instance alone.
+    def __timeout(self, pipe, expiries):
+        with self.__lock:
+            if self.__expiries[pipe] is expiries:
+                pipe.cancel()
+
+    def __busy(self, pipe):
+        with self.__lock:
+            expiries = self.__expiries[pipe]
+            expiry, expiries[1] = expiries[1], None
+        if expiry is not None:
+            self.__timer.cancel(expiry)
+
+    def __expire(self, pipe):
+        with self.__lock:
+            expiries = self.__expiries[pipe]
+            self.__expiries[pipe] = [None, None]
+        for expiry in expiries:
+            if expiry is not None:
+                self.__timer.cancel(expiry)
+
+    # Called once an instance got a client (or failed to get one).
+    def __connected(self, pipe, status_code):
+        instance = None
+        with self.__lock:
+            self.__listening -= 1
+            if status_code == 0 and self.__listening == 0 and \
+                    len(self.__pool) < self.__limit:
+                instance = pipe._instance()
+                self.__add(instance)
+        if instance is not None:
+            self.__connect(instance)
+
+    def __poll(self, pipe):
+        with self.__lock:
+            stream = self.__streams[pipe][1]
+        try:
+            w32f.ReadFile(pipe.fileno(), 0, stream)
+        except WinT.error as e:
+            if e.args[0] != werr.ERROR_BROKEN_PIPE:
+                raise
+            self.__recycle(pipe)
+
+    def __recycle(self, pipe):
+        self.__expire(pipe)
+        pipe.close()
+        self.__connect(pipe)
+
+    def __work(self):
+        while True:
+            status_code, _, key, stream = w32f.GetQueuedCompletionStatus(
+                self.__port, w32ev.INFINITE
+            )
+            if key == _STOP_KEY:
+                return
+            # Completions of the pipes' own overlapped calls land here too;
+            # those are waited for by their issuers so skip them.
+            if stream is None or not isinstance(stream.object, tuple):
+                continue
+            pipe, operation = stream.object
+            if operation == 'connect':
+                self.__connected(pipe, status_code)
+                if status_code == 0:
+                    if self.__session_timeout > 0:
+                        self.__schedule(pipe, 0, self.__session_timeout)
+                    self.__idle(pipe)
+                    self.__poll(pipe)
+                else:
+                    self.__recycle(pipe)
+                continue
+            if status_code not in (0, werr.ERROR_MORE_DATA):
+                self.__recycle(pipe)
+                continue
+            self.__busy(pipe)
+            try:
+                self.__handler(pipe)
+            except Exception:
+                _log.exception('Pipe handler failed for %s!', pipe.name)
+                self.__recycle(pipe)
+                continue
+            self.__idle(pipe)
+            self.__poll(pipe)
+
+    # The handler is called with the connected pipe instance every time its
+    # client has sent something; it should read what is there, reply if it
+    # wants to and return rather than wait for more.
+    # Clients are disconnected session_timeout milliseconds after connecting
+    # or once idle for idle_timeout milliseconds (0 meaning never).
+    def serve(self, pipe, handler, instances=0, session_timeout=0,
+              idle_timeout=0):
+        if instances <= 0:
+            instances = pipe.instances
+        if instances > pipe.instances:
+            raise ValueError(
+                'Invalid # of instances: Cannot exceed the pipe instances!'
+            )
+        self.__handler = handler
+        self.__session_timeout = session_timeout
+        self.__idle_timeout = idle_timeout
+        self.__timer = PipeTimer.shared()
+        self.__stopping.clear()
+        self.__port = w32f.CreateIoCompletionPort(
+            w32f.INVALID_HANDLE_VALUE, None, 0, self.workers
+        )
+        self.__limit = instances
+        self.__listening = 0
+        self.__pool = []
+        # Instance -> [session deadline, idle deadline] timer entries.
+        self.__expiries = {}
+        # Instance -> [connect, read] OVERLAPPED structures.
+        self.__streams = {}
+        self.__add(pipe)
+        for _ in range(min(instances, multiprocessing.cpu_count()) - 1):
+            self.__add(pipe._instance())
+        pool = list(self.__pool)
+
+        workers = []
+        for _ in range(self.workers):
+            workers.append(threading.Thread(target=self.__work))
+        for thread in workers:
+            thread.daemon = True
+            thread.start()
+        for instance in pool:
+            self.__connect(instance)
+
+        self.__stopping.wait()
+
+        for _ in workers:
+            w32f.PostQueuedCompletionStatus(self.__port, 0, _STOP_KEY, None)
+        for thread in workers:
+            thread.join()
+        for instance in self.__pool:
+            self.__expire(instance)
+        # Closing the handles aborts the pending connects and reads; their
+        # OVERLAPPED structures go once the port is gone too.
+        for instance in reversed(self.__pool):
+            instance._release()
+        self.__port.Close()
+        self.__streams = None
+        self.__pool = None
+
+    def shutdown(self):
+        self.__stopping.set()
@@ -0,0 +1,131 @@
+# Copyright (C) 2014/15 - Iraklis Diakos (hdiakos@outlook.com)
+# Pilavidis Kriton (kriton_pilavidis@outlook.com)
+# All Rights Reserved.
+# You may use, distribute and modify this code under the
+# terms of the ASF 2.0 license.
+#
+
+"""Shared fixtures of the test suite."""
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+# Python native libraries.
+import itertools
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+try:
+    import crapi  # noqa: F401
+except ImportError:
+    # The checkout is the crapi package itself, whatever its directory is
+    # called, so it is loaded under that name (see benchmarks/ipc_bench.py).
+    _root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    from importlib.util import module_from_spec
+    from importlib.util import spec_from_file_location
+    _spec = spec_from_file_location(
+        'crapi', os.path.join(_root, '__init__.py'),
+        submodule_search_locations=[_root]
+    )
+    sys.modules['crapi'] = module_from_spec(_spec)
+    _spec.loader.exec_module(sys.modules['crapi'])
+
+from crapi.ipc.BasePipe import BasePipe
+from crapi.ipc.ClientPipe import ClientPipe
+from crapi.ipc.ServerPipe import ServerPipe
+
+
+_names = itertools.count()
+
+
+@pytest.fixture
+def name():
+    """Return a pipe name no other test uses."""
+    return 'crapi-test-%d-%d' % (os.getpid(), next(_names))
+
+
+def wait_until(predicate, timeout=5.0):
+    """Poll predicate until it holds or timeout seconds pass."""
+    deadline = time.time() + timeout
+    while not predicate():
+        if time.time() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def echo(pipe):
+    """Serve handler echoing every message until the client goes away."""
+    while True:
+        pipe_status, _, pipe_data = pipe.read()
+        if pipe_status != 0:
+            return
+        pipe_status, _ = pipe.write(pipe_data)
+        if pipe_status != 0:
+            return
+
+
+class Serving(object):
+
+    """A ServerPipe serving from a thread of its own."""
+
+    def __init__(self, server, handler, **kwargs):
+        self.server = server
+        self.thread = threading.Thread(
+            target=server.serve, args=(handler,), kwargs=kwargs
+        )
+        self.thread.daemon = True
+        self.thread.start()
+
+    def client(self, **kwargs):
+        kwargs.setdefault('channel', self.server.channel)
+        kwargs.setdefault('transport', self.server.transport)
+        return ClientPipe(
+            self.server.name, view=BasePipe.View.CLIENT, **kwargs
+        )
+
+    def stop(self, timeout=10.0):
+        self.server.shutdown()
+        self.thread.join(timeout)
+        return not self.thread.is_alive()
+
+
+@pytest.fixture
+def serve(name):
+    """Start serving a ServerPipe named name; shut it down afterwards."""
+    started = []
+
+    def start(handler, server_kwargs=None, **kwargs):
+        server = ServerPipe(name, **(server_kwargs or {}))
+        serving = Serving(server, handler, **kwargs)
+        started.append(serving)
+        return serving
+
+    yield start
+    for serving in started:
+        if serving.thread.is_alive():
+            serving.stop()
+
+
+@pytest.fixture
+def connect(name):
+    """Return connected (server, client) pipe pairs; closed afterwards."""
+    pairs = []
+
+    def pair(**kwargs):
+        server = ServerPipe(name + '-%d' % len(pairs), **kwargs)
+        client = ClientPipe(
+            server.name, view=BasePipe.View.CLIENT, **kwargs
+        )
+        server.connect()
+        pairs.append((server, client))
+        return server, client
+
+    yield pair
+    for server, client in pairs:
+        client.close()
+        server.shutdown()
@@ -0,0 +1,206 @@
+# Copyright (C) 2014/15 - Iraklis Diakos (hdiakos@outlook.com)
+# Pilavidis Kriton (kriton_pilavidis@outlook.com)
+# All Rights Reserved.
+# You may use, distribute and modify this code under the
+# terms of the ASF 2.0 license.
+#
+
+"""Tests of the asyncio pipes."""
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+# Python native libraries.
+import sys
+import threading
+
+import pytest
+
+if sys.version_info < (3, 7):
+    pytest.skip('asyncio pipes need Python 3.7+', allow_module_level=True)
+
+import asyncio  # noqa: E402
+
+from crapi.ipc.AsyncClientPipe import AsyncClientPipe  # noqa: E402
+from crapi.ipc.AsyncServerPipe import AsyncServerPipe  # noqa: E402
+from crapi.ipc.BasePipe import BasePipe  # noqa: E402
+from crapi.ipc.PickleCodec import PickleCodec  # noqa: E402
+from crapi.ipc.PipeTimeoutError import PipeTimeoutError  # noqa: E402
+from crapi.ipc.ServerPipe import ServerPipe  # noqa: E402
+
+CHANNELS = pytest.mark.parametrize(
+    'channel', list(BasePipe.Channel), ids=lambda ch: ch.value
+)
+
+
+async def connected(name, **kwargs):
+    server = AsyncServerPipe(name, **kwargs)
+    client = AsyncClientPipe(name, view=BasePipe.View.CLIENT, **kwargs)
+    accept = asyncio.ensure_future(server.connect())
+    await client.connect()
+    await accept
+    return server, client
+
+
+async def echo(pipe):
+    while True:
+        pipe_status, _, pipe_data = await pipe.read()
+        if pipe_status != 0:
+            return
+        await pipe.write(pipe_data)
+
+
+def test_message_round_trip(name):
+    async def main():
+        server, client = await connected(name)
+        try:
+            assert await client.write(b'ping') == (0, 4)
+            assert await server.read() == (0, 4, b'ping')
+            assert await client.write_many([b'a', 'bc']) == (0, 3)
+            assert (await server.read())[2] == b'a'
+            assert (await server.read())[2] == b'bc'
+            buffer = bytearray(4)
+            await server.write(b'pong')
+            assert await client.read_into(buffer) == (0, 4)
+            assert buffer == b'pong'
+        finally:
+            client.close()
+            server._release()
+    asyncio.run(main())
+
+
+def test_empty_message_is_not_a_hang_up(name):
+    async def main():
+        server, client = await connected(name)
+        try:
+            await client.write(b'')
+            await client.write(b'')
+            client.close()
+            assert await server.read() == (0, 0, b'')
+            assert await server.read_into(bytearray(1)) == (0, 0)
+            assert await server.read() == (1, 0, b'')
+        finally:
+            server._release()
+    asyncio.run(main())
+
+
+@CHANNELS
+def test_stream_round_trip(name, channel):
+    async def main():
+        server, client = await connected(name, channel=channel)
+        try:
+            payloads = [b'x' * 100000, 'hello', bytearray(b'abc')]
+            writer = asyncio.ensure_future(
+                client.write_stream(payloads, chunk_size=4096)
+            )
+            chunks = [
+                chunk async for chunk in server.read_stream(chunk_size=1000)
+            ]
+            assert await writer == (0, 100008)
+            assert b''.join(chunks) == b'x' * 100000 + b'helloabc'
+        finally:
+            client.close()
+            server._release()
+    asyncio.run(main())
+
+
+@CHANNELS
+def test_send_receive(name, channel):
+    async def main():
+        server, client = await connected(name, channel=channel)
+        server.codec = client.codec = PickleCodec()
+        try:
+            obj = {'a': 1, 'b': bytearray(b'z' * 70000)}
+            sender = asyncio.ensure_future(client.send(obj))
+            assert await server.receive() == (0, obj)
+            await sender
+            client.close()
+            assert await server.receive() == (1, None)
+        finally:
+            server._release()
+    asyncio.run(main())
+
+
+def test_read_timeout_and_cancel(name):
+    async def main():
+        server, client = await connected(name)
+        try:
+            with pytest.raises(PipeTimeoutError):
+                await server.read(timeout=50)
+            asyncio.get_running_loop().call_later(0.05, server.cancel)
+            assert (await server.read(timeout=5000))[0] == 1
+        finally:
+            client.close()
+            server._release()
+    asyncio.run(main())
+
+
+def test_transact(name):
+    transport = BasePipe.Transport.TRANSACTIONAL
+
+    async def main():
+        server, client = await connected(name, transport=transport)
+        try:
+            async def reply():
+                _, _, pipe_data = await server.read()
+                await server.write(pipe_data.upper())
+            replier = asyncio.ensure_future(reply())
+            assert await client.transact('ping', timeout=5000) == \
+                (0, 4, b'PING')
+            await replier
+        finally:
+            client.close()
+            server._release()
+    asyncio.run(main())
+
+
+@CHANNELS
+def test_serve_and_shutdown(name, channel):
+    async def main():
+        server = AsyncServerPipe(name, channel=channel)
+        serving = asyncio.ensure_future(server.serve(echo, instances=4))
+        clients = []
+        for _ in range(4):
+            client = AsyncClientPipe(
+                name, channel=channel, view=BasePipe.View.CLIENT
+            )
+            await client.connect()
+            clients.append(client)
+        for index, client in enumerate(clients):
+            message = ('hello %d' % index).encode('ascii')
+            await client.write(message)
+            buffer = bytearray(len(message))
+            assert await client.read_into(buffer, timeout=5000) == \
+                (0, len(message))
+            assert buffer == message
+        server.shutdown()
+        await asyncio.wait_for(serving, 5)
+        # Shutting down ends the sessions still connected.
+        for client in clients:
+            assert (await client.read(timeout=5000))[0] == 1
+            client.close()
+    asyncio.run(main())
+
+
+def test_interoperates_with_blocking_pipes(name):
+    server = ServerPipe(name)
+    thread = threading.Thread(
+        target=server.serve, args=(lambda pipe: pipe.send(pipe.receive()[1]),)
+    )
+    thread.daemon = True
+    thread.start()
+
+    async def main():
+        client = AsyncClientPipe(name, view=BasePipe.View.CLIENT)
+        await client.connect()
+        try:
+            await client.send(b'object')
+            assert await client.receive(5000) == (0, b'object')
+        finally:
+            client.close()
+    try:
+        asyncio.run(main())
+    finally:
+        server.shutdown()
+        thread.join(10)
+    assert not thread.is_alive()
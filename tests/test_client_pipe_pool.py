@@ -0,0 +1,94 @@
+# Copyright (C) 2014/15 - Iraklis Diakos (hdiakos@outlook.com)
+# Pilavidis Kriton (kriton_pilavidis@outlook.com)
+# All Rights Reserved.
+# You may use, distribute and modify this code under the
+# terms of the ASF 2.0 license.
+#
+
+"""Tests of ClientPipePool."""
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+# Python native libraries.
+import threading
+import time
+
+import pytest
+
+from crapi.ipc.BasePipe import BasePipe
+from crapi.ipc.ClientPipePool import ClientPipePool
+from crapi.ipc.PipeError import PipeError
+from crapi.ipc.PipeTimeoutError import PipeTimeoutError
+
+
+def respond(request):
+    request = bytes(request)
+    if request.startswith(b'sleep'):
+        time.sleep(float(request[5:]))
+    return request.upper()
+
+
+@pytest.mark.parametrize('channel', list(BasePipe.Channel),
+                         ids=lambda ch: ch.value)
+def test_concurrent_requests(serve, channel):
+    serving = serve(
+        ClientPipePool.handler(respond),
+        server_kwargs={'channel': channel}, instances=4
+    )
+    pool = ClientPipePool(serving.server.name, size=2, channel=channel)
+    results = {}
+
+    def request(index):
+        payload = ('request %d' % index).encode('ascii')
+        results[index] = bytes(pool.request(payload, timeout=5000))
+    threads = [
+        threading.Thread(target=request, args=(index,)) for index in range(20)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == dict(
+        (index, ('REQUEST %d' % index).encode('ascii'))
+        for index in range(20)
+    )
+    pool.close()
+    assert serving.stop()
+
+
+def test_request_timeout(serve):
+    serving = serve(ClientPipePool.handler(respond), instances=2)
+    pool = ClientPipePool(serving.server.name, size=1)
+    with pytest.raises(PipeTimeoutError):
+        pool.request(b'sleep0.3', timeout=50)
+    # The late response is dropped and the connection still works.
+    assert bytes(pool.request(b'next', timeout=5000)) == b'NEXT'
+    pool.close()
+    assert serving.stop()
+
+
+def test_closed_pool(serve):
+    serving = serve(ClientPipePool.handler(respond), instances=2)
+    pool = ClientPipePool(serving.server.name)
+    assert bytes(pool.request('text', timeout=5000)) == b'TEXT'
+    pool.close()
+    with pytest.raises(PipeError):
+        pool.request(b'after')
+    assert serving.stop()
+
+
+def test_server_going_away_fails_requests(serve):
+    serving = serve(ClientPipePool.handler(respond), instances=2)
+    serving.server.drain_timeout = 50
+    pool = ClientPipePool(serving.server.name, size=1)
+    assert bytes(pool.request(b'x', timeout=5000)) == b'X'
+    assert serving.stop()
+    with pytest.raises(PipeError):
+        pool.request(b'y', timeout=5000)
+    pool.close()
+
+
+def test_invalid_size():
+    with pytest.raises(ValueError):
+        ClientPipePool('pool', size=0)
@@ -0,0 +1,76 @@
+# Copyright (C) 2014/15 - Iraklis Diakos (hdiakos@outlook.com)
+# Pilavidis Kriton (kriton_pilavidis@outlook.com)
+# All Rights Reserved.
+# You may use, distribute and modify this code under the
+# terms of the ASF 2.0 license.
+#
+
+"""Tests of the codecs and of send/receive."""
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+# Python native libraries.
+import pickle
+import threading
+
+import pytest
+
+from crapi.ipc.BasePipe import BasePipe
+from crapi.ipc.MsgpackCodec import MsgpackCodec
+from crapi.ipc.PickleCodec import PickleCodec
+from crapi.ipc.RawCodec import RawCodec
+
+OBJECT = {'key': [1, 2.5, None, True], 'text': 'café', 'data': b'\x00'}
+
+
+def round_trip(codec, obj):
+    parts = codec.encode(obj)
+    assert codec.parts(parts[0]) == len(parts)
+    return codec.decode(parts)
+
+
+def test_raw_codec():
+    codec = RawCodec()
+    assert round_trip(codec, b'bytes') == b'bytes'
+    assert round_trip(codec, 'text') == b'text'
+
+
+@pytest.mark.parametrize('protocol', [2, pickle.HIGHEST_PROTOCOL])
+def test_pickle_codec(protocol):
+    assert round_trip(PickleCodec(protocol), OBJECT) == OBJECT
+
+
+@pytest.mark.skipif(pickle.HIGHEST_PROTOCOL < 5, reason='needs pickle 5')
+def test_pickle_codec_out_of_band():
+    codec = PickleCodec(5)
+    buffer = bytearray(b'z' * 70000)
+    parts = codec.encode({'buffer': pickle.PickleBuffer(buffer)})
+    assert len(parts) == 2
+    assert bytes(codec.decode(parts)['buffer']) == bytes(buffer)
+
+
+def test_msgpack_codec():
+    pytest.importorskip('msgpack')
+    assert round_trip(MsgpackCodec(), OBJECT) == OBJECT
+
+
+@pytest.mark.parametrize('channel', list(BasePipe.Channel),
+                         ids=lambda ch: ch.value)
+def test_send_receive(connect, channel):
+    server, client = connect(channel=channel)
+    server.codec = client.codec = PickleCodec()
+    obj = dict(OBJECT, large=bytearray(b'x' * 100000))
+    if pickle.HIGHEST_PROTOCOL >= 5:
+        obj['out_of_band'] = pickle.PickleBuffer(bytearray(b'y' * 70000))
+    sender = threading.Thread(target=client.send, args=(obj,))
+    sender.start()
+    pipe_status, received = server.receive(5000)
+    sender.join()
+    assert pipe_status == 0
+    assert received['key'] == OBJECT['key']
+    assert received['large'] == obj['large']
+    if 'out_of_band' in obj:
+        assert bytes(received['out_of_band']) == b'y' * 70000
+    client.close()
+    assert server.receive() == (1, None)
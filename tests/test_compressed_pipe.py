@@ -0,0 +1,100 @@
+# Copyright (C) 2014/15 - Iraklis Diakos (hdiakos@outlook.com)
+# Pilavidis Kriton (kriton_pilavidis@outlook.com)
+# All Rights Reserved.
+# You may use, distribute and modify this code under the
+# terms of the ASF 2.0 license.
+#
+
+"""Tests of CompressedPipe."""
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+# Python native libraries.
+import threading
+import zlib
+
+import pytest
+
+from crapi.ipc.BasePipe import BasePipe
+from crapi.ipc.CompressedPipe import CompressedPipe
+from crapi.ipc.FramedPipe import FramedPipe
+from crapi.ipc.PipeError import PipeError
+
+try:
+    import lzma
+except ImportError:
+    lzma = None
+
+ALGORITHMS = ['zlib'] + (['lzma'] if lzma else [])
+
+
+def negotiated(connect, channel, client_algorithms, **kwargs):
+    server, client = connect(channel=channel)
+    if channel == BasePipe.Channel.BYTE:
+        server, client = FramedPipe(server), FramedPipe(client)
+    server = CompressedPipe(server, **kwargs)
+    client = CompressedPipe(client, algorithms=client_algorithms, **kwargs)
+    accept = threading.Thread(target=server.negotiate, args=(5000,))
+    accept.start()
+    client.negotiate(5000)
+    accept.join()
+    return server, client
+
+
+@pytest.mark.parametrize('channel', list(BasePipe.Channel),
+                         ids=lambda ch: ch.value)
+@pytest.mark.parametrize('algorithm', ALGORITHMS)
+def test_round_trip(connect, channel, algorithm):
+    server, client = negotiated(connect, channel, (algorithm,))
+    assert server.algorithm == client.algorithm == algorithm
+    large = b'hello world ' * 10000
+    for payload in (b'tiny', large, b''):
+        assert client.write(payload) == (0, len(payload))
+        pipe_status, msg_sz, pipe_data = server.read()
+        assert (pipe_status, msg_sz) == (0, len(payload))
+        assert bytes(pipe_data) == payload
+
+
+def test_server_picks_from_the_offer(connect):
+    server, client = negotiated(
+        connect, BasePipe.Channel.MESSAGE, ('unknown', 'zlib')
+    )
+    assert server.algorithm == client.algorithm == 'zlib'
+
+
+def test_plain_client_falls_back(connect):
+    server, client = connect()
+    server = CompressedPipe(server)
+    client.write(b'plain')
+    assert server.negotiate(5000) is None
+    assert server.read() == (0, 5, b'plain')
+    client.write(b'again')
+    assert server.read()[2] == b'again'
+
+
+def test_requires_message_boundaries(connect):
+    server, _ = connect(channel=BasePipe.Channel.BYTE)
+    with pytest.raises(ValueError):
+        CompressedPipe(server)
+
+
+def test_rejects_messages_above_max_size(connect):
+    server, client = negotiated(
+        connect, BasePipe.Channel.MESSAGE, ('zlib',), max_size=1024
+    )
+    client.pipe.write(
+        CompressedPipe.HEADER.pack(1, 2 ** 32 - 1) + zlib.compress(b'a')
+    )
+    with pytest.raises(PipeError):
+        server.read()
+
+
+def test_rejects_lengths_which_do_not_match(connect):
+    server, client = negotiated(connect, BasePipe.Channel.MESSAGE, ('zlib',))
+    # Inflating more than announced stops at the announced length.
+    client.pipe.write(
+        CompressedPipe.HEADER.pack(1, 5) + zlib.compress(b'a' * 100000)
+    )
+    with pytest.raises(PipeError):
+        server.read()
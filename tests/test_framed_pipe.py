@@ -0,0 +1,79 @@
+# Copyright (C) 2014/15 - Iraklis Diakos (hdiakos@outlook.com)
+# Pilavidis Kriton (kriton_pilavidis@outlook.com)
+# All Rights Reserved.
+# You may use, distribute and modify this code under the
+# terms of the ASF 2.0 license.
+#
+
+"""Tests of FramedPipe."""
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import pytest
+
+from crapi.ipc.BasePipe import BasePipe
+from crapi.ipc.FramedPipe import FramedPipe
+from crapi.ipc.PipeError import PipeError
+
+
+@pytest.fixture
+def framed(connect):
+    server, client = connect(channel=BasePipe.Channel.BYTE)
+    return FramedPipe(server), FramedPipe(client)
+
+
+def test_requires_a_byte_channel(connect):
+    server, _ = connect()
+    with pytest.raises(ValueError):
+        FramedPipe(server)
+
+
+def test_round_trip(framed):
+    server, client = framed
+    assert client.write(b'hello') == (0, 5)
+    assert client.write('') == (0, 0)
+    assert server.read() == (0, 5, bytearray(b'hello'))
+    assert server.read() == (0, 0, bytearray())
+
+
+def test_write_many_keeps_boundaries(framed):
+    server, client = framed
+    assert client.write_many([b'a', 'bc', bytearray(b'def')]) == (0, 6)
+    assert [bytes(server.read()[2]) for _ in range(3)] == \
+        [b'a', b'bc', b'def']
+
+
+def test_write_parts_is_one_frame(framed):
+    server, client = framed
+    assert client.write_parts([b'ab', memoryview(b'cde')]) == (0, 5)
+    assert server.read() == (0, 5, bytearray(b'abcde'))
+
+
+def test_read_into(framed):
+    server, client = framed
+    client.write(b'hello')
+    buffer = bytearray(8)
+    assert server.read_into(buffer) == (0, 5)
+    assert buffer[:5] == b'hello'
+    client.write(b'hello')
+    with pytest.raises(PipeError):
+        server.read_into(bytearray(2))
+
+
+def test_max_frame_size(connect):
+    server, client = connect(channel=BasePipe.Channel.BYTE)
+    server = FramedPipe(server, max_frame_sz=4)
+    client = FramedPipe(client, max_frame_sz=4)
+    with pytest.raises(PipeError):
+        client.write(b'hello')
+    FramedPipe(client.pipe).write(b'hello')
+    with pytest.raises(PipeError):
+        server.read()
+
+
+def test_hang_up(framed):
+    server, client = framed
+    client.close()
+    assert server.read() == (1, 0, bytearray())
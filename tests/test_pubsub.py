@@ -0,0 +1,100 @@
+# Copyright (C) 2014/15 - Iraklis Diakos (hdiakos@outlook.com)
+# Pilavidis Kriton (kriton_pilavidis@outlook.com)
+# All Rights Reserved.
+# You may use, distribute and modify this code under the
+# terms of the ASF 2.0 license.
+#
+
+"""Tests of PubSubServerPipe and PubSubClient."""
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+# Python native libraries.
+import threading
+
+import pytest
+
+from conftest import wait_until
+from crapi.ipc.BasePipe import BasePipe
+from crapi.ipc.ClientPipe import ClientPipe
+from crapi.ipc.FramedPipe import FramedPipe
+from crapi.ipc.PickleCodec import PickleCodec
+from crapi.ipc.PubSubClient import PubSubClient
+from crapi.ipc.PubSubServerPipe import PubSubServerPipe
+
+
+@pytest.fixture
+def publisher(name):
+    publishers = []
+
+    def start(**kwargs):
+        server = PubSubServerPipe(name, **kwargs)
+        thread = threading.Thread(
+            target=server.serve, kwargs={'instances': 4}
+        )
+        thread.daemon = True
+        thread.start()
+        publishers.append((server, thread))
+        return server
+
+    yield start
+    for server, thread in publishers:
+        server.shutdown()
+        thread.join(10)
+        assert not thread.is_alive()
+
+
+def subscriber(server):
+    pipe = ClientPipe(
+        server.name, channel=server.channel, view=BasePipe.View.CLIENT
+    )
+    if server.channel == BasePipe.Channel.BYTE:
+        pipe = FramedPipe(pipe)
+    return PubSubClient(pipe, codec=server.codec)
+
+
+@pytest.mark.parametrize('channel', list(BasePipe.Channel),
+                         ids=lambda ch: ch.value)
+def test_publish_to_subscribers(publisher, channel):
+    server = publisher(channel=channel)
+    prices, news = subscriber(server), subscriber(server)
+    # Requests of a subscriber are handled in order, so once its probe
+    # topic gets through so did everything it asked for before.
+    assert prices.subscribe('prices', 'probe-p') == 0
+    assert news.subscribe('news', b'prices', 'probe-n') == 0
+    for client, probe in ((prices, 'probe-p'), (news, 'probe-n')):
+        assert wait_until(lambda: server.publish(probe, b'') == 1)
+        assert client.receive(5000) == (0, probe, b'')
+    assert server.publish('news', b'n') == 1
+    assert news.receive(5000) == (0, 'news', b'n')
+    assert server.publish('prices', b'1') == 2
+    assert prices.receive(5000) == (0, 'prices', b'1')
+    assert news.receive(5000) == (0, 'prices', b'1')
+    news.unsubscribe('prices', 'probe-n')
+    assert wait_until(lambda: server.publish('probe-n', b'') == 0)
+    assert server.publish('prices', b'2') == 1
+    assert prices.receive(5000) == (0, 'prices', b'2')
+    prices.close()
+    assert wait_until(lambda: server.publish('prices', b'3') == 0)
+    news.close()
+
+
+def test_publish_objects(publisher):
+    server = publisher()
+    server.codec = PickleCodec()
+    client = subscriber(server)
+    client.subscribe('objects')
+    obj = {'k': [1, 2, bytearray(b'x' * 100000)]}
+    assert wait_until(lambda: server.publish('objects', obj) == 1)
+    assert client.receive(5000) == (0, 'objects', obj)
+    client.close()
+
+
+def test_serve_rejects_a_handler(name):
+    server = PubSubServerPipe(name)
+    try:
+        with pytest.raises(ValueError):
+            server.serve(lambda pipe: None)
+    finally:
+        server.shutdown()
@@ -0,0 +1,265 @@
+# Copyright (C) 2014/15 - Iraklis Diakos (hdiakos@outlook.com)
+# Pilavidis Kriton (kriton_pilavidis@outlook.com)
+# All Rights Reserved.
+# You may use, distribute and modify this code under the
+# terms of the ASF 2.0 license.
+#
+
+"""Tests of ServerPipe.serve, its shutdown and its deadlines."""
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+# Python native libraries.
+import os
+import sys
+import threading
+import time
+try:
+    from queue import Queue
+except ImportError:
+    from Queue import Queue
+
+import pytest
+
+from conftest import echo
+from crapi.ipc.BasePipe import BasePipe
+from crapi.ipc.ClientPipe import ClientPipe
+from crapi.ipc.PipeMetrics import PipeMetrics
+from crapi.ipc.PipeTimer import PipeTimer
+from crapi.ipc.ServerPipe import ServerPipe
+
+
+@pytest.mark.parametrize('engine', [False, True], ids=['threads', 'engine'])
+def test_serve_echo(serve, engine):
+    if engine:
+        def handler(pipe):
+            pipe_status, _, pipe_data = pipe.read()
+            if pipe_status == 0:
+                pipe.write(pipe_data)
+    else:
+        handler = echo
+    serving = serve(handler, instances=4, engine=engine)
+    clients = [serving.client() for _ in range(4)]
+    for index, client in enumerate(clients):
+        message = ('hello %d' % index).encode('ascii')
+        assert client.write(message)[0] == 0
+        assert client.read(timeout=5000)[2] == message
+    for client in clients:
+        client.close()
+    assert serving.stop()
+
+
+@pytest.mark.parametrize('channel', list(BasePipe.Channel),
+                         ids=lambda ch: ch.value)
+def test_serve_channels(serve, channel):
+    serving = serve(echo, server_kwargs={'channel': channel}, instances=2)
+    client = serving.client()
+    client.write(b'abc')
+    buffer = bytearray(3)
+    assert client.read_into(buffer, timeout=5000) == (0, 3)
+    assert buffer == b'abc'
+    client.close()
+    assert serving.stop()
+
+
+def test_serve_transactions(serve):
+    serving = serve(
+        lambda request: bytes(request).upper(),
+        server_kwargs={'ptype': BasePipe.Type.TRANSACTIONAL}, instances=2
+    )
+    client = serving.client()
+    assert client.transact(b'ping', timeout=5000) == (0, 4, b'PING')
+    client.close()
+    assert serving.stop()
+
+
+def test_shutdown_without_clients(serve):
+    serving = serve(echo, instances=4)
+    time.sleep(0.05)
+    assert serving.stop()
+
+
+def test_handler_errors_end_the_session_only(serve):
+    def handler(pipe):
+        pipe_status, _, pipe_data = pipe.read()
+        if pipe_data == b'fail':
+            raise RuntimeError('handler failure')
+        pipe.write(pipe_data)
+    serving = serve(handler, instances=1)
+    serving.server.metrics = PipeMetrics()
+    client = serving.client()
+    client.write(b'fail')
+    assert client.read(timeout=5000)[0] == 1
+    client.close()
+    client = serving.client()
+    client.write(b'ok')
+    assert client.read(timeout=5000)[2] == b'ok'
+    client.close()
+    assert serving.stop()
+    counters = serving.server.metrics.snapshot()['counters']
+    assert counters['handler_errors'] == 1
+
+
+def test_shutdown_drains_sessions(serve):
+    started = threading.Event()
+
+    def handler(pipe):
+        pipe_status, _, pipe_data = pipe.read()
+        started.set()
+        time.sleep(0.2)
+        pipe.write(pipe_data)
+    serving = serve(handler, instances=1)
+    client = serving.client()
+    client.write(b'late')
+    assert started.wait(5)
+    assert serving.stop()
+    # The session under way finished before serve returned.
+    assert client.read(timeout=1000)[2] == b'late'
+    client.close()
+
+
+def test_shutdown_cancels_sessions_past_the_drain(serve):
+    serving = serve(echo, instances=2)
+    serving.server.drain_timeout = 100
+    client = serving.client()
+    client.write(b'x')
+    assert client.read(timeout=5000)[2] == b'x'
+    # An idle client never hangs up on its own.
+    start = time.time()
+    assert serving.stop()
+    assert time.time() - start < 5
+    assert client.read(timeout=1000)[0] == 1
+    client.close()
+
+
+def test_shutdown_races_an_accepted_client(serve, monkeypatch):
+    # A client accepted while the pool stops must be queued ahead of the
+    # workers' sentinels, not behind them where nobody ever serves it.
+    accepted = threading.Event()
+
+    class SlowQueue(Queue):
+        def put(self, item, *args, **kwargs):
+            if item is not None:
+                accepted.set()
+                time.sleep(0.2)
+            return Queue.put(self, item, *args, **kwargs)
+
+    monkeypatch.setattr(sys.modules[ServerPipe.__module__], 'Queue',
+                        SlowQueue)
+    serving = serve(echo, instances=1)
+    serving.server.drain_timeout = 100
+    client = serving.client()
+    assert accepted.wait(5)
+    assert serving.stop(5)
+    assert client.read(timeout=1000)[0] == 1
+    client.close()
+
+
+def test_shutdown_while_clients_connect(name):
+    for attempt in range(20):
+        server = ServerPipe('%s-%d' % (name, attempt))
+        # The client connected may never hang up.
+        server.drain_timeout = 50
+        thread = threading.Thread(target=server.serve, args=(echo, 2))
+        thread.daemon = True
+        thread.start()
+        clients = []
+
+        def connect():
+            clients.append(
+                ClientPipe(server.name, view=BasePipe.View.CLIENT)
+            )
+        connector = threading.Thread(target=connect)
+        connector.start()
+        time.sleep(0.001 * (attempt % 5))
+        server.shutdown()
+        thread.join(10)
+        connector.join(10)
+        assert not thread.is_alive()
+        for client in clients:
+            client.close()
+
+
+def test_session_timeout(serve):
+    serving = serve(echo, instances=2, session_timeout=200)
+    serving.server.metrics = PipeMetrics()
+    client = serving.client()
+    client.write(b'x')
+    assert client.read(timeout=5000)[2] == b'x'
+    start = time.time()
+    assert client.read(timeout=5000)[0] == 1
+    assert time.time() - start < 2
+    client.close()
+    assert serving.stop()
+    counters = serving.server.metrics.snapshot()['counters']
+    assert counters['session_timeouts'] == 1
+
+
+def test_idle_timeout(serve):
+    def handler(pipe):
+        pipe_status, _, pipe_data = pipe.read()
+        if pipe_status == 0:
+            pipe.write(pipe_data)
+    serving = serve(handler, instances=2, engine=True, idle_timeout=200)
+    client = serving.client()
+    # Every request restarts the idle deadline.
+    for _ in range(3):
+        time.sleep(0.1)
+        client.write(b'x')
+        assert client.read(timeout=5000)[2] == b'x'
+    start = time.time()
+    assert client.read(timeout=5000)[0] == 1
+    assert time.time() - start < 2
+    client.close()
+    assert serving.stop()
+
+
+def test_engine_session_timeout(serve):
+    def handler(pipe):
+        pipe_status, _, pipe_data = pipe.read()
+        if pipe_status == 0:
+            pipe.write(pipe_data)
+    serving = serve(handler, instances=2, engine=True, session_timeout=300)
+    client = serving.client()
+    start = time.time()
+    while time.time() - start < 5:
+        if client.write(b'x')[0] != 0:
+            break
+        if client.read(timeout=5000)[0] != 0:
+            break
+        time.sleep(0.05)
+    assert time.time() - start < 2
+    client.close()
+    assert serving.stop()
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='needs fork')
+def test_worker_processes(serve):
+    # A timer already running in the supervisor must not leave the forked
+    # workers without one.
+    PipeTimer.shared().schedule(10, lambda: None)
+    serving = serve(echo, instances=2, processes=2, session_timeout=300)
+    client = serving.client()
+    client.write(b'x')
+    assert client.read(timeout=5000)[2] == b'x'
+    start = time.time()
+    assert client.read(timeout=5000)[0] == 1
+    assert time.time() - start < 2
+    client.close()
+    assert serving.stop()
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'processes': -1},
+    {'session_timeout': -1},
+    {'idle_timeout': -1},
+    {'idle_timeout': 100},
+])
+def test_serve_rejects_invalid_arguments(name, kwargs):
+    server = ServerPipe(name)
+    try:
+        with pytest.raises(ValueError):
+            server.serve(echo, **kwargs)
+    finally:
+        server.shutdown()
@@ -0,0 +1,184 @@
+# Copyright (C) 2014/15 - Iraklis Diakos (hdiakos@outlook.com)
+# Pilavidis Kriton (kriton_pilavidis@outlook.com)
+# All Rights Reserved.
+# You may use, distribute and modify this code under the
+# terms of the ASF 2.0 license.
+#
+
+"""Tests of the Linux pipe backend."""
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+# Python native libraries.
+import sys
+import threading
+
+import pytest
+
+from crapi.ipc.BasePipe import BasePipe
+from crapi.ipc.PipeError import PipeError
+from crapi.ipc.PipeTimeoutError import PipeTimeoutError
+
+if sys.platform == 'win32':
+    pytest.skip('Linux pipes only', allow_module_level=True)
+
+from crapi.ipc.UnixPipe import UnixPipe  # noqa: E402
+
+
+def connected(name, **kwargs):
+    server = UnixPipe(name, **kwargs)
+    client = UnixPipe(name, view=BasePipe.View.CLIENT, **kwargs)
+    accept = threading.Thread(target=server.connect)
+    accept.start()
+    client.connect()
+    accept.join()
+    return server, client
+
+
+@pytest.fixture(params=list(BasePipe.Channel), ids=lambda ch: ch.value)
+def pair(request, name):
+    server, client = connected(name, channel=request.param)
+    yield server, client
+    client.close()
+    server._release()
+
+
+@pytest.fixture
+def messages(name):
+    server, client = connected(name)
+    yield server, client
+    client.close()
+    server._release()
+
+
+def test_message_round_trip(messages):
+    server, client = messages
+    assert client.write(b'ping') == (0, 4)
+    assert server.read() == (0, 4, b'ping')
+    assert server.write('pong') == (0, 4)
+    assert client.read() == (0, 4, b'pong')
+
+
+def test_messages_keep_their_boundaries(messages):
+    server, client = messages
+    assert client.write_many([b'a', b'bc', b'def']) == (0, 6)
+    assert [server.read()[2] for _ in range(3)] == [b'a', b'bc', b'def']
+
+
+def test_large_message(messages):
+    server, client = messages
+    payload = b'x' * (1024 * 1024)
+    writer = threading.Thread(target=client.write, args=(payload,))
+    writer.start()
+    pipe_status, read_bytes, pipe_data = server.read()
+    writer.join()
+    assert (pipe_status, read_bytes) == (0, len(payload))
+    assert pipe_data == payload
+
+
+def test_empty_message_is_not_a_hang_up(messages):
+    server, client = messages
+    client.write(b'')
+    client.write(b'x')
+    client.write(b'')
+    client.close()
+    assert server.read() == (0, 0, b'')
+    assert server.read() == (0, 1, b'x')
+    # The last empty message went out right before the hang up.
+    assert server.read_into(bytearray(2)) == (0, 0)
+    assert server.read() == (1, 0, b'')
+    assert server.read() == (1, 0, b'')
+
+
+def test_read_into_message(messages):
+    server, client = messages
+    client.write(b'hello')
+    buffer = bytearray(8)
+    assert server.read_into(buffer) == (0, 5)
+    assert buffer[:5] == b'hello'
+
+
+def test_read_into_too_small_buffer(messages):
+    server, client = messages
+    client.write(b'hello')
+    with pytest.raises(PipeError):
+        server.read_into(bytearray(2))
+
+
+def test_byte_round_trip(name):
+    server, client = connected(name, channel=BasePipe.Channel.BYTE)
+    try:
+        assert client.write_many([b'ab', 'cd', bytearray(b'ef')]) == (0, 6)
+        buffer = bytearray(6)
+        view = memoryview(buffer)
+        offset = 0
+        while offset < len(buffer):
+            pipe_status, read_bytes = server.read_into(view[offset:])
+            assert pipe_status == 0
+            offset += read_bytes
+        assert buffer == b'abcdef'
+    finally:
+        client.close()
+        server._release()
+
+
+def test_hang_up(pair):
+    server, client = pair
+    client.close()
+    assert server.read()[0] == 1
+    assert server.read_into(bytearray(4)) == (1, 0)
+
+
+def test_read_timeout(pair):
+    server, _ = pair
+    with pytest.raises(PipeTimeoutError):
+        server.read(timeout=50)
+
+
+def test_cancel_wakes_up_a_read(pair):
+    server, _ = pair
+    timer = threading.Timer(0.1, server.cancel)
+    timer.start()
+    try:
+        assert server.read(timeout=5000)[0] == 1
+    finally:
+        timer.join()
+
+
+def test_stream_round_trip(pair):
+    server, client = pair
+    payloads = [b'x' * 100000, 'hello', bytearray(b'abc')]
+    writer = threading.Thread(
+        target=client.write_stream, args=(payloads,),
+        kwargs={'chunk_size': 4096}
+    )
+    writer.start()
+    chunks = list(server.read_stream(chunk_size=1000))
+    writer.join()
+    assert b''.join(chunks) == b'x' * 100000 + b'helloabc'
+    if server.channel == BasePipe.Channel.BYTE:
+        assert max(len(chunk) for chunk in chunks) <= 1000
+
+
+def test_empty_stream(pair):
+    server, client = pair
+    assert client.write_stream([]) == (0, 0)
+    assert list(server.read_stream()) == []
+
+
+def test_send_receive(pair):
+    server, client = pair
+    assert client.send(b'object') == (0, 6)
+    assert server.receive() == (0, b'object')
+    client.close()
+    assert server.receive() == (1, None)
+
+
+def test_mode_is_enforced(name):
+    server = UnixPipe(name, mode=BasePipe.Mode.READ_ONLY)
+    try:
+        with pytest.raises(PipeError):
+            server.write(b'x')
+    finally:
+        server._release()